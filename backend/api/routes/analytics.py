@@ -0,0 +1,174 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Dict, List
+from datetime import date, timedelta
+from database import get_db
+from models.analytics import ConsultationWeeklyStats
+from models.patient import Patient
+from models.patient_calculations import PatientCalculation
+from utils.analytics_rollup import week_start
+from utils.user_cache import UserPrincipal
+from pydantic import BaseModel
+from utils.auth import get_current_user
+
+router = APIRouter()
+
+# Semanas del promedio móvil de consultas
+MOVING_AVERAGE_WEEKS = 4
+
+# Schemas
+class GroupCount(BaseModel):
+    count: int
+    share: float  # % del total
+    average_caloric_requirement: float | None
+
+class PatientSummary(BaseModel):
+    nutritionist_id: int | None
+    total_patients: int
+    average_caloric_requirement: float | None
+    average_bmi: float | None
+    by_bmi_category: Dict[str, GroupCount]
+    by_patient_type: Dict[str, GroupCount]
+
+class WeeklyConsultations(BaseModel):
+    week_start: date
+    consultations: int
+    patients_seen: int
+    average_weight_change: float | None
+    appointments_due: int
+    appointments_kept: int
+    adherence: float | None  # % de citas cumplidas
+    moving_average: float  # consultas por semana, últimas MOVING_AVERAGE_WEEKS
+
+class WeeklySeries(BaseModel):
+    nutritionist_id: int | None
+    weeks: List[WeeklyConsultations]
+    adherence: float | None
+
+def _scope(current_user: UserPrincipal, nutritionist_id: int | None) -> int | None:
+    """Nutricionista a consultar: el propio usuario, o cualquiera (o todos) si es administrador"""
+    if current_user.role == "admin":
+        return nutritionist_id
+    if nutritionist_id is not None and nutritionist_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Solo puede consultar sus propias estadísticas")
+    return current_user.id
+
+def _group_counts(db: Session, column, nutritionist_id: int | None) -> Dict[str, GroupCount]:
+    """Pacientes por grupo con su porcentaje (función de ventana sobre el total)"""
+    count = func.count(Patient.id)
+    query = db.query(
+        column,
+        count,
+        (count * 100.0 / func.sum(count).over()),
+        func.avg(PatientCalculation.caloric_requirement)
+    ).outerjoin(PatientCalculation, PatientCalculation.patient_id == Patient.id)
+
+    if nutritionist_id is not None:
+        query = query.filter(Patient.nutritionist_id == nutritionist_id)
+
+    return {
+        str(getattr(group, "value", group) or "sin_datos"): GroupCount(
+            count=total,
+            share=round(share, 2),
+            average_caloric_requirement=round(average, 2) if average is not None else None
+        )
+        for group, total, share, average in query.group_by(column).all()
+    }
+
+# Endpoints
+@router.get("/patients", response_model=PatientSummary)
+def get_patient_summary(
+    nutritionist_id: int | None = None,
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Resumen de pacientes: total, promedios y distribución por categoría de IMC
+    y tipo de paciente, calculados en la base de datos (GROUP BY).
+    """
+    nutritionist_id = _scope(current_user, nutritionist_id)
+
+    query = db.query(
+        func.count(Patient.id),
+        func.avg(PatientCalculation.caloric_requirement),
+        func.avg(PatientCalculation.bmi)
+    ).outerjoin(PatientCalculation, PatientCalculation.patient_id == Patient.id)
+    if nutritionist_id is not None:
+        query = query.filter(Patient.nutritionist_id == nutritionist_id)
+    total, average_calories, average_bmi = query.one()
+
+    return PatientSummary(
+        nutritionist_id=nutritionist_id,
+        total_patients=total,
+        average_caloric_requirement=round(average_calories, 2) if average_calories is not None else None,
+        average_bmi=round(average_bmi, 2) if average_bmi is not None else None,
+        by_bmi_category=_group_counts(db, PatientCalculation.bmi_category, nutritionist_id),
+        by_patient_type=_group_counts(db, Patient.patient_type, nutritionist_id)
+    )
+
+@router.get("/consultations/weekly", response_model=WeeklySeries)
+def get_weekly_consultations(
+    weeks: int = Query(12, ge=1, le=260),
+    nutritionist_id: int | None = None,
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Consultas por semana, pacientes atendidos, cambio de peso promedio y
+    adherencia a las citas de seguimiento. Se lee del resumen semanal
+    precalculado (una fila por semana y nutricionista).
+    """
+    nutritionist_id = _scope(current_user, nutritionist_id)
+
+    last_week = week_start(date.today())
+    # Semanas extra al inicio para el promedio móvil de la primera semana
+    first_week = last_week - timedelta(weeks=weeks + MOVING_AVERAGE_WEEKS - 2)
+
+    query = db.query(
+        ConsultationWeeklyStats.week_start,
+        func.sum(ConsultationWeeklyStats.consultations),
+        func.sum(ConsultationWeeklyStats.patients_seen),
+        func.sum(ConsultationWeeklyStats.weight_change_sum),
+        func.sum(ConsultationWeeklyStats.weight_change_count),
+        func.sum(ConsultationWeeklyStats.appointments_due),
+        func.sum(ConsultationWeeklyStats.appointments_kept)
+    ).filter(
+        ConsultationWeeklyStats.week_start >= first_week,
+        ConsultationWeeklyStats.week_start <= last_week
+    )
+    if nutritionist_id is not None:
+        query = query.filter(ConsultationWeeklyStats.nutritionist_id == nutritionist_id)
+    rows = {row[0]: row[1:] for row in query.group_by(ConsultationWeeklyStats.week_start).all()}
+
+    # Serie continua: las semanas sin consultas cuentan como cero
+    totals = []
+    week = first_week
+    while week <= last_week:
+        totals.append((week, rows.get(week, (0, 0, 0.0, 0, 0, 0))))
+        week += timedelta(weeks=1)
+
+    series = []
+    total_due = total_kept = 0
+    for index, (week, (consultations, patients_seen, change_sum, change_count, due, kept)) in enumerate(totals):
+        if index < MOVING_AVERAGE_WEEKS - 1:
+            continue
+        window = totals[index - MOVING_AVERAGE_WEEKS + 1:index + 1]
+        total_due += due
+        total_kept += kept
+        series.append(WeeklyConsultations(
+            week_start=week,
+            consultations=consultations,
+            patients_seen=patients_seen,
+            average_weight_change=round(change_sum / change_count, 2) if change_count else None,
+            appointments_due=due,
+            appointments_kept=kept,
+            adherence=round(kept * 100.0 / due, 2) if due else None,
+            moving_average=round(sum(values[0] for _, values in window) / MOVING_AVERAGE_WEEKS, 2)
+        ))
+
+    return WeeklySeries(
+        nutritionist_id=nutritionist_id,
+        weeks=series,
+        adherence=round(total_kept * 100.0 / total_due, 2) if total_due else None
+    )
@@ -1,5 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime, timedelta
@@ -8,16 +7,16 @@ from pydantic import BaseModel, EmailStr
 from database import get_db
 from models.user import User, UserRole, SubscriptionStatus, SubscriptionPlan
 from utils.auth import (
-    verify_password, 
-    get_password_hash, 
     create_access_token, 
-    verify_token,
+    get_current_user,
     check_subscription_status,
     get_patient_limit
 )
+from utils.user_cache import UserPrincipal
+from utils.password_hashing import hash_password, verify_and_update_password
+from middleware.rate_limit import client_ip, login_throttle
 
 router = APIRouter()
-security = HTTPBearer()
 
 # Schemas
 class UserCreate(BaseModel):
@@ -70,30 +69,6 @@ class PasswordChange(BaseModel):
     current_password: str
     new_password: str
 
-# Dependency to get current user
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user."""
-    token = credentials.credentials
-    user_id = verify_token(token)
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
-    
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Inactive user"
-        )
-    
-    return user
-
 # Endpoints
 @router.post("/register", response_model=TokenResponse)
 def register(user_data: UserCreate, db: Session = Depends(get_db)):
@@ -107,7 +82,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = hash_password(user_data.password)
     trial_end_date = datetime.now() + timedelta(days=30)
     
     db_user = User(
@@ -148,11 +123,17 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=TokenResponse)
-def login(login_data: UserLogin, db: Session = Depends(get_db)):
+def login(login_data: UserLogin, request: Request, db: Session = Depends(get_db)):
     """Login user."""
+    # Locked out emails/IPs are rejected before spending a bcrypt verification
+    ip = client_ip(request.scope)
+    login_throttle.check(login_data.email, ip)
+    
     user = db.query(User).filter(User.email == login_data.email).first()
     
-    if not user or not verify_password(login_data.password, user.password_hash):
+    is_valid, new_hash = verify_and_update_password(login_data.password, user.password_hash) if user else (False, None)
+    if not is_valid:
+        login_throttle.record_failure(login_data.email, ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -164,8 +145,12 @@ def login(login_data: UserLogin, db: Session = Depends(get_db)):
             detail="Inactive user"
         )
     
-    # Update last login
+    login_throttle.record_success(login_data.email)
+    
+    # Update last login, upgrading the hash if the bcrypt cost changed
     user.last_login = datetime.now()
+    if new_hash:
+        user.password_hash = new_hash
     db.commit()
     
     # Create access token
@@ -187,13 +172,26 @@ def login(login_data: UserLogin, db: Session = Depends(get_db)):
         }
     )
 
+def _load_user(db: Session, current_user: UserPrincipal) -> User:
+    """Load the full user row behind a principal."""
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    return user
+
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Get current user information."""
-    return current_user
+    return _load_user(db, current_user)
 
 @router.get("/subscription-status")
-def get_subscription_status(current_user: User = Depends(get_current_user)):
+def get_subscription_status(current_user: UserPrincipal = Depends(get_current_user)):
     """Get subscription status and limits."""
     is_active, message = check_subscription_status(current_user)
     patient_limit = get_patient_limit(current_user)
@@ -210,17 +208,19 @@ def get_subscription_status(current_user: User = Depends(get_current_user)):
 @router.post("/change-password")
 def change_password(
     password_data: PasswordChange,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Change user password."""
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    user = _load_user(db, current_user)
+    is_valid, _ = verify_and_update_password(password_data.current_password, user.password_hash)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     
-    current_user.password_hash = get_password_hash(password_data.new_password)
+    user.password_hash = hash_password(password_data.new_password)
     db.commit()
     
     return {"message": "Password changed successfully"}
@@ -228,19 +228,20 @@ def change_password(
 @router.post("/upgrade-subscription")
 def upgrade_subscription(
     plan: SubscriptionPlan,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Upgrade user subscription (placeholder for payment integration)."""
-    current_user.subscription_plan = plan
-    current_user.subscription_status = SubscriptionStatus.active
-    current_user.subscription_start_date = datetime.now()
-    current_user.subscription_end_date = datetime.now() + timedelta(days=30)  # Monthly
+    user = _load_user(db, current_user)
+    user.subscription_plan = plan
+    user.subscription_status = SubscriptionStatus.active
+    user.subscription_start_date = datetime.now()
+    user.subscription_end_date = datetime.now() + timedelta(days=30)  # Monthly
     
     db.commit()
     
     return {
         "message": f"Subscription upgraded to {plan}",
         "new_plan": plan,
-        "expires_at": current_user.subscription_end_date
+        "expires_at": user.subscription_end_date
     }
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
-from database import get_db
+from typing import Dict, List, Literal
+from datetime import date, datetime
+from database import get_db, get_async_db, SessionLocal
 from models.consultation import Consultation
 from models.patient import Patient
+from utils.user_cache import UserPrincipal
+from utils.progress_series import PROGRESS_METRICS, get_progress_series
+from utils.consultation_history import consultation_key, refresh_weight_changes
+from utils.body_composition import apply_body_composition
+from utils.data_export import EXPORT_MEDIA_TYPES, iter_export_rows, stream_export
+from utils.analytics_rollup import affected_weeks, refresh_weekly_stats, week_start
+from utils.serialization import ListSerializer
 from pydantic import BaseModel
+from utils.auth import get_current_user
 from utils.nutrition_calculations import (
     calculate_bmi,
     calculate_ideal_weight,
@@ -80,6 +91,17 @@ class ConsultationResponse(BaseModel):
     body_fat_percentage: float | None
     muscle_mass: float | None
     
+    # Calculated body composition
+    body_density: float | None
+    body_fat_siri: float | None
+    body_fat_brozek: float | None
+    fat_mass: float | None
+    fat_free_mass: float | None
+    waist_hip_ratio: float | None
+    waist_height_ratio: float | None
+    arm_muscle_circumference: float | None
+    arm_muscle_area: float | None
+    
     # Activity level
     activity_level_changed: int
     new_activity_level: str | None
@@ -100,6 +122,28 @@ class ConsultationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+CONSULTATION_EXPORT_FIELDS = list(ConsultationResponse.model_fields)
+_consultation_list = ListSerializer(ConsultationResponse)
+
+class UpcomingConsultation(BaseModel):
+    consultation_id: int
+    patient_id: int
+    patient_name: str
+    next_appointment: datetime
+    last_weight: float | None
+
+class MetricSeries(BaseModel):
+    values: List[float | None]
+    deltas: List[float | None]
+    total_change: float | None
+    trend_per_month: float | None
+
+class ProgressSeries(BaseModel):
+    patient_id: int
+    bucket: str
+    dates: List[str]
+    metrics: Dict[str, MetricSeries]
+
 # Endpoints
 @router.post("/", response_model=ConsultationResponse)
 def create_consultation(consultation: ConsultationCreate, db: Session = Depends(get_db)):
@@ -110,29 +154,15 @@ def create_consultation(consultation: ConsultationCreate, db: Session = Depends(
     if not patient:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
     
-    # Calcular peso anterior para el cambio
-    previous_consultation = db.query(Consultation)\
-        .filter(Consultation.patient_id == consultation.patient_id)\
-        .order_by(Consultation.consultation_date.desc())\
-        .first()
-    
-    weight_change = None
-    if previous_consultation:
-        weight_change = consultation.weight - previous_consultation.weight
-    
     # Calcular BMI
     bmi = calculate_bmi(consultation.weight, consultation.height)
     
     # Calcular edad del paciente
-    age = calculate_age(patient.date_of_birth)
+    age = calculate_age(patient.birth_date)
     
     # Calcular peso saludable y ajustado
     healthy_weight = calculate_ideal_weight(consultation.height, patient.gender)
-    adjusted_weight = calculate_adjusted_weight(
-        consultation.weight,
-        healthy_weight,
-        bmi
-    )
+    adjusted_weight = calculate_adjusted_weight(consultation.weight, healthy_weight)
     
     # Determinar nivel de actividad
     activity_level = consultation.new_activity_level if consultation.activity_level_changed else patient.activity_level
@@ -144,8 +174,8 @@ def create_consultation(consultation: ConsultationCreate, db: Session = Depends(
         age=age,
         gender=patient.gender,
         activity_level=activity_level,
-        condition=patient.condition if hasattr(patient, 'condition') else "sano"
-    )
+        patient_type=patient.patient_type
+    )["caloric_requirement"]
     
     # Crear consulta
     new_consultation = Consultation(
@@ -154,7 +184,6 @@ def create_consultation(consultation: ConsultationCreate, db: Session = Depends(
         weight=consultation.weight,
         height=consultation.height,
         bmi=bmi,
-        weight_change=weight_change,
         
         # Circumferences
         waist_circumference=consultation.waist_circumference,
@@ -192,24 +221,96 @@ def create_consultation(consultation: ConsultationCreate, db: Session = Depends(
         next_appointment=consultation.next_appointment
     )
     
+    # Composición corporal a partir de pliegues y circunferencias
+    apply_body_composition(new_consultation, patient.gender, patient.birth_date)
+    
     # Si cambió el nivel de actividad, actualizar el paciente
     if consultation.activity_level_changed and consultation.new_activity_level:
         patient.activity_level = consultation.new_activity_level
     
     db.add(new_consultation)
+    db.flush()
+    
+    # Cambio de peso de la nueva consulta y de la siguiente (si se registró con fecha pasada)
+    changed = refresh_weight_changes(db, new_consultation.patient_id, [consultation_key(new_consultation)])
+    
+    # Resumen semanal de las semanas afectadas
+    weeks = affected_weeks(new_consultation.consultation_date, new_consultation.next_appointment)
+    weeks.update(week_start(c.consultation_date) for c in changed if c.consultation_date)
+    refresh_weekly_stats(db, new_consultation.patient_id, weeks)
+    
     db.commit()
     db.refresh(new_consultation)
     
     return new_consultation
 
 @router.get("/patient/{patient_id}", response_model=List[ConsultationResponse])
-def get_patient_consultations(patient_id: int, db: Session = Depends(get_db)):
+async def get_patient_consultations(patient_id: int, db: AsyncSession = Depends(get_async_db)):
     """Obtener todas las consultas de un paciente"""
-    consultations = db.query(Consultation)\
-        .filter(Consultation.patient_id == patient_id)\
-        .order_by(Consultation.consultation_date.desc())\
-        .all()
-    return consultations
+    result = await db.execute(
+        select(Consultation)
+        .where(Consultation.patient_id == patient_id)
+        .order_by(Consultation.consultation_date.desc())
+    )
+    return _consultation_list.response(result.scalars().all())
+
+@router.get("/patient/{patient_id}/progress", response_model=ProgressSeries)
+def get_patient_progress(
+    patient_id: int,
+    metrics: str = "weight,bmi",
+    bucket: Literal["none", "week", "month"] = "none",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Obtener la evolución de un paciente como series en columnas (fechas + valores).
+    `metrics` separadas por coma; `bucket` promedia por semana o mes. Incluye
+    diferencias entre puntos, cambio total y tendencia (unidades por 30 días).
+    """
+    requested = list(dict.fromkeys(m.strip() for m in metrics.split(",") if m.strip()))
+    unknown = set(requested) - set(PROGRESS_METRICS)
+    if not requested or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Métricas válidas: {', '.join(PROGRESS_METRICS)}"
+        )
+    
+    series = get_progress_series(db, patient_id, requested, bucket=bucket, start=start, end=end)
+    return ProgressSeries(patient_id=patient_id, **series)
+
+@router.get("/export")
+def export_consultations(
+    format: Literal["csv", "ndjson", "xlsx"] = "csv",
+    patient_id: int | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Exportar las consultas de los pacientes del nutricionista en CSV, NDJSON o XLSX.
+    Las filas se leen con un cursor del servidor y se envían a medida que se
+    leen, sin cargar todo el resultado en memoria.
+    """
+    statement = select(*[getattr(Consultation, field) for field in CONSULTATION_EXPORT_FIELDS])\
+        .join(Patient, Patient.id == Consultation.patient_id)\
+        .where(Patient.nutritionist_id == current_user.id)
+    
+    if patient_id is not None:
+        statement = statement.where(Consultation.patient_id == patient_id)
+    if start:
+        statement = statement.where(Consultation.consultation_date >= start)
+    if end:
+        statement = statement.where(Consultation.consultation_date <= end)
+    
+    statement = statement.order_by(Consultation.patient_id, Consultation.consultation_date, Consultation.id)
+    rows = iter_export_rows(SessionLocal, statement)
+    filename = f"consultas_{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        stream_export(format, CONSULTATION_EXPORT_FIELDS, rows),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.get("/{consultation_id}", response_model=ConsultationResponse)
 def get_consultation(consultation_id: int, db: Session = Depends(get_db)):
@@ -237,6 +338,11 @@ def update_consultation(
     if not consultation:
         raise HTTPException(status_code=404, detail="Consulta no encontrada")
     
+    old_patient_id = consultation.patient_id
+    old_key = consultation_key(consultation)
+    old_weight = consultation.weight
+    old_weeks = affected_weeks(consultation.consultation_date, consultation.next_appointment)
+    
     # Actualizar campos
     for field, value in consultation_data.dict(exclude_unset=True).items():
         setattr(consultation, field, value)
@@ -245,6 +351,34 @@ def update_consultation(
     if consultation_data.weight or consultation_data.height:
         consultation.bmi = calculate_bmi(consultation.weight, consultation.height)
     
+    patient = db.get(Patient, consultation.patient_id)
+    if patient:
+        apply_body_composition(consultation, patient.gender, patient.birth_date)
+    
+    # Recalcular el cambio de peso solo en las consultas vecinas afectadas
+    new_key = consultation_key(consultation)
+    changed = []
+    if (old_patient_id, old_key, old_weight) != (consultation.patient_id, new_key, consultation.weight):
+        db.flush()
+        if old_patient_id != consultation.patient_id:
+            changed += refresh_weight_changes(db, old_patient_id, [old_key])
+            changed += refresh_weight_changes(db, consultation.patient_id, [new_key])
+        else:
+            changed += refresh_weight_changes(db, consultation.patient_id, [old_key, new_key])
+    
+    # Resumen semanal de las semanas afectadas (posición anterior y nueva)
+    new_weeks = affected_weeks(consultation.consultation_date, consultation.next_appointment)
+    for c in changed:
+        if c.consultation_date and c.patient_id == consultation.patient_id:
+            new_weeks.add(week_start(c.consultation_date))
+        elif c.consultation_date:
+            old_weeks.add(week_start(c.consultation_date))
+    if old_patient_id != consultation.patient_id:
+        refresh_weekly_stats(db, old_patient_id, old_weeks)
+        refresh_weekly_stats(db, consultation.patient_id, new_weeks)
+    else:
+        refresh_weekly_stats(db, consultation.patient_id, old_weeks | new_weeks)
+    
     db.commit()
     db.refresh(consultation)
     
@@ -260,28 +394,58 @@ def delete_consultation(consultation_id: int, db: Session = Depends(get_db)):
     if not consultation:
         raise HTTPException(status_code=404, detail="Consulta no encontrada")
     
+    patient_id = consultation.patient_id
+    key = consultation_key(consultation)
+    weeks = affected_weeks(consultation.consultation_date, consultation.next_appointment)
     db.delete(consultation)
+    db.flush()
+    
+    # La consulta siguiente pasa a compararse con la anterior a la borrada
+    changed = refresh_weight_changes(db, patient_id, [key])
+    weeks.update(week_start(c.consultation_date) for c in changed if c.consultation_date)
+    refresh_weekly_stats(db, patient_id, weeks)
     db.commit()
     
     return {"message": "Consulta eliminada exitosamente"}
 
-@router.get("/upcoming/all", response_model=List[dict])
-def get_upcoming_consultations(db: Session = Depends(get_db)):
-    """Obtener próximas citas programadas"""
-    consultations = db.query(Consultation)\
-        .filter(Consultation.next_appointment >= datetime.now())\
-        .order_by(Consultation.next_appointment)\
+@router.get("/upcoming/all", response_model=List[UpcomingConsultation])
+def get_upcoming_consultations(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """Obtener próximas citas programadas del nutricionista (por defecto desde ahora)"""
+    query = db.query(
+        Consultation.id,
+        Consultation.patient_id,
+        Consultation.next_appointment,
+        Consultation.weight,
+        Patient.first_name,
+        Patient.last_name
+    ).join(Patient, Patient.id == Consultation.patient_id)\
+        .filter(
+            Patient.nutritionist_id == current_user.id,
+            Consultation.next_appointment >= (start or datetime.now())
+        )
+    
+    if end:
+        query = query.filter(Consultation.next_appointment <= end)
+    
+    rows = query.order_by(Consultation.next_appointment, Consultation.id)\
+        .offset(skip)\
+        .limit(limit)\
         .all()
     
-    result = []
-    for consultation in consultations:
-        patient = db.query(Patient).filter(Patient.id == consultation.patient_id).first()
-        result.append({
-            "consultation_id": consultation.id,
-            "patient_id": patient.id,
-            "patient_name": patient.name,
-            "next_appointment": consultation.next_appointment,
-            "last_weight": consultation.weight
-        })
-    
-    return result
+    return [
+        UpcomingConsultation(
+            consultation_id=row.id,
+            patient_id=row.patient_id,
+            patient_name=f"{row.first_name} {row.last_name}",
+            next_appointment=row.next_appointment,
+            last_weight=row.weight
+        )
+        for row in rows
+    ]
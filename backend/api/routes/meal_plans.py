@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List
 from datetime import date
-from database import get_db
+from database import get_db, get_async_db
 from models.meal_plan import MealPlan, MealPlanItem
+from models.patient import Patient
+from models.patient_calculations import PatientCalculation
+from models.patient_preferences import PatientPreferences
+from utils.patient_calculations import compute_patient_calculations
+from utils.meal_plan_optimizer import load_food_catalog, parse_food_list, generate_meal_plan
+from utils.meal_plan_writes import create_meal_plans, replace_meal_plan_items
+from utils.serialization import ListSerializer
 from pydantic import BaseModel
 
 router = APIRouter()
 
 # Schemas
 class MealPlanItemCreate(BaseModel):
+    id: int | None = None  # ítem existente (al actualizar solo se escriben los cambios)
     meal_time: str
     food_item: str
     portion: str
@@ -54,94 +64,170 @@ class MealPlanResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class MacroTotals(BaseModel):
+    calories: float
+    proteins: float
+    carbohydrates: float
+    fats: float
+
+class GeneratedMealPlan(BaseModel):
+    patient_id: int
+    targets: MacroTotals
+    totals: MacroTotals
+    items: List[MealPlanItemCreate]
+
+_meal_plan_list = ListSerializer(MealPlanResponse)
+
+# Máximo de planes por petición en la creación masiva
+MAX_BATCH_PLANS = 500
+
 # Endpoints
 @router.post("/", response_model=MealPlanResponse)
 def create_meal_plan(meal_plan: MealPlanCreate, db: Session = Depends(get_db)):
-    """Crear un nuevo plan de alimentación"""
-    # Calculate totals
-    total_calories = sum(item.calories for item in meal_plan.items)
-    total_proteins = sum(item.proteins for item in meal_plan.items)
-    total_carbs = sum(item.carbohydrates for item in meal_plan.items)
-    total_fats = sum(item.fats for item in meal_plan.items)
-    
-    # Create meal plan
-    db_meal_plan = MealPlan(
-        patient_id=meal_plan.patient_id,
-        date_created=meal_plan.date_created,
-        name=meal_plan.name,
-        notes=meal_plan.notes,
-        total_calories=total_calories,
-        total_proteins=total_proteins,
-        total_carbohydrates=total_carbs,
-        total_fats=total_fats
-    )
-    db.add(db_meal_plan)
+    """Crear un nuevo plan de alimentación (plan, ítems y totales en una sola transacción)"""
+    (plan_id,) = create_meal_plans(db, [meal_plan.model_dump()])
     db.commit()
-    db.refresh(db_meal_plan)
+    return db.query(MealPlan)\
+        .filter(MealPlan.id == plan_id)\
+        .options(selectinload(MealPlan.items))\
+        .first()
+
+@router.post("/batch", response_model=List[MealPlanResponse])
+def create_meal_plans_batch(meal_plans: List[MealPlanCreate], db: Session = Depends(get_db)):
+    """Crear planes de alimentación para varios pacientes a la vez (todo o nada)"""
+    if len(meal_plans) > MAX_BATCH_PLANS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {MAX_BATCH_PLANS} planes por petición"
+        )
     
-    # Create items
-    for item in meal_plan.items:
-        db_item = MealPlanItem(
-            meal_plan_id=db_meal_plan.id,
-            **item.model_dump()
+    patient_ids = {plan.patient_id for plan in meal_plans}
+    found = {patient_id for (patient_id,) in db.query(Patient.id).filter(Patient.id.in_(patient_ids))}
+    missing = patient_ids - found
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Pacientes no encontrados: {', '.join(str(patient_id) for patient_id in sorted(missing))}"
         )
-        db.add(db_item)
     
+    plan_ids = create_meal_plans(db, [plan.model_dump() for plan in meal_plans])
     db.commit()
-    db.refresh(db_meal_plan)
-    return db_meal_plan
+    
+    plans = db.query(MealPlan)\
+        .filter(MealPlan.id.in_(plan_ids))\
+        .options(selectinload(MealPlan.items))\
+        .all()
+    by_id = {plan.id: plan for plan in plans}
+    return [by_id[plan_id] for plan_id in plan_ids]
+
+@router.post("/generate/{patient_id}", response_model=GeneratedMealPlan)
+def generate_patient_meal_plan(
+    patient_id: int,
+    calories: float | None = Query(None, gt=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Generar una propuesta de plan diario con el sistema de intercambios.
+    Usa el requerimiento calórico y de macronutrientes del paciente (o `calories`,
+    escalando los macronutrientes) y respeta alergias, alimentos no deseados y
+    condiciones del paciente. El plan no se guarda: se puede enviar a POST /.
+    """
+    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Paciente no encontrado")
+    
+    calculations = db.query(PatientCalculation).filter(PatientCalculation.patient_id == patient_id).first()
+    if calculations and calculations.computed_on == date.today():
+        targets = {
+            "caloric_requirement": calculations.caloric_requirement,
+            "proteins_g": calculations.proteins_g,
+            "carbs_g": calculations.carbs_g,
+            "fats_g": calculations.fats_g
+        }
+    else:
+        targets = compute_patient_calculations(patient)
+    
+    if calories:
+        ratio = calories / targets["caloric_requirement"]
+        targets = {key: targets[key] * ratio for key in ("caloric_requirement", "proteins_g", "carbs_g", "fats_g")}
+    
+    preferences = db.query(PatientPreferences).filter(PatientPreferences.patient_id == patient_id).first()
+    excluded_terms = parse_food_list(patient.allergies)
+    snacks_per_day = 2
+    if preferences:
+        excluded_terms += parse_food_list(preferences.allergies) + parse_food_list(preferences.disliked_foods)
+        if preferences.snacks_per_day is not None:
+            snacks_per_day = preferences.snacks_per_day
+    
+    plan = generate_meal_plan(
+        load_food_catalog(db),
+        targets,
+        excluded_terms=excluded_terms,
+        is_vegetarian=bool(patient.is_vegetarian),
+        is_vegan=patient.is_vegetarian == 2,
+        has_diabetes=bool(patient.has_diabetes),
+        has_hypertension=bool(patient.has_hypertension),
+        snacks_per_day=snacks_per_day
+    )
+    if not plan["items"]:
+        raise HTTPException(status_code=400, detail="No hay intercambios disponibles para generar el plan")
+    
+    return GeneratedMealPlan(
+        patient_id=patient_id,
+        targets=MacroTotals(
+            calories=round(targets["caloric_requirement"], 1),
+            proteins=round(targets["proteins_g"], 1),
+            carbohydrates=round(targets["carbs_g"], 1),
+            fats=round(targets["fats_g"], 1)
+        ),
+        totals=MacroTotals(**plan["totals"]),
+        items=plan["items"]
+    )
 
 @router.get("/patient/{patient_id}", response_model=List[MealPlanResponse])
-def get_patient_meal_plans(patient_id: int, db: Session = Depends(get_db)):
+async def get_patient_meal_plans(patient_id: int, db: AsyncSession = Depends(get_async_db)):
     """Obtener todos los planes de alimentación de un paciente"""
-    meal_plans = db.query(MealPlan).filter(MealPlan.patient_id == patient_id).all()
-    return meal_plans
+    # Los items se cargan por adelantado: la carga perezosa no está disponible en sesiones async
+    result = await db.execute(
+        select(MealPlan)
+        .where(MealPlan.patient_id == patient_id)
+        .options(selectinload(MealPlan.items))
+    )
+    return _meal_plan_list.response(result.scalars().all())
 
 @router.get("/{meal_plan_id}", response_model=MealPlanResponse)
 def get_meal_plan(meal_plan_id: int, db: Session = Depends(get_db)):
     """Obtener un plan de alimentación específico"""
-    meal_plan = db.query(MealPlan).filter(MealPlan.id == meal_plan_id).first()
+    meal_plan = db.query(MealPlan)\
+        .filter(MealPlan.id == meal_plan_id)\
+        .options(selectinload(MealPlan.items))\
+        .first()
     if not meal_plan:
         raise HTTPException(status_code=404, detail="Plan de alimentación no encontrado")
     return meal_plan
 
 @router.put("/{meal_plan_id}", response_model=MealPlanResponse)
 def update_meal_plan(meal_plan_id: int, meal_plan_data: MealPlanCreate, db: Session = Depends(get_db)):
-    """Actualizar un plan de alimentación"""
+    """Actualizar un plan de alimentación (solo se escriben los ítems que cambiaron)"""
     meal_plan = db.query(MealPlan).filter(MealPlan.id == meal_plan_id).first()
     if not meal_plan:
         raise HTTPException(status_code=404, detail="Plan de alimentación no encontrado")
     
-    # Calculate new totals
-    total_calories = sum(item.calories for item in meal_plan_data.items)
-    total_proteins = sum(item.proteins for item in meal_plan_data.items)
-    total_carbs = sum(item.carbohydrates for item in meal_plan_data.items)
-    total_fats = sum(item.fats for item in meal_plan_data.items)
-    
     # Update meal plan
     meal_plan.patient_id = meal_plan_data.patient_id
     meal_plan.date_created = meal_plan_data.date_created
     meal_plan.name = meal_plan_data.name
     meal_plan.notes = meal_plan_data.notes
-    meal_plan.total_calories = total_calories
-    meal_plan.total_proteins = total_proteins
-    meal_plan.total_carbohydrates = total_carbs
-    meal_plan.total_fats = total_fats
+    db.flush()
     
-    # Delete old items
-    db.query(MealPlanItem).filter(MealPlanItem.meal_plan_id == meal_plan_id).delete()
-    
-    # Create new items
-    for item in meal_plan_data.items:
-        db_item = MealPlanItem(
-            meal_plan_id=meal_plan.id,
-            **item.model_dump()
-        )
-        db.add(db_item)
+    # Items and totals
+    replace_meal_plan_items(db, meal_plan.id, [item.model_dump() for item in meal_plan_data.items])
     
     db.commit()
-    db.refresh(meal_plan)
-    return meal_plan
+    return db.query(MealPlan)\
+        .filter(MealPlan.id == meal_plan_id)\
+        .options(selectinload(MealPlan.items))\
+        .first()
 
 @router.delete("/{meal_plan_id}")
 def delete_meal_plan(meal_plan_id: int, db: Session = Depends(get_db)):
@@ -150,6 +236,8 @@ def delete_meal_plan(meal_plan_id: int, db: Session = Depends(get_db)):
     if not meal_plan:
         raise HTTPException(status_code=404, detail="Plan de alimentación no encontrado")
     
+    # Los ítems se borran en una sola sentencia en lugar de uno por uno
+    db.query(MealPlanItem).filter(MealPlanItem.meal_plan_id == meal_plan_id).delete(synchronize_session=False)
     db.delete(meal_plan)
     db.commit()
     return {"message": "Plan de alimentación eliminado exitosamente"}
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from database import get_db
+from database import get_db, get_async_db
 from models.menu import Menu, MenuCategory
 from pydantic import BaseModel
+from utils.catalog_cache import cached_catalog_response, catalog_key
+from utils.seed_data import apply_seed
+from utils.serialization import ListSerializer
 
 router = APIRouter()
 
@@ -46,6 +51,8 @@ class MenuResponse(BaseModel):
     class Config:
         from_attributes = True
 
+_menu_list = ListSerializer(MenuResponse)
+
 # Endpoints
 @router.post("/", response_model=MenuResponse)
 def create_menu(menu: MenuCreate, db: Session = Depends(get_db)):
@@ -57,13 +64,16 @@ def create_menu(menu: MenuCreate, db: Session = Depends(get_db)):
     return db_menu
 
 @router.get("/", response_model=List[MenuResponse])
-def get_menus(category: MenuCategory | None = None, db: Session = Depends(get_db)):
-    """Obtener lista de menús, opcionalmente filtrados por categoría"""
-    query = db.query(Menu)
-    if category:
-        query = query.filter(Menu.category == category)
-    menus = query.all()
-    return menus
+async def get_menus(request: Request, category: MenuCategory | None = None, db: AsyncSession = Depends(get_async_db)):
+    """Obtener lista de menús, opcionalmente filtrados por categoría (cacheada, con ETag)"""
+    async def build() -> bytes:
+        query = select(Menu)
+        if category:
+            query = query.where(Menu.category == category)
+        result = await db.execute(query)
+        return _menu_list.dump(result.scalars().all())
+    
+    return await cached_catalog_response(request, "menus", catalog_key(category=category), build)
 
 @router.get("/{menu_id}", response_model=MenuResponse)
 def get_menu(menu_id: int, db: Session = Depends(get_db)):
@@ -99,111 +109,9 @@ def delete_menu(menu_id: int, db: Session = Depends(get_db)):
     return {"message": "Menú eliminado exitosamente"}
 
 @router.post("/seed-default-menus")
-def seed_default_menus(db: Session = Depends(get_db)):
-    """Crear menús de ejemplo predefinidos"""
-    default_menus = [
-        {
-            "name": "Menú Saludable Estándar",
-            "category": MenuCategory.HEALTHY,
-            "description": "Menú balanceado para personas sanas",
-            "calories": 2000,
-            "proteins": 100,
-            "carbohydrates": 250,
-            "fats": 65,
-            "fiber": 30,
-            "breakfast": "- Avena con frutas y nueces (1 taza)\n- Yogur griego natural (1 porción)\n- Café o té sin azúcar",
-            "morning_snack": "- Fruta fresca (1 manzana o pera)\n- Puñado de almendras (10 unidades)",
-            "lunch": "- Pechuga de pollo a la plancha (150g)\n- Arroz integral (1 taza)\n- Ensalada verde con vinagreta\n- Agua o jugo natural sin azúcar",
-            "afternoon_snack": "- Hummus con vegetales crudos\n- Té verde",
-            "dinner": "- Pescado al horno (150g)\n- Verduras salteadas\n- Papa cocida (1 pequeña)\n- Agua"
-        },
-        {
-            "name": "Menú para Diabetes",
-            "category": MenuCategory.DIABETES,
-            "description": "Menú controlado en carbohidratos y azúcares",
-            "calories": 1800,
-            "proteins": 110,
-            "carbohydrates": 180,
-            "fats": 60,
-            "fiber": 35,
-            "breakfast": "- Huevos revueltos (2 unidades)\n- Pan integral (1 rebanada)\n- Aguacate (1/4)\n- Café sin azúcar",
-            "morning_snack": "- Yogur griego sin azúcar\n- Nueces (10 unidades)",
-            "lunch": "- Ensalada de atún con vegetales\n- Quinoa (1/2 taza)\n- Brócoli al vapor\n- Agua con limón",
-            "afternoon_snack": "- Bastones de apio con mantequilla de maní natural",
-            "dinner": "- Pechuga de pavo (150g)\n- Espárragos asados\n- Coliflor al vapor\n- Agua"
-        },
-        {
-            "name": "Menú para Hipertensión",
-            "category": MenuCategory.HYPERTENSION,
-            "description": "Menú bajo en sodio (Dieta DASH)",
-            "calories": 2000,
-            "proteins": 100,
-            "carbohydrates": 250,
-            "fats": 60,
-            "fiber": 35,
-            "breakfast": "- Avena preparada con leche descremada\n- Plátano en rodajas\n- Jugo de naranja natural",
-            "morning_snack": "- Manzana\n- Almendras sin sal (10 unidades)",
-            "lunch": "- Salmón al horno con hierbas (sin sal)\n- Arroz integral\n- Espinacas salteadas con ajo\n- Agua",
-            "afternoon_snack": "- Yogur bajo en grasa\n- Fresas",
-            "dinner": "- Pollo sin piel a la plancha\n- Ensalada variada (sin sal añadida)\n- Batata al horno\n- Agua con pepino"
-        },
-        {
-            "name": "Menú Vegetariano",
-            "category": MenuCategory.VEGETARIAN,
-            "description": "Menú completo sin carnes",
-            "calories": 2000,
-            "proteins": 90,
-            "carbohydrates": 270,
-            "fats": 65,
-            "fiber": 40,
-            "breakfast": "- Tostadas integrales con aguacate\n- Tofu revuelto con vegetales\n- Jugo verde natural",
-            "morning_snack": "- Batido de proteína vegetal con frutas",
-            "lunch": "- Lentejas guisadas\n- Arroz integral\n- Ensalada de col con zanahoria\n- Agua de Jamaica sin azúcar",
-            "afternoon_snack": "- Hummus con pan pita integral",
-            "dinner": "- Hamburguesa de garbanzos\n- Ensalada mixta\n- Batata rostizada\n- Té de hierbas"
-        },
-        {
-            "name": "Menú Vegano",
-            "category": MenuCategory.VEGAN,
-            "description": "Menú 100% vegetal",
-            "calories": 2000,
-            "proteins": 85,
-            "carbohydrates": 280,
-            "fats": 65,
-            "fiber": 45,
-            "breakfast": "- Avena con leche de almendras\n- Semillas de chía\n- Frutas del bosque\n- Mantequilla de maní",
-            "morning_snack": "- Batido verde (espinaca, plátano, leche vegetal)",
-            "lunch": "- Bowl de quinoa con frijoles negros\n- Aguacate\n- Pico de gallo\n- Agua",
-            "afternoon_snack": "- Mix de frutos secos y semillas",
-            "dinner": "- Tempeh marinado\n- Vegetales salteados\n- Arroz salvaje\n- Té verde"
-        },
-        {
-            "name": "Menú para Deportistas",
-            "category": MenuCategory.ATHLETE,
-            "description": "Menú alto en proteínas y energía",
-            "calories": 2800,
-            "proteins": 160,
-            "carbohydrates": 350,
-            "fats": 80,
-            "fiber": 35,
-            "breakfast": "- Claras de huevo (4) con 1 huevo entero\n- Avena con plátano y miel\n- Jugo de naranja",
-            "morning_snack": "- Batido de proteína con frutas\n- Almendras",
-            "lunch": "- Pechuga de pollo (200g)\n- Arroz integral (1.5 tazas)\n- Ensalada grande\n- Batata\n- Agua",
-            "afternoon_snack": "- Sándwich de atún con pan integral\n- Fruta",
-            "dinner": "- Carne magra o pescado (200g)\n- Quinoa\n- Verduras variadas\n- Agua",
-            "supplements": "- Proteína Whey post-entrenamiento\n- BCAA durante entrenamiento\n- Creatina monohidrato (5g)\n- Multivitamínico"
-        }
-    ]
-    
-    created_menus = []
-    for menu_data in default_menus:
-        existing = db.query(Menu).filter(Menu.name == menu_data["name"]).first()
-        if not existing:
-            db_menu = Menu(**menu_data)
-            db.add(db_menu)
-            created_menus.append(menu_data["name"])
-    
-    db.commit()
-    return {"message": f"Menús creados: {len(created_menus)}", "menus": created_menus}
-
-
+def seed_default_menus(force: bool = False, db: Session = Depends(get_db)):
+    """Cargar o actualizar los menús predefinidos (seed_data/menus.json)"""
+    result = apply_seed(db, "menus", force=force)
+    if not result["applied"]:
+        return {"message": f"Menús predefinidos al día (versión {result['version']})", "menus": []}
+    return {"message": f"Menús creados o actualizados: {result['rows']}", "menus": result["names"]}
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import date
@@ -15,7 +15,9 @@ from utils.nutrition_calculations import (
     get_bmi_category,
     calculate_age
 )
+from utils.patient_search import search_patients as run_patient_search
 from utils.auth import get_current_user, check_subscription_status, get_patient_limit
+from utils.analytics_rollup import remove_patient
 
 router = APIRouter()
 
@@ -155,7 +157,8 @@ def delete_patient(patient_id: int, db: Session = Depends(get_db)):
     if not patient:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
     
-    db.delete(patient)
+    # Sus consultas se borran en cascada: recalcular las semanas que las contaban
+    remove_patient(db, patient)
     db.commit()
     return {"message": "Paciente eliminado exitosamente"}
 
@@ -196,14 +199,7 @@ def get_patient_calculations(patient_id: int, db: Session = Depends(get_db)):
         "fats_g": calculations["fats_g"]
     }
 
-@router.get("/search/{query}")
-def search_patients(query: str, db: Session = Depends(get_db)):
-    """Buscar pacientes por nombre o identificación"""
-    patients = db.query(Patient).filter(
-        (Patient.first_name.contains(query)) |
-        (Patient.last_name.contains(query)) |
-        (Patient.identification.contains(query))
-    ).all()
-    return patients
-
-
+@router.get("/search/{query}", response_model=List[PatientResponse])
+def search_patients(query: str, limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    """Buscar pacientes por nombre o identificación (sin distinguir tildes)"""
+    return run_patient_search(db, query, limit=limit)
@@ -1,21 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
+from typing import Any, Dict, List, Literal
+from datetime import date, datetime
 
-from database import get_db
+from database import get_db, get_async_db, SessionLocal
 from models.patient import Patient, Gender, ActivityLevel, PatientType
-from models.user import User
+from utils.user_cache import UserPrincipal
 from pydantic import BaseModel
-from utils.nutrition_calculations import (
-    calculate_bmi,
-    calculate_ideal_weight,
-    calculate_adjusted_weight,
-    calculate_caloric_requirement,
-    get_bmi_category,
-    calculate_age
-)
+from models.patient_calculations import PatientCalculation
+from utils.nutrition_batch import calculate_batch, calculate_ages
+from utils.patient_calculations import calculations_need_refresh, store_patient_calculations
+from utils.pagination import encode_cursor, decode_cursor
+from utils.patient_search import search_patients as run_patient_search
+from utils.patient_import import iter_import_rows, import_patients
+from utils.data_export import EXPORT_MEDIA_TYPES, iter_export_rows, stream_export
+from utils.serialization import ListSerializer
 from utils.auth import get_current_user, check_subscription_status, get_patient_limit
+from utils.analytics_rollup import remove_patient
 
 router = APIRouter()
 
@@ -105,19 +109,72 @@ class PatientResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PatientSummary(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    identification: str
+    weight: float
+    height: float
+
+    class Config:
+        from_attributes = True
+
+class PatientPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: str | None
+
+# Columns that can be requested through `fields=` on the summary listing
+PATIENT_LIST_FIELDS = set(PatientResponse.model_fields) | {"updated_at"}
+PATIENT_EXPORT_FIELDS = list(PatientResponse.model_fields)
+_patient_list = ListSerializer(PatientResponse)
+DEFAULT_SUMMARY_FIELDS = list(PatientSummary.model_fields)
+
 class PatientCalculations(BaseModel):
     bmi: float
     bmi_category: str
     ideal_weight: float
     adjusted_weight: float
     caloric_requirement: float
+    tmb: float
+    proteins_g: float
+    carbs_g: float
+    fats_g: float
     age: int
 
+    class Config:
+        from_attributes = True
+
+class PatientBulkCalculations(BaseModel):
+    patient_id: int
+    age: int
+    bmi: float
+    bmi_category: str
+    ideal_weight: float
+    adjusted_weight: float
+    tmb: float
+    caloric_requirement: float
+    proteins_g: float
+    carbs_g: float
+    fats_g: float
+
+class PatientImportError(BaseModel):
+    row: int
+    identification: str | None
+    errors: List[str]
+
+class PatientImportReport(BaseModel):
+    total_rows: int
+    imported: int
+    failed: int
+    errors: List[PatientImportError]
+    errors_truncated: bool
+
 # Endpoints
 @router.get("/", response_model=List[PatientResponse])
-def get_patients(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_patients(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Get all patients for the current nutritionist."""
     # Check subscription status
@@ -128,14 +185,77 @@ def get_patients(
             detail=f"Subscription required: {message}"
         )
     
-    patients = db.query(Patient).filter(Patient.nutritionist_id == current_user.id).all()
-    return patients
+    result = await db.execute(select(Patient).where(Patient.nutritionist_id == current_user.id))
+    return _patient_list.response(result.scalars().all())
+
+@router.get("/summary", response_model=PatientPage)
+def get_patients_summary(
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    fields: str | None = None,
+    order_by: Literal["id", "updated_at"] = "id",
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Get a page of patients for the current nutritionist.
+    Uses keyset pagination (pass `next_cursor` back as `cursor`) and loads only
+    the requested `fields` (comma-separated), defaulting to the summary columns.
+    """
+    is_active, message = check_subscription_status(current_user)
+    if not is_active:
+        raise HTTPException(
+            status_code=402,
+            detail=f"Subscription required: {message}"
+        )
+    
+    requested = [f.strip() for f in fields.split(",") if f.strip()] if fields else DEFAULT_SUMMARY_FIELDS
+    unknown = set(requested) - PATIENT_LIST_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    
+    # The keyset columns are always loaded so the next cursor can be built
+    keyset = ["updated_at", "id"] if order_by == "updated_at" else ["id"]
+    columns = list(dict.fromkeys(["id", *requested, *keyset]))
+    query = db.query(*[getattr(Patient, column) for column in columns])\
+        .filter(Patient.nutritionist_id == current_user.id)
+    
+    if order_by == "updated_at":
+        if cursor:
+            last_updated_at, last_id = decode_cursor(cursor, datetime, int)
+            query = query.filter(
+                tuple_(Patient.updated_at, Patient.id) < tuple_(last_updated_at, last_id)
+            )
+        query = query.order_by(Patient.updated_at.desc(), Patient.id.desc())
+    else:
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            query = query.filter(Patient.id > last_id)
+        query = query.order_by(Patient.id)
+    
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    next_cursor = None
+    if has_more:
+        last = rows[-1]._mapping
+        next_cursor = encode_cursor(*[last[column] for column in keyset])
+    
+    items = [
+        {column: row._mapping[column] for column in ["id", *requested]}
+        for row in rows
+    ]
+    return PatientPage(items=items, next_cursor=next_cursor)
 
 @router.post("/", response_model=PatientResponse)
 def create_patient(
     patient: PatientCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Create a new patient."""
     # Check subscription status
@@ -173,15 +293,115 @@ def create_patient(
         nutritionist_id=current_user.id
     )
     db.add(db_patient)
+    store_patient_calculations(db, db_patient)
     db.commit()
     db.refresh(db_patient)
     return db_patient
 
+@router.post("/import", response_model=PatientImportReport)
+def import_patients_file(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Import patients from a CSV or XLSX file whose header row uses the
+    PatientCreate field names. Valid rows are imported in batches; invalid,
+    duplicated or over-the-limit rows are returned in the report.
+    """
+    is_active, message = check_subscription_status(current_user)
+    if not is_active:
+        raise HTTPException(
+            status_code=402,
+            detail=f"Subscription required: {message}"
+        )
+    
+    rows = iter_import_rows(file.filename, file.file)
+    return import_patients(
+        db,
+        rows,
+        nutritionist_id=current_user.id,
+        patient_limit=get_patient_limit(current_user),
+        schema=PatientCreate
+    )
+
+@router.get("/export")
+def export_patients(
+    format: Literal["csv", "ndjson", "xlsx"] = "csv",
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Exportar todos los pacientes del nutricionista en CSV, NDJSON o XLSX.
+    Las filas salen en streaming desde un cursor del servidor: la descarga
+    empieza de inmediato y la memoria no crece con el número de pacientes.
+    """
+    is_active, message = check_subscription_status(current_user)
+    if not is_active:
+        raise HTTPException(
+            status_code=402,
+            detail=f"Subscription required: {message}"
+        )
+    
+    statement = select(*[getattr(Patient, field) for field in PATIENT_EXPORT_FIELDS])\
+        .where(Patient.nutritionist_id == current_user.id)\
+        .order_by(Patient.id)
+    rows = iter_export_rows(SessionLocal, statement)
+    filename = f"pacientes_{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        stream_export(format, PATIENT_EXPORT_FIELDS, rows),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/calculations/bulk", response_model=List[PatientBulkCalculations])
+def get_bulk_calculations(
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """Get nutritional calculations for every patient of the current nutritionist in one pass."""
+    rows = db.query(
+        Patient.id,
+        Patient.birth_date,
+        Patient.gender,
+        Patient.weight,
+        Patient.height,
+        Patient.activity_level,
+        Patient.patient_type
+    ).filter(Patient.nutritionist_id == current_user.id).all()
+    
+    if not rows:
+        return []
+    
+    ids, birth_dates, genders, weights, heights, activity_levels, patient_types = zip(*rows)
+    ages = calculate_ages(birth_dates)
+    results = calculate_batch(
+        weights=weights,
+        heights=heights,
+        ages=ages,
+        genders=genders,
+        activity_levels=activity_levels,
+        patient_types=patient_types
+    )
+    
+    columns = [
+        "bmi", "bmi_category", "ideal_weight", "adjusted_weight",
+        "tmb", "caloric_requirement", "proteins_g", "carbs_g", "fats_g"
+    ]
+    values = [results[column].tolist() for column in columns]
+    return [
+        PatientBulkCalculations(
+            patient_id=patient_id,
+            age=age,
+            **dict(zip(columns, row))
+        )
+        for patient_id, age, *row in zip(ids, ages.tolist(), *values)
+    ]
+
 @router.get("/{patient_id}", response_model=PatientResponse)
 def get_patient(
     patient_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Get a specific patient."""
     patient = db.query(Patient).filter(
@@ -199,7 +419,7 @@ def update_patient(
     patient_id: int,
     patient: PatientCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Update a patient."""
     db_patient = db.query(Patient).filter(
@@ -214,6 +434,10 @@ def update_patient(
     for key, value in update_data.items():
         setattr(db_patient, key, value)
     
+    # Recalculate only when an input of the calculations changed
+    if calculations_need_refresh(db_patient):
+        store_patient_calculations(db, db_patient)
+    
     db.commit()
     db.refresh(db_patient)
     return db_patient
@@ -222,7 +446,7 @@ def update_patient(
 def delete_patient(
     patient_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Delete a patient."""
     patient = db.query(Patient).filter(
@@ -233,7 +457,8 @@ def delete_patient(
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    db.delete(patient)
+    # Its consultations are deleted in cascade: refresh the weeks that counted them
+    remove_patient(db, patient)
     db.commit()
     return {"message": "Patient deleted successfully"}
 
@@ -241,9 +466,21 @@ def delete_patient(
 def get_patient_calculations(
     patient_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Get nutritional calculations for a patient."""
+    calculations = db.query(PatientCalculation)\
+        .join(Patient, Patient.id == PatientCalculation.patient_id)\
+        .filter(
+            PatientCalculation.patient_id == patient_id,
+            Patient.nutritionist_id == current_user.id
+        )\
+        .first()
+    
+    if calculations and calculations.computed_on == date.today():
+        return calculations
+    
+    # Missing or computed on a previous day (age-dependent values may be stale)
     patient = db.query(Patient).filter(
         Patient.id == patient_id,
         Patient.nutritionist_id == current_user.id
@@ -252,42 +489,17 @@ def get_patient_calculations(
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    # Calculate values
-    bmi = calculate_bmi(patient.weight, patient.height)
-    bmi_category = get_bmi_category(bmi)
-    ideal_weight = calculate_ideal_weight(patient.gender, patient.height)
-    adjusted_weight = calculate_adjusted_weight(patient.weight, ideal_weight)
-    age = calculate_age(patient.birth_date)
-    caloric_requirement = calculate_caloric_requirement(
-        gender=patient.gender,
-        weight=patient.weight,
-        height=patient.height,
-        age=age,
-        activity_level=patient.activity_level,
-        patient_type=patient.patient_type
-    )
-    
-    return PatientCalculations(
-        bmi=bmi,
-        bmi_category=bmi_category,
-        ideal_weight=ideal_weight,
-        adjusted_weight=adjusted_weight,
-        caloric_requirement=caloric_requirement,
-        age=age
-    )
+    calculations = store_patient_calculations(db, patient)
+    db.commit()
+    db.refresh(calculations)
+    return calculations
 
-@router.get("/search/{query}")
+@router.get("/search/{query}", response_model=List[PatientResponse])
 def search_patients(
     query: str,
+    limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    """Search patients by name or identification."""
-    patients = db.query(Patient).filter(
-        Patient.nutritionist_id == current_user.id,
-        (Patient.first_name.contains(query) | 
-         Patient.last_name.contains(query) | 
-         Patient.identification.contains(query))
-    ).all()
-    
-    return patients
+    """Search patients by name or identification (accent-insensitive, best matches first)."""
+    return run_patient_search(db, query, nutritionist_id=current_user.id, limit=limit)
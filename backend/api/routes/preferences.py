@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_async_db
 from models.patient_preferences import PatientPreferences
 from models.patient import Patient
 from pydantic import BaseModel
@@ -108,11 +110,12 @@ def create_preferences(preferences: PreferencesCreate, db: Session = Depends(get
     return new_preferences
 
 @router.get("/patient/{patient_id}", response_model=PreferencesResponse)
-def get_patient_preferences(patient_id: int, db: Session = Depends(get_db)):
+async def get_patient_preferences(patient_id: int, db: AsyncSession = Depends(get_async_db)):
     """Obtener preferencias de un paciente"""
-    preferences = db.query(PatientPreferences)\
-        .filter(PatientPreferences.patient_id == patient_id)\
-        .first()
+    result = await db.execute(
+        select(PatientPreferences).where(PatientPreferences.patient_id == patient_id)
+    )
+    preferences = result.scalars().first()
     
     if not preferences:
         raise HTTPException(status_code=404, detail="Preferencias no encontradas")
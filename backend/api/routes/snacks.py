@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from typing import List, Literal
+from database import get_db, get_async_db, SessionLocal
 from models.snack import Snack, SnackCategory
 from pydantic import BaseModel
+from utils.catalog_cache import cached_catalog_response, catalog_key
+from utils.seed_data import apply_seed
+from utils.snack_index import get_snack_index, rebuild_snack_index
+from utils.serialization import ListSerializer
 
 router = APIRouter()
 
@@ -42,6 +48,18 @@ class SnackResponse(BaseModel):
     class Config:
         from_attributes = True
 
+_snack_list = ListSerializer(SnackResponse)
+
+def _serialize_snack(snack: Snack) -> bytes:
+    return SnackResponse.model_validate(snack).model_dump_json().encode()
+
+_SORT_COLUMNS = {
+    "id": Snack.id,
+    "name": func.lower(Snack.name),
+    "calories": Snack.calories,
+    "proteins": Snack.proteins
+}
+
 # Endpoints
 @router.post("/", response_model=SnackResponse)
 def create_snack(snack: SnackCreate, db: Session = Depends(get_db)):
@@ -53,30 +71,92 @@ def create_snack(snack: SnackCreate, db: Session = Depends(get_db)):
     return db_snack
 
 @router.get("/", response_model=List[SnackResponse])
-def get_snacks(
+async def get_snacks(
+    request: Request,
+    background_tasks: BackgroundTasks,
     category: SnackCategory | None = None,
     vegetarian: bool | None = None,
     vegan: bool | None = None,
     diabetic_friendly: bool | None = None,
     low_sodium: bool | None = None,
-    db: Session = Depends(get_db)
+    min_calories: float | None = None,
+    max_calories: float | None = None,
+    min_proteins: float | None = None,
+    max_proteins: float | None = None,
+    sort: Literal["id", "name", "calories", "proteins"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    skip: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Obtener lista de snacks con filtros opcionales"""
-    query = db.query(Snack)
+    """
+    Obtener lista de snacks con filtros opcionales, rangos de calorías/proteínas,
+    orden y paginación (cacheada, con ETag). Se resuelve con el índice en memoria;
+    si aún no está construido se consulta la base de datos y se reconstruye en
+    segundo plano.
+    """
+    flags = {
+        "is_vegetarian": vegetarian,
+        "is_vegan": vegan,
+        "is_diabetic_friendly": diabetic_friendly,
+        "is_low_sodium": low_sodium
+    }
     
-    if category:
-        query = query.filter(Snack.category == category)
-    if vegetarian is not None:
-        query = query.filter(Snack.is_vegetarian == vegetarian)
-    if vegan is not None:
-        query = query.filter(Snack.is_vegan == vegan)
-    if diabetic_friendly is not None:
-        query = query.filter(Snack.is_diabetic_friendly == diabetic_friendly)
-    if low_sodium is not None:
-        query = query.filter(Snack.is_low_sodium == low_sodium)
+    async def build() -> bytes:
+        index = get_snack_index()
+        if index is not None:
+            return index.query(
+                category=category.value if category else None,
+                flags=flags,
+                min_calories=min_calories,
+                max_calories=max_calories,
+                min_proteins=min_proteins,
+                max_proteins=max_proteins,
+                sort=sort,
+                descending=order == "desc",
+                skip=skip,
+                limit=limit
+            )
+        
+        background_tasks.add_task(rebuild_snack_index, SessionLocal, _serialize_snack)
+        query = select(Snack)
+        
+        if category:
+            query = query.where(Snack.category == category)
+        for field, value in flags.items():
+            if value is not None:
+                query = query.where(getattr(Snack, field) == value)
+        if min_calories is not None:
+            query = query.where(Snack.calories >= min_calories)
+        if max_calories is not None:
+            query = query.where(Snack.calories <= max_calories)
+        if min_proteins is not None:
+            query = query.where(Snack.proteins >= min_proteins)
+        if max_proteins is not None:
+            query = query.where(Snack.proteins <= max_proteins)
+        
+        column = _SORT_COLUMNS[sort]
+        if order == "desc":
+            query = query.order_by(column.desc().nulls_last(), Snack.id.desc())
+        else:
+            query = query.order_by(column.asc().nulls_last(), Snack.id)
+        
+        result = await db.execute(query.offset(skip).limit(limit))
+        return _snack_list.dump(result.scalars().all())
     
-    snacks = query.all()
-    return snacks
+    key = catalog_key(
+        category=category,
+        min_calories=min_calories,
+        max_calories=max_calories,
+        min_proteins=min_proteins,
+        max_proteins=max_proteins,
+        sort=sort,
+        order=order,
+        skip=skip,
+        limit=limit,
+        **flags
+    )
+    return await cached_catalog_response(request, "snacks", key, build)
 
 @router.get("/{snack_id}", response_model=SnackResponse)
 def get_snack(snack_id: int, db: Session = Depends(get_db)):
@@ -112,160 +192,9 @@ def delete_snack(snack_id: int, db: Session = Depends(get_db)):
     return {"message": "Snack eliminado exitosamente"}
 
 @router.post("/seed-default-snacks")
-def seed_default_snacks(db: Session = Depends(get_db)):
-    """Crear snacks de ejemplo predefinidos"""
-    default_snacks = [
-        {
-            "name": "Yogur con Frutas y Granola",
-            "category": SnackCategory.MIXED,
-            "description": "Delicioso y nutritivo snack perfecto para cualquier momento del día",
-            "recipe": "Ingredientes:\n- 1 taza de yogur griego natural\n- 1/2 taza de frutas frescas (fresas, arándanos, mango)\n- 2 cucharadas de granola casera\n- 1 cucharadita de miel (opcional)\n\nPreparación:\n1. Coloca el yogur en un bowl\n2. Añade las frutas cortadas\n3. Espolvorea la granola encima\n4. Agrega la miel si deseas",
-            "calories": 250,
-            "proteins": 15,
-            "carbohydrates": 35,
-            "fats": 6,
-            "is_vegetarian": True,
-            "is_vegan": False,
-            "is_diabetic_friendly": False,
-            "is_low_sodium": True
-        },
-        {
-            "name": "Hummus con Vegetales",
-            "category": SnackCategory.PROTEIN,
-            "description": "Snack alto en proteína vegetal y fibra",
-            "recipe": "Ingredientes:\n- 1/2 taza de hummus casero o comercial\n- Zanahorias baby\n- Apio en bastones\n- Pimientos de colores\n- Pepino en rodajas\n\nPreparación:\n1. Lava y corta los vegetales\n2. Sirve el hummus en un bowl pequeño\n3. Acomoda los vegetales alrededor\n4. ¡Listo para disfrutar!",
-            "calories": 180,
-            "proteins": 8,
-            "carbohydrates": 22,
-            "fats": 7,
-            "is_vegetarian": True,
-            "is_vegan": True,
-            "is_diabetic_friendly": True,
-            "is_low_sodium": True
-        },
-        {
-            "name": "Tostadas de Aguacate",
-            "category": SnackCategory.SALTY,
-            "description": "Clásico snack saludable y delicioso",
-            "recipe": "Ingredientes:\n- 2 rebanadas de pan integral\n- 1/2 aguacate maduro\n- Tomate cherry\n- Limón\n- Sal y pimienta al gusto\n- Semillas de ajonjolí (opcional)\n\nPreparación:\n1. Tuesta el pan\n2. Machaca el aguacate con limón, sal y pimienta\n3. Unta sobre el pan tostado\n4. Decora con tomate cherry y semillas",
-            "calories": 220,
-            "proteins": 7,
-            "carbohydrates": 25,
-            "fats": 11,
-            "is_vegetarian": True,
-            "is_vegan": True,
-            "is_diabetic_friendly": True,
-            "is_low_sodium": False
-        },
-        {
-            "name": "Energy Balls de Dátiles",
-            "category": SnackCategory.SWEET,
-            "description": "Bolitas energéticas sin azúcar añadida",
-            "recipe": "Ingredientes:\n- 1 taza de dátiles sin semilla\n- 1/2 taza de almendras\n- 2 cucharadas de cacao en polvo\n- 1 cucharada de mantequilla de maní\n- Coco rallado para decorar\n\nPreparación:\n1. Procesa todos los ingredientes en un procesador\n2. Forma bolitas con las manos\n3. Rueda en coco rallado\n4. Refrigera por 30 minutos",
-            "calories": 150,
-            "proteins": 4,
-            "carbohydrates": 20,
-            "fats": 7,
-            "is_vegetarian": True,
-            "is_vegan": True,
-            "is_diabetic_friendly": False,
-            "is_low_sodium": True
-        },
-        {
-            "name": "Palomitas de Maíz Caseras",
-            "category": SnackCategory.SALTY,
-            "description": "Snack bajo en calorías y alto en fibra",
-            "recipe": "Ingredientes:\n- 3 cucharadas de maíz para palomitas\n- 1 cucharadita de aceite de coco\n- Sal al gusto (opcional)\n- Especias opcionales (paprika, ajo en polvo)\n\nPreparación:\n1. Calienta el aceite en una olla grande\n2. Agrega el maíz y tapa\n3. Mueve la olla constantemente\n4. Sazona al gusto cuando estén listas",
-            "calories": 100,
-            "proteins": 3,
-            "carbohydrates": 18,
-            "fats": 3,
-            "is_vegetarian": True,
-            "is_vegan": True,
-            "is_diabetic_friendly": True,
-            "is_low_sodium": True
-        },
-        {
-            "name": "Batido Verde Proteico",
-            "category": SnackCategory.PROTEIN,
-            "description": "Batido nutritivo post-entrenamiento",
-            "recipe": "Ingredientes:\n- 1 taza de espinaca fresca\n- 1 plátano congelado\n- 1 scoop de proteína en polvo\n- 1 taza de leche de almendras\n- 1 cucharada de mantequilla de maní\n- Hielo al gusto\n\nPreparación:\n1. Coloca todos los ingredientes en la licuadora\n2. Licúa hasta obtener consistencia suave\n3. Sirve inmediatamente",
-            "calories": 280,
-            "proteins": 28,
-            "carbohydrates": 30,
-            "fats": 8,
-            "is_vegetarian": True,
-            "is_vegan": False,
-            "is_diabetic_friendly": False,
-            "is_low_sodium": True
-        },
-        {
-            "name": "Manzana con Mantequilla de Almendras",
-            "category": SnackCategory.FRUIT,
-            "description": "Simple, delicioso y nutritivo",
-            "recipe": "Ingredientes:\n- 1 manzana mediana\n- 2 cucharadas de mantequilla de almendras\n- Canela al gusto (opcional)\n\nPreparación:\n1. Lava y corta la manzana en rodajas\n2. Unta cada rodaja con mantequilla de almendras\n3. Espolvorea canela si deseas\n4. ¡Disfruta!",
-            "calories": 220,
-            "proteins": 6,
-            "carbohydrates": 28,
-            "fats": 11,
-            "is_vegetarian": True,
-            "is_vegan": True,
-            "is_diabetic_friendly": True,
-            "is_low_sodium": True
-        },
-        {
-            "name": "Rollitos de Jamón y Queso",
-            "category": SnackCategory.PROTEIN,
-            "description": "Snack alto en proteína, bajo en carbohidratos",
-            "recipe": "Ingredientes:\n- 4 lonchas de jamón de pavo bajo en sodio\n- 2 rebanadas de queso bajo en grasa\n- Pepinillos en vinagre\n- Mostaza (opcional)\n\nPreparación:\n1. Extiende las lonchas de jamón\n2. Coloca 1/2 rebanada de queso en cada una\n3. Añade un pepinillo\n4. Enrolla y asegura con palillo\n5. Sirve frío",
-            "calories": 120,
-            "proteins": 15,
-            "carbohydrates": 2,
-            "fats": 6,
-            "is_vegetarian": False,
-            "is_vegan": False,
-            "is_diabetic_friendly": True,
-            "is_low_sodium": False
-        },
-        {
-            "name": "Edamame con Sal Marina",
-            "category": SnackCategory.PROTEIN,
-            "description": "Snack oriental rico en proteína vegetal",
-            "recipe": "Ingredientes:\n- 1 taza de edamame congelado\n- Sal marina\n- Limón (opcional)\n\nPreparación:\n1. Hierve agua con sal\n2. Cocina el edamame por 5 minutos\n3. Escurre y sirve caliente\n4. Espolvorea sal marina y limón al gusto",
-            "calories": 120,
-            "proteins": 11,
-            "carbohydrates": 10,
-            "fats": 5,
-            "is_vegetarian": True,
-            "is_vegan": True,
-            "is_diabetic_friendly": True,
-            "is_low_sodium": True
-        },
-        {
-            "name": "Gelatina Proteica con Frutas",
-            "category": SnackCategory.SWEET,
-            "description": "Postre ligero y refrescante",
-            "recipe": "Ingredientes:\n- 1 sobre de gelatina sin azúcar\n- 1 scoop de proteína en polvo (sabor vainilla)\n- 1 taza de frutas mixtas\n- Agua según instrucciones\n\nPreparación:\n1. Prepara la gelatina según instrucciones\n2. Mezcla la proteína en polvo\n3. Añade las frutas cortadas\n4. Refrigera hasta que cuaje\n5. Sirve frío",
-            "calories": 150,
-            "proteins": 20,
-            "carbohydrates": 18,
-            "fats": 1,
-            "is_vegetarian": True,
-            "is_vegan": False,
-            "is_diabetic_friendly": True,
-            "is_low_sodium": True
-        }
-    ]
-    
-    created_snacks = []
-    for snack_data in default_snacks:
-        existing = db.query(Snack).filter(Snack.name == snack_data["name"]).first()
-        if not existing:
-            db_snack = Snack(**snack_data)
-            db.add(db_snack)
-            created_snacks.append(snack_data["name"])
-    
-    db.commit()
-    return {"message": f"Snacks creados: {len(created_snacks)}", "snacks": created_snacks}
-
-
+def seed_default_snacks(force: bool = False, db: Session = Depends(get_db)):
+    """Cargar o actualizar los snacks predefinidos (seed_data/snacks.json)"""
+    result = apply_seed(db, "snacks", force=force)
+    if not result["applied"]:
+        return {"message": f"Snacks predefinidos al día (versión {result['version']})", "snacks": []}
+    return {"message": f"Snacks creados o actualizados: {result['rows']}", "snacks": result["names"]}
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark of list response serialization: FastAPI's default path versus the
+precompiled ListSerializer (utils/serialization.py).
+
+    python benchmark_serialization.py [--rows 1000 10000] [--repeat 5]
+
+"before" is what FastAPI does for `response_model=List[Model]`: validate the
+objects, dump them to Python (mode="json") and encode with JSONResponse (stdlib
+json). "orjson" is the same path rendered by ORJSONResponse, the app's default
+response class now. "after" is ListSerializer.dump, straight to JSON bytes.
+Rows are attribute objects shaped like the ORM rows; no database is needed.
+"""
+import argparse
+import os
+import statistics
+import time
+import typing
+from datetime import date, datetime
+from enum import Enum
+from types import SimpleNamespace
+
+# The response schemas live in the route modules, which import `database`:
+# point it at an in-memory SQLite database so no server is needed
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+
+from api.routes.consultations import ConsultationResponse
+from api.routes.meal_plans import MealPlanResponse
+from api.routes.menus import MenuResponse
+from api.routes.patients_auth import PatientResponse
+from utils.serialization import ListSerializer
+
+MODELS = {
+    "patients": PatientResponse,
+    "consultations": ConsultationResponse,
+    "meal_plans": MealPlanResponse,
+    "menus": MenuResponse
+}
+
+
+def _sample_value(annotation, index: int):
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    if typing.get_origin(annotation) in (list, typing.List):
+        return [_sample_row(args[0], item) for item in range(5)]
+    if args:
+        annotation = args[0]
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return _sample_row(annotation, index)
+        if issubclass(annotation, Enum):
+            return list(annotation)[index % len(annotation)]
+        if issubclass(annotation, bool):
+            return index % 2 == 0
+        if issubclass(annotation, int):
+            return index
+        if issubclass(annotation, float):
+            return 50 + (index % 500) / 7
+        if issubclass(annotation, datetime):
+            return datetime(2024, 1, 1, 9, 30)
+        if issubclass(annotation, date):
+            return date(1990, 1, 1)
+    return f"Texto de ejemplo {index} con tildes: nutrición"
+
+
+def _sample_row(model, index: int):
+    return SimpleNamespace(**{
+        name: _sample_value(field.annotation, index) for name, field in model.model_fields.items()
+    })
+
+
+def _timed(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def _fastapi_body(field, rows, response_class):
+    content = await serialize_response(field=field, response_content=rows)
+    return response_class(content).body
+
+
+def main(argv=None):
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de listas")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    loop = asyncio.new_event_loop()
+    print(f"{'model':<14}{'rows':>8}{'before ms':>12}{'orjson ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, model in MODELS.items():
+        field = create_response_field(name=f"Response_{name}", type_=typing.List[model])
+        serializer = ListSerializer(model)
+        for count in args.rows:
+            rows = [_sample_row(model, index) for index in range(count)]
+            assert ORJSONResponse(None).render(
+                loop.run_until_complete(serialize_response(field=field, response_content=rows))
+            ) == serializer.dump(rows)
+
+            before = _timed(lambda: loop.run_until_complete(_fastapi_body(field, rows, JSONResponse)), args.repeat)
+            with_orjson = _timed(lambda: loop.run_until_complete(_fastapi_body(field, rows, ORJSONResponse)), args.repeat)
+            after = _timed(lambda: serializer.dump(rows), args.repeat)
+            print(f"{name:<14}{count:>8}{before:>12.1f}{with_orjson:>12.1f}{after:>12.1f}{before / after:>9.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
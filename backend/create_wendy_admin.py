@@ -9,7 +9,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from database import get_db, engine
 from models.user import User, UserRole, SubscriptionStatus, SubscriptionPlan
-from utils.auth import get_password_hash
+from utils.password_hashing import hash_password
 
 def create_wendy_admin():
     """Crear usuario administrador para Wendy"""
@@ -38,7 +38,7 @@ def create_wendy_admin():
         # Crear usuario administrador
         admin_user = User(
             email=email,
-            password_hash=get_password_hash(password),
+            password_hash=hash_password(password),
             first_name=first_name,
             last_name=last_name,
             role=UserRole.admin,
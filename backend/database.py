@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 import os
 
 # Database URL - Automatically detects environment
@@ -11,15 +14,102 @@ DATABASE_URL = os.getenv(
     "sqlite:///./nutriyess.db"
 )
 
-# SQLite specific configuration
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Some providers still hand out the legacy postgres:// scheme
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+# Pool configuration (ignored for SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds waiting for a connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before reconnecting
+
+# SQLite configuration (development)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def _configure_sqlite(engine, in_memory: bool):
+    """Enable WAL, relaxed fsync and a busy timeout on every new SQLite connection."""
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+def to_async_url(url: str) -> str:
+    """Map the sync DATABASE_URL to its async driver (aiosqlite / asyncpg)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        query = dict(parsed.query)
+        # asyncpg takes `ssl` instead of libpq's `sslmode`
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return parsed.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+    return url
+
+def create_db_engine(url: str = DATABASE_URL):
+    """Create the SQLAlchemy engine with pool settings taken from the environment."""
+    if url.startswith("sqlite"):
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            pool_pre_ping=True
+        )
+        _configure_sqlite(engine, in_memory=":memory:" in url or url in ("sqlite://", "sqlite:///"))
+        return engine
+
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True
+    )
+
+def create_async_db_engine(url: str = DATABASE_URL):
+    """Async counterpart of create_db_engine, with the same pool settings."""
+    async_url = to_async_url(url)
+    if url.startswith("sqlite"):
+        async_engine = create_async_engine(async_url, pool_pre_ping=True)
+        _configure_sqlite(async_engine.sync_engine, in_memory=":memory:" in url or url in ("sqlite://", "sqlite:///"))
+        return async_engine
+
+    return create_async_engine(
+        async_url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True
+    )
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+def get_pool_status() -> dict:
+    """Connection pool statistics for the health endpoint."""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow()
+        })
+    return stats
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -28,3 +118,7 @@ def get_db():
     finally:
         db.close()
 
+# Async dependency, for handlers declared with `async def`
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,6 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
+import os
+
+from utils.serialization import DefaultJSONResponse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -9,10 +12,33 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="NutriYess API",
     description="API para gestión nutricional de pacientes",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=DefaultJSONResponse
+)
+
+# Count SQL statements per request (X-Query-Count) and log requests over budget
+from database import engine as db_engine, async_engine as db_async_engine
+from middleware import QueryBudgetMiddleware, install_query_counter
+install_query_counter(db_engine, db_async_engine.sync_engine)
+app.add_middleware(QueryBudgetMiddleware)
+
+# gzip/brotli by Accept-Encoding; catalog bodies arrive already compressed
+from middleware import CompressionMiddleware
+app.add_middleware(
+    CompressionMiddleware,
+    route_thresholds={
+        "/api/auth": None,  # tokens in the body: never compressed (BREACH)
+        "/health": None
+    }
 )
 
-# Configure CORS
+# Per-client budgets (429), then load shedding with 503 before the threadpool saturates
+from middleware import ConcurrencyLimitMiddleware, RateLimitMiddleware
+app.add_middleware(ConcurrencyLimitMiddleware)
+app.add_middleware(RateLimitMiddleware)
+
+# Configure CORS (added last so it is the outermost layer: 429/503 responses
+# from the middleware above still carry the CORS headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Permitir todos los orígenes temporalmente
@@ -27,7 +53,13 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    from database import get_pool_status
+    from utils.password_hashing import get_hashing_stats
+    return {
+        "status": "healthy",
+        "database": get_pool_status(),
+        "password_hashing": get_hashing_stats()
+    }
 
 # Importar rutas solo después de que la app esté creada
 try:
@@ -86,16 +118,38 @@ try:
 except Exception as e:
     logger.error(f"Error loading preferences router: {e}")
 
+try:
+    from api.routes import analytics
+    app.include_router(analytics.router, prefix="/api/analytics", tags=["Estadísticas"])
+    logger.info("Analytics router loaded successfully")
+except Exception as e:
+    logger.error(f"Error loading analytics router: {e}")
+
 @app.on_event("startup")
 async def startup_event():
-    """Create database tables on startup"""
+    """Check the schema revision on startup (migrations run with `python manage.py migrate`)"""
+    # Fork the hashing workers before the server starts its thread pool
+    from utils.password_hashing import hashing_pool
+    hashing_pool.start()
+    
     try:
-        logger.info("Creating database tables...")
-        from database import engine, Base
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully")
+        from database import engine
+        from utils.migrations import check_schema_revision, upgrade_database
+        if not check_schema_revision(engine) and os.getenv("AUTO_MIGRATE", "").lower() in ("1", "true", "yes"):
+            logger.info("AUTO_MIGRATE set, applying migrations...")
+            upgrade_database()
+        # Don't fail startup if the schema is behind; the error above says what to run
     except Exception as e:
-        logger.error(f"Error creating database tables: {e}")
-        # Don't fail startup if database creation fails
-
+        logger.error(f"Error checking database schema revision: {e}")
+    
+    try:
+        from database import engine
+        from utils.patient_search import detect_search_index
+        detect_search_index(engine)
+    except Exception as e:
+        logger.error(f"Error detecting patient search index: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    from utils.password_hashing import hashing_pool
+    hashing_pool.shutdown()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tareas de mantenimiento de NutriYess ejecutadas fuera del servidor web.
+Uso: python manage.py <comando>
+
+Comandos:
+    migrate                  Aplica las migraciones pendientes (ejecutar antes de iniciar el servidor)
+    refresh-calculations     Recalcula los cálculos nutricionales vencidos (ejecutar a diario)
+    refresh-weight-changes   Recalcula el cambio de peso de todas las consultas
+    refresh-body-composition Recalcula la composición corporal de todas las consultas
+    rebuild-analytics        Reconstruye el resumen semanal de consultas
+    seed                     Carga los datos predefinidos de seed_data/ (solo si cambió su versión)
+"""
+
+import argparse
+import logging
+import sys
+
+from database import SessionLocal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("manage")
+
+
+def migrate(args):
+    """Aplicar las migraciones y crear el índice de búsqueda de pacientes"""
+    from database import engine
+    from utils.migrations import current_revision, upgrade_database
+    from utils.patient_search import install_search_index
+
+    upgrade_database(args.revision)
+    logger.info(f"Base de datos en la revisión {current_revision(engine)}")
+    install_search_index(engine)
+    logger.info("Índice de búsqueda de pacientes listo")
+
+
+def refresh_calculations(args):
+    """Refrescar los cálculos nutricionales materializados"""
+    from utils.patient_calculations import refresh_stale_calculations
+
+    db = SessionLocal()
+    try:
+        refreshed = refresh_stale_calculations(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    logger.info(f"Cálculos actualizados: {refreshed} pacientes")
+
+
+def refresh_weight_changes(args):
+    """Recalcular el cambio de peso entre consultas de todos los pacientes"""
+    from utils.consultation_history import recompute_all_weight_changes
+
+    db = SessionLocal()
+    try:
+        processed = recompute_all_weight_changes(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    logger.info(f"Consultas revisadas: {processed}")
+
+
+def refresh_body_composition(args):
+    """Recalcular la composición corporal del historial de consultas"""
+    from utils.body_composition import recompute_all_body_composition
+
+    db = SessionLocal()
+    try:
+        processed = recompute_all_body_composition(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    logger.info(f"Consultas actualizadas: {processed}")
+
+
+def rebuild_analytics(args):
+    """Reconstruir el resumen semanal de consultas de todos los nutricionistas"""
+    from utils.analytics_rollup import rebuild_weekly_stats
+
+    db = SessionLocal()
+    try:
+        processed = rebuild_weekly_stats(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    logger.info(f"Consultas procesadas: {processed}")
+
+
+def seed(args):
+    """Cargar los catálogos predefinidos de seed_data/"""
+    from utils.seed_data import SEED_DATASETS, apply_seed
+
+    datasets = args.datasets or list(SEED_DATASETS)
+    unknown = set(datasets) - set(SEED_DATASETS)
+    if unknown:
+        raise SystemExit(f"Conjuntos desconocidos: {', '.join(sorted(unknown))}. Válidos: {', '.join(SEED_DATASETS)}")
+    db = SessionLocal()
+    try:
+        for dataset in datasets:
+            result = apply_seed(db, dataset, force=args.force)
+            if result["applied"]:
+                logger.info(f"{dataset}: versión {result['version']} aplicada ({result['rows']} filas)")
+            else:
+                logger.info(f"{dataset}: al día (versión {result['version']})")
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de NutriYess")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Aplica las migraciones pendientes")
+    migrate_parser.add_argument("--revision", default="head", help="Revisión destino (por defecto la última)")
+    migrate_parser.set_defaults(func=migrate)
+
+    refresh = subparsers.add_parser("refresh-calculations", help="Recalcula los cálculos nutricionales vencidos")
+    refresh.add_argument("--batch-size", type=int, default=1000)
+    refresh.set_defaults(func=refresh_calculations)
+
+    weight_changes = subparsers.add_parser("refresh-weight-changes", help="Recalcula el cambio de peso de todas las consultas")
+    weight_changes.add_argument("--batch-size", type=int, default=500, help="Pacientes por transacción")
+    weight_changes.set_defaults(func=refresh_weight_changes)
+
+    body_composition = subparsers.add_parser("refresh-body-composition", help="Recalcula la composición corporal de todas las consultas")
+    body_composition.add_argument("--batch-size", type=int, default=1000, help="Consultas por transacción")
+    body_composition.set_defaults(func=refresh_body_composition)
+
+    analytics = subparsers.add_parser("rebuild-analytics", help="Reconstruye el resumen semanal de consultas")
+    analytics.add_argument("--batch-size", type=int, default=5000, help="Filas leídas por lote")
+    analytics.set_defaults(func=rebuild_analytics)
+
+    seed_parser = subparsers.add_parser("seed", help="Carga los datos predefinidos de seed_data/")
+    seed_parser.add_argument("datasets", nargs="*", help="Conjuntos a cargar (por defecto todos)")
+    seed_parser.add_argument("--force", action="store_true", help="Aplicar aunque la versión registrada esté al día")
+    seed_parser.set_defaults(func=seed)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+from .query_budget import QueryBudgetMiddleware, count_queries, install_query_counter
+from .compression import CompressionMiddleware
+from .rate_limit import ConcurrencyLimitMiddleware, RateLimitMiddleware, login_throttle
+
+__all__ = [
+    "QueryBudgetMiddleware",
+    "count_queries",
+    "install_query_counter",
+    "CompressionMiddleware",
+    "ConcurrencyLimitMiddleware",
+    "RateLimitMiddleware",
+    "login_throttle"
+]
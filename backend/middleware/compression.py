@@ -0,0 +1,151 @@
+"""
+Response compression (gzip, and brotli when the optional `brotli` package is
+installed) negotiated through Accept-Encoding.
+
+Bodies smaller than the threshold are sent as is. The threshold can be set
+per path prefix, and a prefix mapped to None is never compressed: routes
+whose bodies carry secrets (tokens) are excluded to avoid BREACH-style
+attacks. Streaming responses are compressed chunk by chunk with a sync flush,
+so exports keep flowing while they are compressed.
+
+A strong ETag of a compressed response gets the encoding appended ("abc" ->
+"abc-gzip"): the compressed bytes differ from the identity ones, so they
+cannot share a strong validator.
+
+Responses that already carry a Content-Encoding (the catalog bodies are
+compressed once and cached, see utils/catalog_cache.py) or whose content type
+is already compressed (XLSX, images) pass through untouched.
+"""
+from typing import Dict, Optional
+
+from utils.compression import (
+    COMPRESSION_MIN_SIZE,
+    StreamCompressor,
+    compress,
+    is_compressible,
+    negotiate_encoding
+)
+
+
+def _header(headers, name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _with_vary(headers) -> list:
+    """Headers with Accept-Encoding added to Vary."""
+    vary = _header(headers, b"vary")
+    headers = [(key, value) for key, value in headers if key.lower() != b"vary"]
+    if vary and "accept-encoding" not in vary.lower():
+        vary = f"{vary}, Accept-Encoding"
+    headers.append((b"vary", (vary or "Accept-Encoding").encode("latin-1")))
+    return headers
+
+
+def _with_encoded_etag(headers, encoding: str) -> list:
+    """Headers with a strong ETag made specific to `encoding`, as CachedBody does."""
+    etag = _header(headers, b"etag")
+    if not etag or etag.startswith("W/") or not etag.endswith('"'):
+        return headers
+    headers = [(key, value) for key, value in headers if key.lower() != b"etag"]
+    headers.append((b"etag", f'{etag[:-1]}-{encoding}"'.encode("latin-1")))
+    return headers
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses. `route_thresholds` maps path
+    prefixes to their own minimum size (the longest prefix wins); None
+    disables compression for that prefix.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        route_thresholds: Optional[Dict[str, Optional[int]]] = None
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.route_thresholds = sorted((route_thresholds or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def threshold_for(self, path: str) -> Optional[int]:
+        for prefix, threshold in self.route_thresholds:
+            if path.startswith(prefix):
+                return threshold
+        return self.minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        threshold = self.threshold_for(scope["path"])
+        encoding = negotiate_encoding(_header(scope["headers"], b"accept-encoding")) if threshold is not None else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is not None:
+                data = compressor.chunk(body) if body else b""
+                if not more_body:
+                    data += compressor.finish()
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            # First body message: decide with the headers and the first chunk
+            headers = list(start_message.get("headers", []))
+            if start_message["status"] < 200 or start_message["status"] in (204, 304)\
+                    or _header(headers, b"content-encoding")\
+                    or not is_compressible(_header(headers, b"content-type")):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = _with_vary(headers)
+            if not more_body and len(body) < threshold:
+                passthrough = True
+                await send(dict(start_message, headers=headers))
+                await send(message)
+                return
+
+            headers = _with_encoded_etag(headers, encoding)
+            headers = [(key, value) for key, value in headers if key.lower() != b"content-length"]
+            headers.append((b"content-encoding", encoding.encode()))
+            if more_body:
+                compressor = StreamCompressor(encoding)
+                await send(dict(start_message, headers=headers))
+                await send({"type": "http.response.body", "body": compressor.chunk(body), "more_body": True})
+                return
+
+            body = compress(body, encoding)
+            headers.append((b"content-length", str(len(body)).encode()))
+            passthrough = True
+            await send(dict(start_message, headers=headers))
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+        # Responses without a body message (rare) still need their start
+        if start_message is not None and not passthrough and compressor is None:
+            await send(start_message)
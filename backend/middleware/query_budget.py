@@ -0,0 +1,101 @@
+"""
+Per-request SQL statement counter.
+
+Every statement executed through an instrumented engine is counted against
+the current request. The count is returned in the X-Query-Count header and
+requests over SQL_QUERY_BUDGET statements are logged (and flagged with
+X-Query-Budget-Exceeded), so N+1 regressions show up in logs and tests.
+
+Tests can assert on the header of a response, or count the statements of a
+block of code run in the current thread:
+
+    assert int(client.get("/api/meal-plans/1").headers["X-Query-Count"]) <= 2
+
+    with count_queries() as counter:
+        refresh_stale_calculations(db)
+    assert counter.count <= 10
+"""
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "20"))
+
+
+class QueryCounter:
+    """Mutable holder shared by every thread/task of one request."""
+
+    def __init__(self):
+        self.count = 0
+
+
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+_instrumented_engines = set()
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+def install_query_counter(*engines: Engine):
+    """Count the statements of the given (sync) engines; safe to call twice."""
+    for engine in engines:
+        if id(engine) in _instrumented_engines:
+            continue
+        event.listen(engine, "before_cursor_execute", _count_statement)
+        _instrumented_engines.add(id(engine))
+
+
+@contextmanager
+def count_queries():
+    """Count the statements executed inside the block."""
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+class QueryBudgetMiddleware:
+    """ASGI middleware reporting the statement count of each HTTP request."""
+
+    def __init__(self, app, budget: int = SQL_QUERY_BUDGET):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = QueryCounter()
+        token = _current_counter.set(counter)
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(counter.count).encode()))
+                if self.budget > 0 and counter.count > self.budget:
+                    headers.append((b"x-query-budget-exceeded", b"1"))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _current_counter.reset(token)
+            if self.budget > 0 and counter.count > self.budget:
+                logger.warning(
+                    f"{scope['method']} {scope['path']} executed {counter.count} SQL statements "
+                    f"(budget {self.budget})"
+                )
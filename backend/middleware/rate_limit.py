@@ -0,0 +1,324 @@
+"""
+Rate limiting and load shedding.
+
+RateLimitMiddleware keeps a token bucket per client and route class. Clients
+are identified by the user id of a valid bearer token, or by IP address for
+anonymous requests. A request that finds its bucket empty gets 429 with
+Retry-After. Each route class has its own budget, so a script
+hammering the patient search cannot use up the budget for regular reads, and
+the login/register endpoints (bcrypt) are limited per IP.
+
+ConcurrencyLimitMiddleware caps the requests in flight in the worker. A
+request that cannot get a slot within CONCURRENCY_QUEUE_TIMEOUT seconds is
+shed with 503 before it reaches the threadpool (40 threads by default), so an
+overload degrades into quick rejections instead of every request timing out.
+
+LoginThrottle adds a growing lockout after repeated failed logins for an email
+or an IP address; the login endpoint checks it before verifying the password.
+
+Behind a proxy the peer address is the proxy's. Only the X-Forwarded-For
+entries appended by our own proxies can be trusted: the client may send any
+value in the header and the proxy appends to it. With TRUSTED_PROXY_HOPS=N the
+client address is the Nth entry from the right (1 behind Railway's edge proxy).
+Trusting the whole header (uvicorn --forwarded-allow-ips="*" takes the first
+entry) would let a caller pick a new address, and a fresh budget, per request.
+
+Buckets live in the process (one set per worker). The login throttle uses
+utils.cache, so RATE_LIMIT_CACHE_URL=redis://... shares it between workers.
+
+Configuration (environment):
+    RATE_LIMIT_ENABLED            0 disables the per-client limits
+    RATE_LIMIT_<CLASS>            "<requests>/<seconds>" budget of a route class
+                                  (AUTH, SEARCH, BULK, WRITE, READ)
+    MAX_CONCURRENT_REQUESTS       requests in flight per worker (0 = unlimited)
+    CONCURRENCY_QUEUE_TIMEOUT     seconds a request may wait for a slot
+    LOGIN_FREE_ATTEMPTS           failed logins allowed before the lockout starts
+    LOGIN_LOCKOUT_SECONDS         first lockout; doubles with every further failure
+    LOGIN_LOCKOUT_MAX_SECONDS     longest lockout
+    TRUSTED_PROXY_HOPS            proxies in front of the app that append to
+                                  X-Forwarded-For (0 = use the peer address)
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from utils.cache import create_cache
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") not in ("0", "false", "no")
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "32"))
+CONCURRENCY_QUEUE_TIMEOUT = float(os.getenv("CONCURRENCY_QUEUE_TIMEOUT", "0.5"))
+LOGIN_FREE_ATTEMPTS = int(os.getenv("LOGIN_FREE_ATTEMPTS", "5"))
+LOGIN_LOCKOUT_SECONDS = float(os.getenv("LOGIN_LOCKOUT_SECONDS", "30"))
+LOGIN_LOCKOUT_MAX_SECONDS = float(os.getenv("LOGIN_LOCKOUT_MAX_SECONDS", "900"))
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+
+def _budget(route_class: str, default: str) -> Tuple[int, float]:
+    """(requests, seconds) from RATE_LIMIT_<CLASS>, e.g. "120/60"."""
+    name = f"RATE_LIMIT_{route_class.upper()}"
+    requests, _, seconds = os.getenv(name, default).partition("/")
+    budget = int(requests), float(seconds or 60)
+    # A bucket of 0 tokens never refills; RATE_LIMIT_ENABLED=0 turns the limits off
+    if budget[0] < 1 or budget[1] <= 0:
+        raise ValueError(f"{name} must be \"<requests>/<seconds>\" with both above 0, got {budget[0]}/{budget[1]:g}")
+    return budget
+
+
+# Route class -> (requests, seconds); the bucket holds `requests` tokens and
+# refills at requests/seconds per second
+RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    "auth": _budget("auth", "10/60"),
+    "search": _budget("search", "60/60"),
+    "bulk": _budget("bulk", "10/60"),
+    "write": _budget("write", "120/60"),
+    "read": _budget("read", "600/60")
+}
+
+# (route class, methods or None for any, path prefix); first match wins
+ROUTE_CLASSES = [
+    ("auth", {"POST"}, "/api/auth/login"),
+    ("auth", {"POST"}, "/api/auth/register"),
+    ("auth", {"POST"}, "/api/auth/change-password"),
+    ("search", None, "/api/patients/search"),
+    ("bulk", None, "/api/patients/import"),
+    ("bulk", None, "/api/patients/export"),
+    ("bulk", None, "/api/patients/calculations/bulk"),
+    ("bulk", None, "/api/consultations/export"),
+    ("bulk", None, "/api/meal-plans/batch"),
+    ("bulk", None, "/api/meal-plans/generate"),
+    ("bulk", None, "/api/analytics"),
+    ("write", {"POST", "PUT", "PATCH", "DELETE"}, "/api/"),
+    ("read", None, "/api/")
+]
+
+# Never limited: load balancer probes and the docs
+EXEMPT_PATHS = ("/health", "/docs", "/redoc", "/openapi.json")
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Route class of a request, or None if it is not limited."""
+    if path.startswith(EXEMPT_PATHS) or method == "OPTIONS":
+        return None
+    for name, methods, prefix in ROUTE_CLASSES:
+        if path.startswith(prefix) and (methods is None or method in methods):
+            return name
+    return None
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by (route class, client), with LRU eviction of idle clients."""
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]], max_keys: int = 100000):
+        self.limits = limits
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, route_class: str, client: str) -> float:
+        """Take a token; returns 0 on success or the seconds until one is available."""
+        capacity, period = self.limits[route_class]
+        rate = capacity / period
+        key = (route_class, client)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_ip(scope, trusted_hops: int = TRUSTED_PROXY_HOPS) -> Optional[str]:
+    """
+    Client address: the peer, or behind `trusted_hops` proxies the
+    X-Forwarded-For entry the outermost of them appended. Entries to its left
+    come from the client and are ignored.
+    """
+    client = scope.get("client")
+    peer = client[0] if client else None
+    if trusted_hops <= 0:
+        return peer
+    forwarded = [host.strip() for host in (_header(scope, b"x-forwarded-for") or "").split(",") if host.strip()]
+    return forwarded[-trusted_hops] if len(forwarded) >= trusted_hops else peer
+
+
+def client_key(scope) -> str:
+    """"user:<id>" for a valid bearer token, "ip:<address>" otherwise."""
+    authorization = _header(scope, b"authorization")
+    if authorization and authorization.lower().startswith("bearer "):
+        from utils.auth import verify_token
+
+        try:
+            return f"user:{verify_token(authorization[7:].strip())}"
+        except HTTPException:
+            pass
+    return f"ip:{client_ip(scope) or 'unknown'}"
+
+
+async def _send_error(send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 when a client exhausts its route-class budget."""
+
+    def __init__(self, app, limiter: Optional[TokenBucketLimiter] = None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.limiter = limiter or TokenBucketLimiter(RATE_LIMITS)
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        name = route_class(scope["method"], scope["path"])
+        if name is not None:
+            client = client_key(scope)
+            wait = self.limiter.acquire(name, client)
+            if wait > 0:
+                logger.info(f"Rate limited {client} on {scope['method']} {scope['path']} ({name})")
+                await _send_error(send, status.HTTP_429_TOO_MANY_REQUESTS, "Too many requests, please retry later", wait)
+                return
+
+        await self.app(scope, receive, send)
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware shedding requests with 503 when the worker is saturated."""
+
+    def __init__(
+        self,
+        app,
+        max_concurrent: int = MAX_CONCURRENT_REQUESTS,
+        queue_timeout: float = CONCURRENCY_QUEUE_TIMEOUT
+    ):
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.shed = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_concurrent <= 0 or scope["path"].startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        if self._semaphore is None:
+            # Created lazily so it belongs to the server's event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            logger.warning(f"Shedding {scope['method']} {scope['path']}: {self.in_flight} requests in flight")
+            await _send_error(send, status.HTTP_503_SERVICE_UNAVAILABLE, "Server busy, please retry", 1)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+
+class LoginThrottle:
+    """
+    Failed-login backoff per email and per IP. After `free_attempts` failures
+    (IP_ATTEMPTS_FACTOR times more for an IP, which a whole clinic may share)
+    each further failure locks the key for `lockout` seconds, doubling up to
+    `max_lockout`; a successful login clears the email.
+    """
+
+    IP_ATTEMPTS_FACTOR = 4
+
+    def __init__(
+        self,
+        free_attempts: int = LOGIN_FREE_ATTEMPTS,
+        lockout: float = LOGIN_LOCKOUT_SECONDS,
+        max_lockout: float = LOGIN_LOCKOUT_MAX_SECONDS,
+        url: Optional[str] = os.getenv("RATE_LIMIT_CACHE_URL")
+    ):
+        self.free_attempts = free_attempts
+        self.lockout = lockout
+        self.max_lockout = max_lockout
+        # Failures are forgotten once the longest lockout has passed without new ones
+        self._failures = create_cache("login-failures", ttl=max_lockout * 2, url=url)
+
+    @staticmethod
+    def _keys(email: str, ip: Optional[str]):
+        keys = [f"email:{email.strip().lower()}"]
+        if ip:
+            keys.append(f"ip:{ip}")
+        return keys
+
+    def check(self, email: str, ip: Optional[str]):
+        """Raise 429 with Retry-After while the email or the IP is locked out."""
+        now = time.time()
+        wait = max(
+            ((entry or {}).get("locked_until", 0) - now for entry in map(self._failures.get, self._keys(email, ip))),
+            default=0
+        )
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed login attempts, please retry later",
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+    def record_failure(self, email: str, ip: Optional[str]):
+        now = time.time()
+        for key in self._keys(email, ip):
+            failures = (self._failures.get(key) or {}).get("failures", 0) + 1
+            free = self.free_attempts * (self.IP_ATTEMPTS_FACTOR if key.startswith("ip:") else 1)
+            locked_until = 0
+            if failures > free:
+                locked_until = now + min(self.max_lockout, self.lockout * 2 ** min(failures - free - 1, 32))
+            self._failures.set(key, {"failures": failures, "locked_until": locked_until})
+
+    def record_success(self, email: str):
+        # The IP keeps its count: one valid account must not unlock guessing others
+        self._failures.delete(self._keys(email, None)[0])
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,54 @@
+"""
+Alembic environment: runs the revisions on the application's engine.
+
+The models are only imported for `alembic revision --autogenerate`; applying
+revisions needs nothing but the migration scripts.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import engine
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = None
+if getattr(config.cmd_opts, "autogenerate", False):
+    import models  # noqa: F401  (registers every table on Base.metadata)
+    from database import Base
+
+    target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Emit the SQL instead of executing it (`alembic upgrade head --sql`)."""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite"
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite cannot ALTER most things; batch mode rebuilds the table
+            render_as_batch=connection.dialect.name == "sqlite"
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
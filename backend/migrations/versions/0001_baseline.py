@@ -0,0 +1,363 @@
+"""Baseline: schema of the current models
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Databases created earlier with Base.metadata.create_all are adopted: existing
+tables are kept and only the missing columns and indexes are added.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(name, *elements):
+    """Create the table, or add the columns it is missing if it already exists."""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(name):
+        op.create_table(name, *elements)
+        return
+    existing = {column["name"] for column in inspector.get_columns(name)}
+    for element in elements:
+        if isinstance(element, sa.Column) and element.name not in existing:
+            # Existing rows have no value for it: NOT NULL only with a default
+            if element.server_default is None:
+                element.nullable = True
+            op.add_column(name, element)
+
+
+def _create_index(name, table, columns, **kwargs):
+    """Create the index unless a legacy database already has it."""
+    inspector = sa.inspect(op.get_bind())
+    if name not in {index["name"] for index in inspector.get_indexes(table)}:
+        op.create_index(name, table, columns, **kwargs)
+
+
+def upgrade() -> None:
+    _create_table('food_exchanges',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('category', sa.Enum('CEREALS', 'LEGUMES', 'VEGETABLES', 'FRUITS', 'MEAT', 'DAIRY', 'FATS', 'SUGARS', name='foodexchangecategory'), nullable=False),
+        sa.Column('portion_size', sa.String(), nullable=True),
+        sa.Column('portion_weight', sa.Float(), nullable=True),
+        sa.Column('calories', sa.Float(), nullable=True),
+        sa.Column('proteins', sa.Float(), nullable=True),
+        sa.Column('carbohydrates', sa.Float(), nullable=True),
+        sa.Column('fats', sa.Float(), nullable=True),
+        sa.Column('fiber', sa.Float(), nullable=True),
+        sa.Column('calcium', sa.Float(), nullable=True),
+        sa.Column('iron', sa.Float(), nullable=True),
+        sa.Column('sodium', sa.Float(), nullable=True),
+        sa.Column('potassium', sa.Float(), nullable=True),
+        sa.Column('vitamin_a', sa.Float(), nullable=True),
+        sa.Column('vitamin_c', sa.Float(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('is_custom', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_food_exchanges_id', 'food_exchanges', ['id'], unique=False)
+    _create_index('uq_food_exchanges_seed_key', 'food_exchanges', ['name', 'category'], unique=True, postgresql_where=sa.text('is_custom = false'), sqlite_where=sa.text('is_custom = false'))
+
+    _create_table('menus',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('category', sa.Enum('HEALTHY', 'DIABETES', 'HYPERTENSION', 'BLOATING', 'VEGETARIAN', 'VEGAN', 'ATHLETE', 'OTHER', name='menucategory'), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('calories', sa.Float(), nullable=True),
+        sa.Column('proteins', sa.Float(), nullable=True),
+        sa.Column('carbohydrates', sa.Float(), nullable=True),
+        sa.Column('fats', sa.Float(), nullable=True),
+        sa.Column('fiber', sa.Float(), nullable=True),
+        sa.Column('breakfast', sa.Text(), nullable=True),
+        sa.Column('morning_snack', sa.Text(), nullable=True),
+        sa.Column('lunch', sa.Text(), nullable=True),
+        sa.Column('afternoon_snack', sa.Text(), nullable=True),
+        sa.Column('dinner', sa.Text(), nullable=True),
+        sa.Column('is_custom', sa.Boolean(), nullable=True),
+        sa.Column('supplements', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_menus_id', 'menus', ['id'], unique=False)
+    _create_index('uq_menus_seed_key', 'menus', ['name', 'category'], unique=True, postgresql_where=sa.text('is_custom = false'), sqlite_where=sa.text('is_custom = false'))
+
+    _create_table('seed_versions',
+        sa.Column('dataset', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('rows', sa.Integer(), nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('dataset')
+    )
+
+    _create_table('snacks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('category', sa.Enum('SWEET', 'SALTY', 'PROTEIN', 'FRUIT', 'VEGETABLE', 'MIXED', name='snackcategory'), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('recipe', sa.Text(), nullable=True),
+        sa.Column('calories', sa.Float(), nullable=True),
+        sa.Column('proteins', sa.Float(), nullable=True),
+        sa.Column('carbohydrates', sa.Float(), nullable=True),
+        sa.Column('fats', sa.Float(), nullable=True),
+        sa.Column('is_vegetarian', sa.Boolean(), nullable=True),
+        sa.Column('is_vegan', sa.Boolean(), nullable=True),
+        sa.Column('is_diabetic_friendly', sa.Boolean(), nullable=True),
+        sa.Column('is_low_sodium', sa.Boolean(), nullable=True),
+        sa.Column('is_custom', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_snacks_category_calories', 'snacks', ['category', 'calories'], unique=False)
+    _create_index('ix_snacks_dietary_flags', 'snacks', ['is_vegan', 'is_vegetarian', 'is_diabetic_friendly', 'is_low_sodium', 'calories'], unique=False)
+    _create_index('ix_snacks_id', 'snacks', ['id'], unique=False)
+    _create_index('uq_snacks_seed_key', 'snacks', ['name', 'category'], unique=True, postgresql_where=sa.text('is_custom = false'), sqlite_where=sa.text('is_custom = false'))
+
+    _create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('password_hash', sa.String(), nullable=False),
+        sa.Column('first_name', sa.String(), nullable=False),
+        sa.Column('last_name', sa.String(), nullable=False),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('role', sa.Enum('nutricionista', 'admin', name='userrole'), nullable=True),
+        sa.Column('subscription_status', sa.Enum('trial', 'active', 'expired', 'cancelled', name='subscriptionstatus'), nullable=True),
+        sa.Column('subscription_plan', sa.Enum('basic', 'professional', 'enterprise', name='subscriptionplan'), nullable=True),
+        sa.Column('trial_start_date', sa.DateTime(), nullable=True),
+        sa.Column('trial_end_date', sa.DateTime(), nullable=True),
+        sa.Column('subscription_start_date', sa.DateTime(), nullable=True),
+        sa.Column('subscription_end_date', sa.DateTime(), nullable=True),
+        sa.Column('professional_license', sa.String(), nullable=True),
+        sa.Column('specialization', sa.String(), nullable=True),
+        sa.Column('clinic_name', sa.String(), nullable=True),
+        sa.Column('clinic_address', sa.Text(), nullable=True),
+        sa.Column('bio', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_verified', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_login', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_users_email', 'users', ['email'], unique=True)
+    _create_index('ix_users_id', 'users', ['id'], unique=False)
+
+    _create_table('consultation_weekly_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nutritionist_id', sa.Integer(), nullable=False),
+        sa.Column('week_start', sa.Date(), nullable=False),
+        sa.Column('consultations', sa.Integer(), nullable=False),
+        sa.Column('patients_seen', sa.Integer(), nullable=False),
+        sa.Column('weight_change_sum', sa.Float(), nullable=False),
+        sa.Column('weight_change_count', sa.Integer(), nullable=False),
+        sa.Column('appointments_due', sa.Integer(), nullable=False),
+        sa.Column('appointments_kept', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['nutritionist_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('nutritionist_id', 'week_start', name='uq_consultation_weekly_stats_week')
+    )
+    _create_index('ix_consultation_weekly_stats_id', 'consultation_weekly_stats', ['id'], unique=False)
+
+    _create_table('patients',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('first_name', sa.String(), nullable=False),
+        sa.Column('last_name', sa.String(), nullable=False),
+        sa.Column('identification', sa.String(), nullable=True),
+        sa.Column('birth_date', sa.Date(), nullable=False),
+        sa.Column('gender', sa.Enum('MALE', 'FEMALE', 'OTHER', name='gender'), nullable=False),
+        sa.Column('search_text', sa.String(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=False),
+        sa.Column('height', sa.Float(), nullable=False),
+        sa.Column('body_fat_percentage', sa.Float(), nullable=True),
+        sa.Column('muscle_mass', sa.Float(), nullable=True),
+        sa.Column('waist_circumference', sa.Float(), nullable=True),
+        sa.Column('hip_circumference', sa.Float(), nullable=True),
+        sa.Column('arm_circumference', sa.Float(), nullable=True),
+        sa.Column('thigh_circumference', sa.Float(), nullable=True),
+        sa.Column('calf_circumference', sa.Float(), nullable=True),
+        sa.Column('triceps_skinfold', sa.Float(), nullable=True),
+        sa.Column('biceps_skinfold', sa.Float(), nullable=True),
+        sa.Column('subscapular_skinfold', sa.Float(), nullable=True),
+        sa.Column('suprailiac_skinfold', sa.Float(), nullable=True),
+        sa.Column('abdominal_skinfold', sa.Float(), nullable=True),
+        sa.Column('medical_history', sa.Text(), nullable=True),
+        sa.Column('nutritional_history', sa.Text(), nullable=True),
+        sa.Column('allergies', sa.Text(), nullable=True),
+        sa.Column('medications', sa.Text(), nullable=True),
+        sa.Column('patient_type', sa.Enum('HEALTHY', 'HOSPITALIZED', 'ICU', 'ATHLETE', 'ADOLESCENT', 'ELDERLY', 'PREGNANT', name='patienttype'), nullable=True),
+        sa.Column('activity_level', sa.Enum('SEDENTARY', 'LIGHT', 'MODERATE', 'ACTIVE', 'VERY_ACTIVE', name='activitylevel'), nullable=True),
+        sa.Column('is_vegetarian', sa.Integer(), nullable=True),
+        sa.Column('has_diabetes', sa.Integer(), nullable=True),
+        sa.Column('has_hypertension', sa.Integer(), nullable=True),
+        sa.Column('has_bloating', sa.Integer(), nullable=True),
+        sa.Column('other_conditions', sa.Text(), nullable=True),
+        sa.Column('nutritionist_id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('address', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['nutritionist_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_patients_id', 'patients', ['id'], unique=False)
+    _create_index('ix_patients_identification', 'patients', ['identification'], unique=False)
+    _create_index('ix_patients_nutritionist_id_id', 'patients', ['nutritionist_id', 'id'], unique=False)
+    _create_index('ix_patients_nutritionist_updated_at', 'patients', ['nutritionist_id', 'updated_at', 'id'], unique=False)
+
+    _create_table('consultations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=True),
+        sa.Column('consultation_date', sa.DateTime(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.Column('height', sa.Float(), nullable=True),
+        sa.Column('bmi', sa.Float(), nullable=True),
+        sa.Column('weight_change', sa.Float(), nullable=True),
+        sa.Column('waist_circumference', sa.Float(), nullable=True),
+        sa.Column('hip_circumference', sa.Float(), nullable=True),
+        sa.Column('arm_circumference', sa.Float(), nullable=True),
+        sa.Column('thigh_circumference', sa.Float(), nullable=True),
+        sa.Column('calf_circumference', sa.Float(), nullable=True),
+        sa.Column('triceps_skinfold', sa.Float(), nullable=True),
+        sa.Column('biceps_skinfold', sa.Float(), nullable=True),
+        sa.Column('subscapular_skinfold', sa.Float(), nullable=True),
+        sa.Column('suprailiac_skinfold', sa.Float(), nullable=True),
+        sa.Column('abdominal_skinfold', sa.Float(), nullable=True),
+        sa.Column('body_fat_percentage', sa.Float(), nullable=True),
+        sa.Column('muscle_mass', sa.Float(), nullable=True),
+        sa.Column('body_density', sa.Float(), nullable=True),
+        sa.Column('body_fat_siri', sa.Float(), nullable=True),
+        sa.Column('body_fat_brozek', sa.Float(), nullable=True),
+        sa.Column('fat_mass', sa.Float(), nullable=True),
+        sa.Column('fat_free_mass', sa.Float(), nullable=True),
+        sa.Column('waist_hip_ratio', sa.Float(), nullable=True),
+        sa.Column('waist_height_ratio', sa.Float(), nullable=True),
+        sa.Column('arm_muscle_circumference', sa.Float(), nullable=True),
+        sa.Column('arm_muscle_area', sa.Float(), nullable=True),
+        sa.Column('activity_level_changed', sa.Integer(), nullable=True),
+        sa.Column('new_activity_level', sa.String(), nullable=True),
+        sa.Column('caloric_requirement', sa.Float(), nullable=True),
+        sa.Column('healthy_weight', sa.Float(), nullable=True),
+        sa.Column('adjusted_weight', sa.Float(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('recommendations', sa.Text(), nullable=True),
+        sa.Column('diet_plan', sa.Text(), nullable=True),
+        sa.Column('clinical_observations', sa.Text(), nullable=True),
+        sa.Column('next_appointment', sa.DateTime(), nullable=True),
+        sa.Column('follow_up_notes', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_consultations_id', 'consultations', ['id'], unique=False)
+    _create_index('ix_consultations_patient_date', 'consultations', ['patient_id', 'consultation_date'], unique=False)
+    _create_index('ix_consultations_patient_next_appointment', 'consultations', ['patient_id', 'next_appointment'], unique=False)
+
+    _create_table('meal_plans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=True),
+        sa.Column('date_created', sa.Date(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('total_calories', sa.Float(), nullable=True),
+        sa.Column('total_proteins', sa.Float(), nullable=True),
+        sa.Column('total_carbohydrates', sa.Float(), nullable=True),
+        sa.Column('total_fats', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_meal_plans_id', 'meal_plans', ['id'], unique=False)
+
+    _create_table('patient_calculations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('age', sa.Integer(), nullable=False),
+        sa.Column('bmi', sa.Float(), nullable=False),
+        sa.Column('bmi_category', sa.String(), nullable=False),
+        sa.Column('ideal_weight', sa.Float(), nullable=False),
+        sa.Column('adjusted_weight', sa.Float(), nullable=False),
+        sa.Column('tmb', sa.Float(), nullable=False),
+        sa.Column('caloric_requirement', sa.Float(), nullable=False),
+        sa.Column('proteins_g', sa.Float(), nullable=False),
+        sa.Column('carbs_g', sa.Float(), nullable=False),
+        sa.Column('fats_g', sa.Float(), nullable=False),
+        sa.Column('computed_on', sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_patient_calculations_computed_on', 'patient_calculations', ['computed_on'], unique=False)
+    _create_index('ix_patient_calculations_id', 'patient_calculations', ['id'], unique=False)
+    _create_index('ix_patient_calculations_patient_id', 'patient_calculations', ['patient_id'], unique=True)
+
+    _create_table('patient_preferences',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=True),
+        sa.Column('favorite_foods', sa.Text(), nullable=True),
+        sa.Column('disliked_foods', sa.Text(), nullable=True),
+        sa.Column('allergies', sa.Text(), nullable=True),
+        sa.Column('preferred_cooking_methods', sa.Text(), nullable=True),
+        sa.Column('cultural_restrictions', sa.Text(), nullable=True),
+        sa.Column('budget_level', sa.String(), nullable=True),
+        sa.Column('cooking_time_available', sa.String(), nullable=True),
+        sa.Column('likes_sweet', sa.Integer(), nullable=True),
+        sa.Column('likes_salty', sa.Integer(), nullable=True),
+        sa.Column('likes_spicy', sa.Integer(), nullable=True),
+        sa.Column('likes_sour', sa.Integer(), nullable=True),
+        sa.Column('likes_bitter', sa.Integer(), nullable=True),
+        sa.Column('prefers_soft_textures', sa.Boolean(), nullable=True),
+        sa.Column('prefers_crunchy_textures', sa.Boolean(), nullable=True),
+        sa.Column('breakfast_time', sa.String(), nullable=True),
+        sa.Column('lunch_time', sa.String(), nullable=True),
+        sa.Column('dinner_time', sa.String(), nullable=True),
+        sa.Column('snacks_per_day', sa.Integer(), nullable=True),
+        sa.Column('additional_notes', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('patient_id')
+    )
+    _create_index('ix_patient_preferences_id', 'patient_preferences', ['id'], unique=False)
+
+    _create_table('meal_plan_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('meal_plan_id', sa.Integer(), nullable=True),
+        sa.Column('meal_time', sa.String(), nullable=True),
+        sa.Column('food_item', sa.String(), nullable=True),
+        sa.Column('portion', sa.String(), nullable=True),
+        sa.Column('calories', sa.Float(), nullable=True),
+        sa.Column('proteins', sa.Float(), nullable=True),
+        sa.Column('carbohydrates', sa.Float(), nullable=True),
+        sa.Column('fats', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['meal_plan_id'], ['meal_plans.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    _create_index('ix_meal_plan_items_id', 'meal_plan_items', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    # Patient search index created by `manage.py migrate` (SQLite FTS5)
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS patients_fts")
+    op.drop_table('meal_plan_items')
+    op.drop_table('patient_preferences')
+    op.drop_table('patient_calculations')
+    op.drop_table('meal_plans')
+    op.drop_table('consultations')
+    op.drop_table('patients')
+    op.drop_table('consultation_weekly_stats')
+    op.drop_table('users')
+    op.drop_table('snacks')
+    op.drop_table('seed_versions')
+    op.drop_table('menus')
+    op.drop_table('food_exchanges')
+
+    if op.get_bind().dialect.name == "postgresql":
+        sa.Enum(name='activitylevel').drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name='foodexchangecategory').drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name='gender').drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name='menucategory').drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name='patienttype').drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name='snackcategory').drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name='subscriptionplan').drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name='subscriptionstatus').drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name='userrole').drop(op.get_bind(), checkfirst=True)
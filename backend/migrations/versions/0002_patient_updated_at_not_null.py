@@ -0,0 +1,33 @@
+"""Backfill patients.updated_at and make it NOT NULL
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+Tables adopted by 0001 got updated_at as a nullable column, so their existing
+rows have no value. The patient summary pages on (updated_at, id): a NULL
+there drops the row from the keyset comparison and cannot be encoded in a
+cursor. Rows without it take created_at (or the current time).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE patients SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) "
+        "WHERE updated_at IS NULL"
+    )
+    with op.batch_alter_table("patients") as batch_op:
+        batch_op.alter_column("updated_at", existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("patients") as batch_op:
+        batch_op.alter_column("updated_at", existing_type=sa.DateTime(), nullable=True)
@@ -5,7 +5,10 @@ from .consultation import Consultation
 from .food_exchange import FoodExchange, FoodExchangeCategory
 from .snack import Snack, SnackCategory
 from .patient_preferences import PatientPreferences
+from .patient_calculations import PatientCalculation
 from .user import User
+from .analytics import ConsultationWeeklyStats
+from .seed_version import SeedVersion
 
 __all__ = [
     "User",
@@ -19,7 +22,10 @@ __all__ = [
     "FoodExchangeCategory",
     "Snack",
     "SnackCategory",
-    "PatientPreferences"
+    "PatientPreferences",
+    "PatientCalculation",
+    "ConsultationWeeklyStats",
+    "SeedVersion"
 ]
 
 
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey, UniqueConstraint
+from database import Base
+
+class ConsultationWeeklyStats(Base):
+    """Weekly consultation rollup per nutritionist (see utils/analytics_rollup.py)"""
+    __tablename__ = "consultation_weekly_stats"
+    __table_args__ = (
+        UniqueConstraint("nutritionist_id", "week_start", name="uq_consultation_weekly_stats_week"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    nutritionist_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    week_start = Column(Date, nullable=False)  # Monday
+    
+    # Consultations held during the week
+    consultations = Column(Integer, nullable=False, default=0)
+    patients_seen = Column(Integer, nullable=False, default=0)
+    weight_change_sum = Column(Float, nullable=False, default=0.0)
+    weight_change_count = Column(Integer, nullable=False, default=0)
+    
+    # Follow-up appointments scheduled for the week and how many were attended
+    appointments_due = Column(Integer, nullable=False, default=0)
+    appointments_kept = Column(Integer, nullable=False, default=0)
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
 
 class Consultation(Base):
     __tablename__ = "consultations"
+    __table_args__ = (
+        # Upcoming appointments per patient
+        Index("ix_consultations_patient_next_appointment", "patient_id", "next_appointment"),
+        # Patient history in date order (previous/next consultation)
+        Index("ix_consultations_patient_date", "patient_id", "consultation_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"))
@@ -35,6 +41,17 @@ class Consultation(Base):
     body_fat_percentage = Column(Float)
     muscle_mass = Column(Float)
     
+    # Calculated body composition (utils/body_composition.py)
+    body_density = Column(Float)  # Durnin-Womersley (g/ml)
+    body_fat_siri = Column(Float)  # % grasa
+    body_fat_brozek = Column(Float)  # % grasa
+    fat_mass = Column(Float)  # kg
+    fat_free_mass = Column(Float)  # kg
+    waist_hip_ratio = Column(Float)
+    waist_height_ratio = Column(Float)
+    arm_muscle_circumference = Column(Float)  # cm
+    arm_muscle_area = Column(Float)  # cm², corregida
+    
     # Activity level changes
     activity_level_changed = Column(Integer, default=0)  # 0=no, 1=yes
     new_activity_level = Column(String)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Enum, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, Enum, Text, Boolean, Index, text
 from database import Base
 import enum
 
@@ -14,6 +14,11 @@ class FoodExchangeCategory(str, enum.Enum):
 
 class FoodExchange(Base):
     __tablename__ = "food_exchanges"
+    __table_args__ = (
+        # Natural key of packaged seed rows, used by the seed upsert (custom rows excluded)
+        Index("uq_food_exchanges_seed_key", "name", "category", unique=True,
+              postgresql_where=text("is_custom = false"), sqlite_where=text("is_custom = false")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
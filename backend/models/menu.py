@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Float, Text, Enum, Boolean, Index, text
 from database import Base
 import enum
 
@@ -14,6 +14,11 @@ class MenuCategory(str, enum.Enum):
 
 class Menu(Base):
     __tablename__ = "menus"
+    __table_args__ = (
+        # Natural key of packaged seed rows, used by the seed upsert (custom rows excluded)
+        Index("uq_menus_seed_key", "name", "category", unique=True,
+              postgresql_where=text("is_custom = false"), sqlite_where=text("is_custom = false")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
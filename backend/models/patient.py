@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Enum, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Enum, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
+from datetime import datetime
 import enum
 
 class Gender(str, enum.Enum):
@@ -26,14 +27,29 @@ class PatientType(str, enum.Enum):
 
 class Patient(Base):
     __tablename__ = "patients"
+    __table_args__ = (
+        # Keyset pagination of a nutritionist's patients by id or by last update
+        Index("ix_patients_nutritionist_id_id", "nutritionist_id", "id"),
+        Index("ix_patients_nutritionist_updated_at", "nutritionist_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    nutritionist_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
-    identification = Column(String, unique=True, index=True)
+    # Unique per nutritionist, not globally (checked when creating the patient)
+    identification = Column(String, index=True)
     birth_date = Column(Date, nullable=False)
     gender = Column(Enum(Gender), nullable=False)
     
+    # Normalized name + identification (lower-case, no accents), see utils/patient_search.py
+    search_text = Column(String)
+    
+    # Contact information
+    email = Column(String)
+    phone = Column(String)
+    address = Column(Text)
+    
     # Anthropometric data
     weight = Column(Float, nullable=False)  # kg
     height = Column(Float, nullable=False)  # cm
@@ -71,9 +87,15 @@ class Patient(Base):
     has_bloating = Column(Integer, default=0)
     other_conditions = Column(Text)
     
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+    
     # Relationships
+    nutritionist = relationship("User", back_populates="patients")
     consultations = relationship("Consultation", back_populates="patient", cascade="all, delete-orphan")
     meal_plans = relationship("MealPlan", back_populates="patient", cascade="all, delete-orphan")
     preferences = relationship("PatientPreferences", back_populates="patient", uselist=False, cascade="all, delete-orphan")
+    calculations = relationship("PatientCalculation", back_populates="patient", uselist=False, cascade="all, delete-orphan")
 
 
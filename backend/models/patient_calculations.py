@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy.orm import relationship
+from database import Base
+
+class PatientCalculation(Base):
+    __tablename__ = "patient_calculations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), unique=True, index=True, nullable=False)
+    
+    # Anthropometric values
+    age = Column(Integer, nullable=False)
+    bmi = Column(Float, nullable=False)
+    bmi_category = Column(String, nullable=False)
+    ideal_weight = Column(Float, nullable=False)
+    adjusted_weight = Column(Float, nullable=False)
+    
+    # Energy requirement and macronutrients
+    tmb = Column(Float, nullable=False)
+    caloric_requirement = Column(Float, nullable=False)
+    proteins_g = Column(Float, nullable=False)
+    carbs_g = Column(Float, nullable=False)
+    fats_g = Column(Float, nullable=False)
+    
+    # Date the values were computed; age-dependent values expire daily
+    computed_on = Column(Date, nullable=False, index=True)
+    
+    # Relationships
+    patient = relationship("Patient", back_populates="calculations")
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from database import Base
+from datetime import datetime
+
+class SeedVersion(Base):
+    """Version of each packaged seed dataset (seed_data/*.json) applied to the database"""
+    __tablename__ = "seed_versions"
+
+    dataset = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    rows = Column(Integer, nullable=False, default=0)
+    applied_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
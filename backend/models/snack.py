@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Float, Text, Enum, Boolean, Index, text
 from database import Base
 import enum
 
@@ -12,6 +12,14 @@ class SnackCategory(str, enum.Enum):
 
 class Snack(Base):
     __tablename__ = "snacks"
+    __table_args__ = (
+        # Used by the catalog listing while the in-memory snack index is cold
+        Index("ix_snacks_category_calories", "category", "calories"),
+        Index("ix_snacks_dietary_flags", "is_vegan", "is_vegetarian", "is_diabetic_friendly", "is_low_sodium", "calories"),
+        # Natural key of packaged seed rows, used by the seed upsert (custom rows excluded)
+        Index("uq_snacks_seed_key", "name", "category", unique=True,
+              postgresql_where=text("is_custom = false"), sqlite_where=text("is_custom = false")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Enum
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime, timedelta
@@ -53,64 +53,3 @@ class User(Base):
     
     # Relationships
     patients = relationship("Patient", back_populates="nutritionist", cascade="all, delete-orphan")
-    consultations = relationship("Consultation", back_populates="nutritionist", cascade="all, delete-orphan")
-    meal_plans = relationship("MealPlan", back_populates="nutritionist", cascade="all, delete-orphan")
-
-class Patient(Base):
-    __tablename__ = "patients"
-
-    id = Column(Integer, primary_key=True, index=True)
-    nutritionist_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    
-    # Personal information
-    first_name = Column(String, nullable=False)
-    last_name = Column(String, nullable=False)
-    identification = Column(String, index=True)
-    birth_date = Column(DateTime)
-    gender = Column(Enum('masculino', 'femenino', 'otro'), default='masculino')
-    
-    # Contact information
-    email = Column(String)
-    phone = Column(String)
-    address = Column(Text)
-    
-    # Anthropometric data
-    weight = Column(Float, nullable=False)  # kg
-    height = Column(Float, nullable=False)  # cm
-    
-    # Additional anthropometric data (optional)
-    body_fat_percentage = Column(Float)  # %
-    muscle_mass = Column(Float)  # kg
-    waist_circumference = Column(Float)  # cm
-    hip_circumference = Column(Float)  # cm
-    arm_circumference = Column(Float)  # cm
-    thigh_circumference = Column(Float)  # cm
-    calf_circumference = Column(Float)  # cm
-    triceps_skinfold = Column(Float)  # mm
-    biceps_skinfold = Column(Float)  # mm
-    subscapular_skinfold = Column(Float)  # mm
-    suprailiac_skinfold = Column(Float)  # mm
-    abdominal_skinfold = Column(Float)  # mm
-    
-    # Medical information
-    medical_history = Column(Text)
-    nutritional_history = Column(Text)
-    allergies = Column(Text)
-    medications = Column(Text)
-    patient_type = Column(Enum('sano', 'hospitalizado', 'uci', 'deportista', 'adolescente', 'adulto_mayor', 'embarazada'), default='sano')
-    activity_level = Column(Enum('sedentario', 'ligero', 'moderado', 'activo', 'muy_activo'), default='moderado')
-    is_vegetarian = Column(Integer, default=0)  # 0: Omnivore, 1: Vegetarian, 2: Vegan
-    has_diabetes = Column(Integer, default=0)
-    has_hypertension = Column(Integer, default=0)
-    has_bloating = Column(Integer, default=0)
-    other_conditions = Column(Text)
-    
-    # Timestamps
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
-    
-    # Relationships
-    nutritionist = relationship("User", back_populates="patients")
-    consultations = relationship("Consultation", back_populates="patient", cascade="all, delete-orphan")
-    meal_plans = relationship("MealPlan", back_populates="patient", cascade="all, delete-orphan")
-    preferences = relationship("PatientPreferences", back_populates="patient", uselist=False, cascade="all, delete-orphan")
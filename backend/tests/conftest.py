@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+from datetime import date
+
+import pytest
+
+# The engines are created when `database` is imported: point them at a
+# throwaway SQLite file before any application module is loaded
+_db_dir = tempfile.mkdtemp(prefix="nutriyess-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app():
+    # Same entry point as the deploy (Dockerfile CMD, Railway preDeployCommand)
+    import manage
+    manage.main(["migrate"])
+
+    import main
+    return main.app
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+    return TestClient(app)
+
+
+@pytest.fixture
+def db(app):
+    from database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def patient(db):
+    from models.patient import Gender, Patient
+    from models.user import User
+
+    user = User(email=f"nutri{os.urandom(4).hex()}@example.com", password_hash="x", first_name="Ana", last_name="Gómez")
+    db.add(user)
+    db.flush()
+    patient = Patient(
+        nutritionist_id=user.id,
+        first_name="Luis",
+        last_name="Pérez",
+        identification=os.urandom(4).hex(),
+        birth_date=date(1990, 5, 1),
+        gender=Gender.MALE,
+        weight=80,
+        height=175
+    )
+    db.add(patient)
+    db.commit()
+    return patient
@@ -0,0 +1,160 @@
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models.analytics import ConsultationWeeklyStats
+from models.consultation import Consultation
+from models.patient import Gender, Patient
+from models.user import User
+from utils.analytics_rollup import rebuild_weekly_stats, reassign_patient
+from utils.auth import create_access_token
+
+FIELDS = (
+    "consultations", "patients_seen", "weight_change_sum", "weight_change_count",
+    "appointments_due", "appointments_kept"
+)
+
+
+def _user(db):
+    user = User(email=f"nutri{os.urandom(4).hex()}@example.com", password_hash="x", first_name="Ana", last_name="Gómez")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _patient(db, nutritionist_id):
+    patient = Patient(
+        nutritionist_id=nutritionist_id,
+        first_name="Luis",
+        last_name="Pérez",
+        identification=os.urandom(4).hex(),
+        birth_date=date(1990, 5, 1),
+        gender=Gender.MALE,
+        weight=80,
+        height=175
+    )
+    db.add(patient)
+    db.commit()
+    return patient
+
+
+def _rollup(db, nutritionist_id):
+    db.expire_all()
+    rows = db.query(ConsultationWeeklyStats).filter(ConsultationWeeklyStats.nutritionist_id == nutritionist_id)
+    return {
+        row.week_start: tuple(round(getattr(row, field), 6) for field in FIELDS)
+        for row in rows
+    }
+
+
+def _expected(db, nutritionist_id):
+    """Agregación completa por semana, sin pasar por analytics_rollup"""
+    db.expire_all()
+    consultations = db.query(Consultation)\
+        .join(Patient, Patient.id == Consultation.patient_id)\
+        .filter(Patient.nutritionist_id == nutritionist_id)\
+        .all()
+    weeks = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    seen = defaultdict(set)
+    for c in consultations:
+        day = c.consultation_date.date()
+        week = weeks[day - timedelta(days=day.weekday())]
+        week["consultations"] += 1
+        seen[day - timedelta(days=day.weekday())].add(c.patient_id)
+        if c.weight_change is not None:
+            week["weight_change_sum"] += c.weight_change
+            week["weight_change_count"] += 1
+    for week, patients in seen.items():
+        weeks[week]["patients_seen"] = len(patients)
+    for c in consultations:
+        if c.next_appointment is None:
+            continue
+        day = c.next_appointment.date()
+        week = weeks[day - timedelta(days=day.weekday())]
+        week["appointments_due"] += 1
+        week["appointments_kept"] += any(
+            other.patient_id == c.patient_id
+            and other.consultation_date > c.consultation_date
+            and c.next_appointment - timedelta(days=3) <= other.consultation_date <= c.next_appointment + timedelta(days=7)
+            for other in consultations
+        )
+    return {week: tuple(round(values[field], 6) for field in FIELDS) for week, values in weeks.items()}
+
+
+def _create(client, patient_id, day, weight, next_appointment=None):
+    response = client.post("/api/consultations/", json={
+        "patient_id": patient_id,
+        "consultation_date": day.isoformat(),
+        "weight": weight,
+        "height": 175,
+        "next_appointment": next_appointment.isoformat() if next_appointment else None
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+@pytest.fixture
+def nutritionist(db):
+    return _user(db)
+
+
+def test_rollup_follows_consultation_and_patient_changes(client, db, nutritionist):
+    first, second = _patient(db, nutritionist.id), _patient(db, nutritionist.id)
+    start = datetime(2024, 3, 4, 9)
+
+    ids = [
+        _create(client, first.id, start, 80, start + timedelta(days=14)),
+        _create(client, first.id, start + timedelta(days=15), 79, start + timedelta(days=30)),
+        _create(client, first.id, start + timedelta(days=31), 78.5),
+        _create(client, second.id, start + timedelta(days=1), 70, start + timedelta(days=3)),
+        _create(client, second.id, start + timedelta(days=22), 69)
+    ]
+    assert _rollup(db, nutritionist.id) == _expected(db, nutritionist.id)
+
+    # Mover una consulta de semana cambia el cambio de peso de sus vecinas y las citas cumplidas
+    response = client.put(f"/api/consultations/{ids[1]}", json={
+        "patient_id": first.id,
+        "consultation_date": (start + timedelta(days=40)).isoformat(),
+        "weight": 77,
+        "height": 175,
+        "next_appointment": (start + timedelta(days=45)).isoformat()
+    })
+    assert response.status_code == 200
+    assert _rollup(db, nutritionist.id) == _expected(db, nutritionist.id)
+
+    assert client.delete(f"/api/consultations/{ids[2]}").status_code == 200
+    assert _rollup(db, nutritionist.id) == _expected(db, nutritionist.id)
+
+    # Borrar un paciente borra sus consultas y las quita del resumen
+    token = create_access_token(data={"sub": str(nutritionist.id)})
+    response = client.delete(f"/api/patients/{second.id}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert _rollup(db, nutritionist.id) == _expected(db, nutritionist.id)
+
+    # Pasar el paciente a otro nutricionista mueve sus semanas
+    other = _user(db)
+    reassign_patient(db, db.get(Patient, first.id), other.id)
+    db.commit()
+    assert _rollup(db, nutritionist.id) == _expected(db, nutritionist.id) == {}
+    assert _rollup(db, other.id) == _expected(db, other.id) != {}
+
+    # La reconstrucción completa da el mismo resultado
+    before = _rollup(db, other.id)
+    rebuild_weekly_stats(db)
+    assert _rollup(db, other.id) == before
+    assert _rollup(db, nutritionist.id) == {}
+
+
+def test_rebuild_clears_nutritionists_without_patients(db, nutritionist):
+    db.add(ConsultationWeeklyStats(
+        nutritionist_id=nutritionist.id, week_start=date(2024, 1, 1),
+        consultations=3, patients_seen=1, weight_change_sum=0, weight_change_count=0,
+        appointments_due=0, appointments_kept=0
+    ))
+    db.commit()
+
+    rebuild_weekly_stats(db)
+
+    assert _rollup(db, nutritionist.id) == {}
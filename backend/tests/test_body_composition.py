@@ -0,0 +1,104 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from models.consultation import Consultation
+from models.patient import Gender
+from utils.body_composition import (
+    BODY_COMPOSITION_FIELDS,
+    ages_at,
+    calculate_body_composition,
+    compute_body_composition
+)
+
+# Valores calculados a mano:
+# hombre de 25 años, Σ4 pliegues = 40 mm -> D = 1.1631 - 0.0632 × log10(40)
+# mujer de 35 años, Σ4 pliegues = 50 mm -> D = 1.1423 - 0.0632 × log10(50)
+MALE = {
+    "weight": 80, "height": 180, "triceps_skinfold": 10, "biceps_skinfold": 10,
+    "subscapular_skinfold": 10, "suprailiac_skinfold": 10,
+    "waist_circumference": 85, "hip_circumference": 100, "arm_circumference": 32
+}
+FEMALE = {
+    "weight": 60, "height": 165, "triceps_skinfold": 15, "biceps_skinfold": 8,
+    "subscapular_skinfold": 12, "suprailiac_skinfold": 15,
+    "waist_circumference": 70, "hip_circumference": 95, "arm_circumference": 27
+}
+MALE_EXPECTED = {
+    "body_density": 1.0618,
+    "body_fat_siri": 16.17,
+    "body_fat_brozek": 16.18,
+    "fat_mass": 12.93,
+    "fat_free_mass": 67.07,
+    "waist_hip_ratio": 0.85,
+    "waist_height_ratio": 0.472,
+    "arm_muscle_circumference": 28.86,  # 32 - π × 1.0 cm
+    "arm_muscle_area": 56.27            # 28.86² / 4π - 10
+}
+FEMALE_EXPECTED = {
+    "body_density": 1.0349,
+    "body_fat_siri": 28.3,
+    "body_fat_brozek": 27.38,
+    "fat_mass": 16.98,
+    "fat_free_mass": 43.02,
+    "waist_hip_ratio": 0.737,
+    "waist_height_ratio": 0.424,
+    "arm_muscle_circumference": 22.29,  # 27 - π × 1.5 cm
+    "arm_muscle_area": 33.03            # 22.29² / 4π - 6.5
+}
+
+
+def _consultation(measures, when=datetime(2024, 6, 1, 10)):
+    return Consultation(consultation_date=when, **measures)
+
+
+@pytest.mark.parametrize("measures, gender, birth_date, expected", [
+    (MALE, Gender.MALE, date(1999, 1, 15), MALE_EXPECTED),
+    (FEMALE, "female", date(1989, 3, 2), FEMALE_EXPECTED)
+])
+def test_known_values(measures, gender, birth_date, expected):
+    assert calculate_body_composition(_consultation(measures), gender, birth_date) == expected
+
+
+def test_age_bands_pick_the_durnin_womersley_coefficients():
+    # 17 años usa la fila 17-19 (1.1620, 0.0630); 50 años la de 50+ (1.1715, 0.0779)
+    teen = calculate_body_composition(_consultation(MALE), "male", date(2007, 1, 1))
+    senior = calculate_body_composition(_consultation(MALE), "male", date(1974, 1, 1))
+    assert teen["body_density"] == round(1.1620 - 0.0630 * np.log10(40), 4) == 1.0611
+    assert senior["body_density"] == round(1.1715 - 0.0779 * np.log10(40), 4) == 1.0467
+
+
+def test_missing_skinfold_only_clears_dependent_values():
+    values = calculate_body_composition(
+        _consultation({**MALE, "biceps_skinfold": None}), Gender.MALE, date(1999, 1, 15)
+    )
+    for field in ("body_density", "body_fat_siri", "body_fat_brozek", "fat_mass", "fat_free_mass"):
+        assert values[field] is None
+    for field in ("waist_hip_ratio", "waist_height_ratio", "arm_muscle_circumference", "arm_muscle_area"):
+        assert values[field] == MALE_EXPECTED[field]
+
+
+def test_batch_matches_single_consultations():
+    rows = [(MALE, "male", 25), (FEMALE, "female", 35), ({**FEMALE, "hip_circumference": None}, "female", 35)]
+    results = compute_body_composition(
+        *[[measures[field] for measures, _, _ in rows] for field in ("weight", "height")],
+        [age for _, _, age in rows],
+        [gender for _, gender, _ in rows],
+        *[[measures[field] for measures, _, _ in rows] for field in (
+            "triceps_skinfold", "biceps_skinfold", "subscapular_skinfold", "suprailiac_skinfold",
+            "waist_circumference", "hip_circumference", "arm_circumference"
+        )]
+    )
+    for index, (measures, gender, age) in enumerate(rows):
+        single = calculate_body_composition(_consultation(measures), gender, date(2024 - age, 1, 1))
+        for field, decimals in BODY_COMPOSITION_FIELDS.items():
+            value = results[field][index]
+            assert single[field] == (None if np.isnan(value) else round(float(value), decimals))
+    assert np.isnan(results["waist_hip_ratio"][2])
+
+
+def test_ages_at_counts_completed_years():
+    births = [date(1990, 5, 1), date(1990, 5, 1), date(2000, 2, 29), date(2000, 2, 29)]
+    days = [datetime(2024, 4, 30), datetime(2024, 5, 1, 8), datetime(2021, 2, 28), datetime(2021, 3, 1)]
+    assert ages_at(births, days).tolist() == [33, 34, 20, 21]
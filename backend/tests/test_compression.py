@@ -0,0 +1,53 @@
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from middleware.compression import CompressionMiddleware
+from utils.compression import negotiate_encoding
+
+BODY = b'{"items": "' + b"nutricion " * 500 + b'"}'
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/strong")
+    def strong():
+        return Response(BODY, media_type="application/json", headers={"ETag": '"abc"'})
+
+    @app.get("/weak")
+    def weak():
+        return Response(BODY, media_type="application/json", headers={"ETag": 'W/"abc"'})
+
+    return TestClient(app)
+
+
+def test_strong_etag_is_specific_to_the_encoding(client):
+    compressed = client.get("/strong", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/strong", headers={"Accept-Encoding": "identity"})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == '"abc-gzip"'
+    assert compressed.content == BODY
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == '"abc"'
+
+
+def test_weak_etag_is_kept(client):
+    response = client.get("/weak", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"abc"'
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, None),
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("*", "gzip" if negotiate_encoding("br") is None else "br")
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
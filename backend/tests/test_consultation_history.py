@@ -0,0 +1,77 @@
+from models.consultation import Consultation
+from utils.consultation_history import recompute_all_weight_changes
+
+
+def _create(client, patient_id, day, weight):
+    response = client.post("/api/consultations/", json={
+        "patient_id": patient_id,
+        "consultation_date": f"2024-03-{day:02d}T10:00:00",
+        "weight": weight,
+        "height": 175
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def _changes(db, patient_id):
+    """weight_change guardado, en el orden de la historia del paciente"""
+    db.expire_all()
+    rows = db.query(Consultation.id, Consultation.weight, Consultation.weight_change)\
+        .filter(Consultation.patient_id == patient_id)\
+        .order_by(Consultation.consultation_date, Consultation.id)\
+        .all()
+    return [(row.id, row.weight, row.weight_change) for row in rows]
+
+
+def _assert_consistent(db, patient_id):
+    history = _changes(db, patient_id)
+    previous = None
+    for _, weight, weight_change in history:
+        expected = None if previous is None else weight - previous
+        assert weight_change == expected
+        previous = weight
+    # La reconstrucción completa con LAG() coincide con el mantenimiento incremental
+    recompute_all_weight_changes(db)
+    assert _changes(db, patient_id) == history
+
+
+def test_neighbors_follow_date_moves_and_deletes(client, db, patient):
+    first = _create(client, patient.id, 1, 80)
+    second = _create(client, patient.id, 10, 78)
+    third = _create(client, patient.id, 20, 77.5)
+    assert [change for _, _, change in _changes(db, patient.id)] == [None, -2, -0.5]
+    _assert_consistent(db, patient.id)
+
+    # Mover la segunda después de la tercera: cambian ella y sus vecinas de antes y después
+    response = client.put(f"/api/consultations/{second}", json={
+        "patient_id": patient.id,
+        "consultation_date": "2024-03-25T10:00:00",
+        "weight": 78,
+        "height": 175
+    })
+    assert response.status_code == 200
+    assert response.json()["weight_change"] == 0.5
+    assert _changes(db, patient.id) == [(first, 80, None), (third, 77.5, -2.5), (second, 78, 0.5)]
+    _assert_consistent(db, patient.id)
+
+    # Misma fecha que la primera: va después por id y la tercera pasa a compararse con ella
+    tied = _create(client, patient.id, 1, 81)
+    assert _changes(db, patient.id) == [(first, 80, None), (tied, 81, 1), (third, 77.5, -3.5), (second, 78, 0.5)]
+    _assert_consistent(db, patient.id)
+
+    # Borrar la del medio: la siguiente se compara con la anterior a la borrada
+    response = client.delete(f"/api/consultations/{third}")
+    assert response.status_code == 200
+    assert _changes(db, patient.id) == [(first, 80, None), (tied, 81, 1), (second, 78, -3)]
+    _assert_consistent(db, patient.id)
+
+
+def test_same_date_ties_are_ordered_by_id(client, db, patient):
+    first = _create(client, patient.id, 5, 70)
+    second = _create(client, patient.id, 5, 71)
+    assert _changes(db, patient.id) == [(first, 70, None), (second, 71, 1)]
+
+    response = client.delete(f"/api/consultations/{first}")
+    assert response.status_code == 200
+    assert _changes(db, patient.id) == [(second, 71, None)]
+    _assert_consistent(db, patient.id)
@@ -0,0 +1,33 @@
+import csv
+import io
+
+from utils.data_export import stream_csv
+
+
+def _read_csv(columns, rows):
+    content = b"".join(stream_csv(columns, rows)).decode("utf-8-sig")
+    return list(csv.reader(io.StringIO(content)))
+
+
+def test_csv_escapes_formulas():
+    rows = [
+        ("=HYPERLINK(\"http://x\")", "+57 300", "-2+3", "@SUM(A1)", "\tcmd", "José"),
+        (-2.5, 0, None, "Pérez", "a=b", "")
+    ]
+
+    header, first, second = _read_csv(["a", "b", "c", "d", "e", "f"], rows)
+
+    assert header == ["a", "b", "c", "d", "e", "f"]
+    assert first == ["'=HYPERLINK(\"http://x\")", "'+57 300", "'-2+3", "'@SUM(A1)", "'\tcmd", "José"]
+    # Numbers and text that does not start with a formula character are untouched
+    assert second == ["-2.5", "0", "", "Pérez", "a=b", ""]
+
+
+def test_csv_escaping_round_trips_through_the_import():
+    from utils.patient_import import iter_csv_rows
+
+    content = b"".join(stream_csv(["phone", "notes"], [("+57 300", "=1+1"), ("'hola", "-")]))
+
+    rows = list(iter_csv_rows(io.BytesIO(content)))
+
+    assert rows == [(2, {"phone": "+57 300", "notes": "=1+1"}), (3, {"phone": "'hola", "notes": "-"})]
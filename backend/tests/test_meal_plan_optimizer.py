@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from models.food_exchange import FoodExchangeCategory
+from utils.meal_plan_optimizer import FoodCatalog, generate_meal_plan
+from utils.patient_search import normalize_search_text
+
+# (nombre, grupo, calorías, proteínas, carbohidratos, grasas)
+FOODS = [
+    ("Arroz blanco", FoodExchangeCategory.CEREALS, 68, 2, 15, 0),
+    ("Fríjol", FoodExchangeCategory.LEGUMES, 120, 8, 20, 1),
+    ("Brócoli", FoodExchangeCategory.VEGETABLES, 25, 2, 5, 0),
+    ("Banano", FoodExchangeCategory.FRUITS, 60, 0, 15, 0),
+    ("Pechuga de pollo", FoodExchangeCategory.MEAT, 75, 7, 0, 5),
+    ("Huevo entero", FoodExchangeCategory.MEAT, 75, 7, 0, 5),
+    ("Leche descremada", FoodExchangeCategory.DAIRY, 90, 8, 12, 0),
+    ("Aguacate", FoodExchangeCategory.FATS, 45, 0, 0, 5),
+    ("Mantequilla", FoodExchangeCategory.FATS, 45, 0, 0, 5),
+    ("Panela", FoodExchangeCategory.SUGARS, 40, 0, 10, 0)
+]
+
+TARGETS = {"caloric_requirement": 2000, "proteins_g": 90, "carbs_g": 250, "fats_g": 65}
+
+
+@pytest.fixture
+def catalog():
+    return FoodCatalog(
+        version="test",
+        ids=np.arange(1, len(FOODS) + 1),
+        names=[food[0] for food in FOODS],
+        search_names=[normalize_search_text(food[0]) for food in FOODS],
+        portion_sizes=["1 porción"] * len(FOODS),
+        categories=np.array([food[1].value for food in FOODS], dtype=object),
+        macros=np.array([food[2:] for food in FOODS], dtype=float),
+        sodium=np.zeros(len(FOODS))
+    )
+
+
+def _foods(plan):
+    return {item["food_item"] for item in plan["items"]}
+
+
+def test_vegetarian_plan_has_no_meat_or_egg(catalog):
+    foods = _foods(generate_meal_plan(catalog, TARGETS, is_vegetarian=True))
+
+    assert not foods & {"Pechuga de pollo", "Huevo entero"}
+    assert "Leche descremada" in foods
+
+
+def test_vegan_plan_has_no_animal_products(catalog):
+    foods = _foods(generate_meal_plan(catalog, TARGETS, is_vegetarian=True, is_vegan=True))
+
+    assert not foods & {"Pechuga de pollo", "Huevo entero", "Leche descremada", "Mantequilla"}
+    assert "Fríjol" in foods
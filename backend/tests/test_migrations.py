@@ -0,0 +1,57 @@
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+
+
+def _not_search_index(name, type_, parent_names):
+    # patients_fts and its shadow tables are created by install_search_index, not by Alembic
+    from utils.patient_search import FTS_TABLE
+    return not (type_ == "table" and name.startswith(FTS_TABLE))
+
+
+def test_migrations_match_models(app):
+    import models  # noqa: F401  registers every table on Base.metadata
+    from database import Base, engine
+    from utils.migrations import check_schema_revision
+
+    assert check_schema_revision(engine)
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"include_name": _not_search_index})
+        diffs = compare_metadata(context, Base.metadata)
+    assert diffs == []
+
+
+def test_upgrade_backfills_patient_updated_at(tmp_path, monkeypatch):
+    import database
+    from sqlalchemy import create_engine, inspect, text
+    from utils import patient_search
+    from utils.migrations import upgrade_database
+
+    # env.py migrates database.engine: point it at a database adopted by 0001
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(patient_search, "_sqlite_fts_enabled", patient_search._sqlite_fts_enabled)
+    upgrade_database("0001")
+    patient_search.install_search_index(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, password_hash, first_name, last_name) VALUES (1, 'ana@example.com', 'x', 'Ana', 'Gómez')"))
+        conn.execute(text(
+            "INSERT INTO patients (id, nutritionist_id, first_name, last_name, identification, birth_date, "
+            "gender, weight, height, search_text, created_at, updated_at) VALUES "
+            "(1, 1, 'Luis', 'Pérez', '1', '1990-01-01', 'MALE', 80, 175, 'luis perez 1', '2024-01-02 10:00:00', NULL), "
+            "(2, 1, 'Ana', 'Gómez', '2', '1990-01-01', 'FEMALE', 60, 160, 'ana gomez 2', NULL, NULL)"
+        ))
+
+    upgrade_database()
+    patient_search.install_search_index(engine)
+
+    with engine.connect() as conn:
+        updated = dict(conn.execute(text("SELECT id, updated_at FROM patients")).all())
+        triggers = conn.execute(text("SELECT count(*) FROM sqlite_master WHERE type = 'trigger'")).scalar()
+        found = conn.execute(text("SELECT rowid FROM patients_fts WHERE patients_fts MATCH '\"gomez\"'")).scalars().all()
+    assert updated[1] == "2024-01-02 10:00:00"
+    assert updated[2] is not None
+    assert not next(c for c in inspect(engine).get_columns("patients") if c["name"] == "updated_at")["nullable"]
+    # The table rebuild of 0002 dropped the search triggers; install_search_index restores them
+    assert triggers == 3
+    assert found == [2]
+    engine.dispose()
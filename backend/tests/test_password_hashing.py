@@ -0,0 +1,42 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from utils.password_hashing import HashingPool
+
+
+def _fail():
+    raise ValueError("hash inválido")
+
+
+def test_failures_do_not_count_as_finished():
+    pool = HashingPool(workers=0, queue_size=1, timeout=1)
+
+    assert pool.run(sum, [1, 2]) == 3
+    with pytest.raises(ValueError):
+        pool.run(_fail)
+
+    stats = pool.stats()
+    assert (stats["submitted"], stats["finished"], stats["failed"], stats["pending"]) == (2, 1, 1, 0)
+
+
+def test_timed_out_job_keeps_its_slot_until_it_ends():
+    pool = HashingPool(workers=1, queue_size=0, timeout=0.2)
+    try:
+        pool.run(time.sleep, 0)  # warm up the worker process
+        with pytest.raises(HTTPException) as timed_out:
+            pool.run(time.sleep, 1)
+        assert timed_out.value.status_code == 503
+
+        # The sleep still occupies the only process: no new job is accepted
+        with pytest.raises(HTTPException):
+            pool.run(time.sleep, 0)
+        assert pool.stats()["rejected"] == 1
+
+        time.sleep(1)
+        pool.run(time.sleep, 0)
+        stats = pool.stats()
+        assert (stats["finished"], stats["failed"], stats["pending"]) == (2, 1, 0)
+    finally:
+        pool.shutdown()
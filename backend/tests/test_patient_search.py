@@ -0,0 +1,87 @@
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import utils.patient_search as patient_search
+from utils.patient_search import FTS_TABLE, install_search_index, search_patients
+
+NAMES = [
+    ("José", "Pérez", "1010"),
+    ("María José", "Gómez", "2020"),
+    ("Ana", "Martínez", "3030"),
+    ("Luis", "Rodríguez", "4040"),
+    ("Jo", "Li", "5050")
+]
+
+
+@pytest.fixture
+def nutritionist_id(db):
+    from models.patient import Gender, Patient
+    from models.user import User
+
+    user = User(email=f"nutri{os.urandom(4).hex()}@example.com", password_hash="x", first_name="Ana", last_name="Gómez")
+    db.add(user)
+    db.flush()
+    db.add_all([
+        Patient(
+            nutritionist_id=user.id,
+            first_name=first_name,
+            last_name=last_name,
+            identification=f"{identification}{user.id}",
+            birth_date=date(1990, 5, 1),
+            gender=Gender.FEMALE,
+            weight=60,
+            height=160
+        )
+        for first_name, last_name, identification in NAMES
+    ])
+    db.commit()
+    return user.id
+
+
+def _names(db, query, nutritionist_id):
+    return sorted(p.last_name for p in search_patients(db, query, nutritionist_id=nutritionist_id))
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("rez", ["Pérez"]),  # inside a word, accents ignored
+    ("inez", ["Martínez"]),
+    ("jose", ["Gómez", "Pérez"]),
+    ("JOSÉ gom", ["Gómez"]),
+    ("artin", ["Martínez"]),
+    ("jo", ["Gómez", "Li", "Pérez"]),  # shorter than a trigram
+    ("ez", ["Gómez", "Martínez", "Pérez", "Rodríguez"]),
+    ("ez li", []),
+    ("lu rod", ["Rodríguez"]),
+    ("404", ["Rodríguez"])
+])
+def test_fts_matches_substrings_like_the_fallback(db, nutritionist_id, monkeypatch, query, expected):
+    assert patient_search._sqlite_fts_enabled
+    assert _names(db, query, nutritionist_id) == expected
+
+    monkeypatch.setattr(patient_search, "_sqlite_fts_enabled", False)
+    assert _names(db, query, nutritionist_id) == expected
+
+
+def test_word_index_is_rebuilt_with_trigrams(tmp_path, monkeypatch):
+    from database import Base
+
+    monkeypatch.setattr(patient_search, "_sqlite_fts_enabled", patient_search._sqlite_fts_enabled)
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "search_text, content='patients', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+
+    install_search_index(engine)
+
+    with engine.connect() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}).scalar()
+        triggers = conn.execute(text("SELECT count(*) FROM sqlite_master WHERE type = 'trigger'")).scalar()
+    assert "trigram" in sql
+    assert triggers == 3
+    engine.dispose()
@@ -0,0 +1,44 @@
+import os
+from datetime import date, datetime
+
+from models.patient import Gender, Patient
+from models.user import User
+from utils.auth import create_access_token
+
+
+def test_summary_pages_by_updated_at_without_gaps(client, db):
+    user = User(email=f"nutri{os.urandom(4).hex()}@example.com", password_hash="x", first_name="Ana", last_name="Gómez")
+    db.add(user)
+    db.flush()
+    # Several patients share updated_at: the id breaks the tie
+    stamps = [datetime(2024, 1, 1), datetime(2024, 1, 1), datetime(2024, 1, 1), datetime(2024, 2, 1), datetime(2024, 3, 1)]
+    db.add_all([
+        Patient(
+            nutritionist_id=user.id,
+            first_name=f"Paciente {number}",
+            last_name="Pérez",
+            identification=os.urandom(4).hex(),
+            birth_date=date(1990, 5, 1),
+            gender=Gender.MALE,
+            weight=80,
+            height=175,
+            created_at=stamp,
+            updated_at=stamp
+        )
+        for number, stamp in enumerate(stamps)
+    ])
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user.id)})}"}
+
+    names, cursor = [], None
+    while True:
+        params = {"order_by": "updated_at", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/patients/summary", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        names += [item["first_name"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert names == ["Paciente 4", "Paciente 3", "Paciente 2", "Paciente 1", "Paciente 0"]
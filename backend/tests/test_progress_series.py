@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from utils.progress_series import _bucket_starts, build_progress_series
+
+DATES = [
+    datetime(2024, 1, 1, 9),
+    datetime(2024, 1, 3, 9),
+    datetime(2024, 1, 10, 9),
+    datetime(2024, 2, 5, 9),
+    datetime(2024, 2, 20, 9)
+]
+WEIGHTS = [80, 79, None, 77, 76]
+
+# Mínimos cuadrados sobre los días 0, 2, 35 y 50: Σdx·dy = -133, Σdx² = 1836.75
+TREND = round(-133 / 1836.75 * 30, 3)
+
+
+def test_raw_series_deltas_skip_missing_values():
+    series = build_progress_series(DATES, {"weight": WEIGHTS})
+    weight = series["metrics"]["weight"]
+
+    assert series["bucket"] == "none"
+    assert series["dates"][0] == "2024-01-01T09:00:00"
+    assert weight["values"] == [80, 79, None, 77, 76]
+    assert weight["deltas"] == [None, -1, None, -2, -1]
+    assert weight["total_change"] == -4
+    assert weight["trend_per_month"] == TREND == -2.172
+
+
+def test_week_buckets_average_and_keep_raw_trend():
+    series = build_progress_series(DATES, {"weight": WEIGHTS}, bucket="week")
+    weight = series["metrics"]["weight"]
+
+    assert series["dates"] == ["2024-01-01", "2024-01-08", "2024-02-05", "2024-02-19"]
+    assert weight["values"] == [79.5, None, 77, 76]
+    assert weight["deltas"] == [None, None, -2.5, -1]
+    assert weight["total_change"] == -3.5
+    assert weight["trend_per_month"] == TREND
+
+
+def test_month_buckets():
+    series = build_progress_series(DATES, {"weight": WEIGHTS}, bucket="month")
+    weight = series["metrics"]["weight"]
+
+    assert series["dates"] == ["2024-01-01", "2024-02-01"]
+    assert weight["values"] == [79.5, 76.5]
+    assert weight["deltas"] == [None, -3]
+    assert weight["total_change"] == -3
+
+
+@pytest.mark.parametrize("day, expected", [
+    ("2023-12-31", "2023-12-25"),  # domingo
+    ("2024-01-01", "2024-01-01"),  # lunes
+    ("2024-01-07", "2024-01-01"),
+    ("2024-02-29", "2024-02-26")
+])
+def test_week_starts_on_monday(day, expected):
+    starts = _bucket_starts(np.array([day], dtype="datetime64[s]"), "week")
+    assert str(starts[0]) == expected
+
+
+def test_short_series_have_no_change_or_trend():
+    empty = build_progress_series([], {"weight": []}, bucket="week")
+    assert empty["dates"] == []
+    assert empty["metrics"]["weight"] == {"values": [], "deltas": [], "total_change": None, "trend_per_month": None}
+
+    single = build_progress_series(DATES[:2], {"weight": [None, 70]})
+    assert single["metrics"]["weight"]["deltas"] == [None, None]
+    assert single["metrics"]["weight"]["total_change"] is None
+    assert single["metrics"]["weight"]["trend_per_month"] is None
+
+    # Dos consultas el mismo instante no definen una pendiente
+    same_time = build_progress_series([DATES[0], DATES[0]], {"weight": [70, 71]})
+    assert same_time["metrics"]["weight"]["total_change"] == 1
+    assert same_time["metrics"]["weight"]["trend_per_month"] is None
+
+
+def test_progress_endpoint(client, patient):
+    for moment, weight in zip(DATES, WEIGHTS):
+        response = client.post("/api/consultations/", json={
+            "patient_id": patient.id,
+            "consultation_date": moment.isoformat(),
+            "weight": weight if weight is not None else 78,
+            "height": 175
+        })
+        assert response.status_code == 200
+
+    response = client.get(f"/api/consultations/patient/{patient.id}/progress", params={"bucket": "month"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["dates"] == ["2024-01-01", "2024-02-01"]
+    assert body["metrics"]["weight"]["values"] == [79, 76.5]
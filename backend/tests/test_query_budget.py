@@ -0,0 +1,51 @@
+from datetime import date
+
+import pytest
+
+from models.meal_plan import MealPlan, MealPlanItem
+
+
+def _add_meal_plans(db, patient_id: int, plans: int, items: int):
+    meal_plans = []
+    for number in range(plans):
+        meal_plan = MealPlan(patient_id=patient_id, name=f"Plan {number}", date_created=date(2024, 1, 1))
+        meal_plan.items = [
+            MealPlanItem(
+                meal_time="Almuerzo",
+                food_item=f"Alimento {item}",
+                portion="1 porción",
+                calories=100,
+                proteins=5,
+                carbohydrates=15,
+                fats=3
+            )
+            for item in range(items)
+        ]
+        meal_plans.append(meal_plan)
+    db.add_all(meal_plans)
+    db.commit()
+    return meal_plans
+
+
+@pytest.mark.parametrize("plans", [1, 10])
+def test_patient_meal_plans_query_count(client, db, patient, plans):
+    _add_meal_plans(db, patient.id, plans=plans, items=5)
+
+    response = client.get(f"/api/meal-plans/patient/{patient.id}")
+
+    assert response.status_code == 200
+    assert len(response.json()) == plans
+    # Plans + their items (selectinload), whatever the number of plans
+    assert int(response.headers["X-Query-Count"]) == 2
+    assert "X-Query-Budget-Exceeded" not in response.headers
+
+
+def test_meal_plan_detail_query_count(client, db, patient):
+    meal_plan, = _add_meal_plans(db, patient.id, plans=1, items=8)
+
+    response = client.get(f"/api/meal-plans/{meal_plan.id}")
+
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 8
+    # The plan + one query for all of its items, not one per item
+    assert int(response.headers["X-Query-Count"]) == 2
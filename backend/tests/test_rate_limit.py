@@ -0,0 +1,229 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import middleware.rate_limit as rate_limit
+from middleware.rate_limit import (
+    ConcurrencyLimitMiddleware,
+    LoginThrottle,
+    RateLimitMiddleware,
+    TokenBucketLimiter,
+    _budget,
+    client_ip,
+    route_class
+)
+
+
+def test_budget_from_environment(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_SEARCH", "30/10")
+
+    assert _budget("search", "60/60") == (30, 10.0)
+    assert _budget("read", "600/60") == (600, 60.0)
+
+
+@pytest.mark.parametrize("value", ["0/60", "10/0", "-5/60"])
+def test_budget_rejects_empty_buckets(monkeypatch, value):
+    monkeypatch.setenv("RATE_LIMIT_SEARCH", value)
+
+    with pytest.raises(ValueError, match="RATE_LIMIT_SEARCH"):
+        _budget("search", "60/60")
+
+
+def test_token_bucket_waits_for_refill():
+    limiter = TokenBucketLimiter({"auth": (2, 60)})
+
+    assert limiter.acquire("auth", "ip:1") == 0
+    assert limiter.acquire("auth", "ip:1") == 0
+    assert limiter.acquire("auth", "ip:1") == pytest.approx(30, rel=0.01)
+    assert limiter.acquire("auth", "ip:2") == 0
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("POST", "/api/auth/login", "auth"),
+    ("POST", "/api/auth/register", "auth"),
+    ("GET", "/api/auth/me", "read"),
+    ("GET", "/api/patients/search", "search"),
+    ("GET", "/api/patients/export", "bulk"),
+    ("POST", "/api/patients/", "write"),
+    ("GET", "/api/patients/", "read"),
+    ("GET", "/health", None),
+    ("OPTIONS", "/api/patients/", None)
+])
+def test_route_class(method, path, expected):
+    assert route_class(method, path) == expected
+
+
+def _scope(peer="10.0.0.1", forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return {"client": (peer, 1234), "headers": headers}
+
+
+def test_client_ip_only_trusts_the_proxy_appended_hop():
+    spoofed = _scope(forwarded="1.2.3.4, 203.0.113.7")
+
+    assert client_ip(spoofed, trusted_hops=0) == "10.0.0.1"
+    assert client_ip(spoofed, trusted_hops=1) == "203.0.113.7"
+    assert client_ip(_scope(forwarded="203.0.113.7"), trusted_hops=1) == "203.0.113.7"
+    # Without the header the request did not come through the proxy
+    assert client_ip(_scope(), trusted_hops=1) == "10.0.0.1"
+
+
+@pytest.fixture
+def limited_client():
+    app = FastAPI()
+
+    @app.get("/api/patients/search")
+    def search():
+        return []
+
+    @app.get("/api/patients/")
+    def patients():
+        return []
+
+    @app.post("/api/auth/login")
+    def login():
+        return {}
+
+    limiter = TokenBucketLimiter({"auth": (1, 60), "search": (2, 60), "read": (3, 60)})
+    app.add_middleware(RateLimitMiddleware, limiter=limiter, enabled=True)
+    return TestClient(app)
+
+
+def test_exhausted_route_class_answers_429(limited_client):
+    assert [limited_client.get("/api/patients/search").status_code for _ in range(2)] == [200, 200]
+
+    response = limited_client.get("/api/patients/search")
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    assert response.json() == {"detail": "Too many requests, please retry later"}
+    # Other route classes keep their own budget
+    assert limited_client.get("/api/patients/").status_code == 200
+    assert limited_client.post("/api/auth/login").status_code == 200
+    assert limited_client.post("/api/auth/login").status_code == 429
+
+
+def test_forwarded_header_does_not_reset_the_budget(limited_client):
+    statuses = [
+        limited_client.post("/api/auth/login", headers={"X-Forwarded-For": f"198.51.100.{n}"}).status_code
+        for n in range(3)
+    ]
+
+    assert statuses == [200, 429, 429]
+
+
+def test_bearer_token_gets_its_own_bucket(limited_client):
+    from utils.auth import create_access_token
+
+    for _ in range(2):
+        limited_client.get("/api/patients/search")
+    token = create_access_token(data={"sub": "42"})
+
+    response = limited_client.get("/api/patients/search", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=clock.time, monotonic=time.monotonic))
+    return clock
+
+
+def _retry_after(throttle, email, ip=None):
+    try:
+        throttle.check(email, ip)
+    except HTTPException as error:
+        assert error.status_code == 429
+        return int(error.headers["Retry-After"])
+    return 0
+
+
+def test_login_lockout_doubles_up_to_the_maximum(clock):
+    throttle = LoginThrottle(free_attempts=2, lockout=10, max_lockout=40, url=None)
+
+    lockouts = []
+    for _ in range(6):
+        throttle.record_failure("ana@example.com", None)
+        lockouts.append(_retry_after(throttle, "ANA@example.com "))
+        clock.now += 100
+
+    assert lockouts == [0, 0, 10, 20, 40, 40]
+
+
+def test_login_lockout_expires(clock):
+    throttle = LoginThrottle(free_attempts=1, lockout=10, max_lockout=40, url=None)
+    for _ in range(2):
+        throttle.record_failure("ana@example.com", None)
+
+    clock.now += 9
+    assert _retry_after(throttle, "ana@example.com") == 1
+    clock.now += 1
+    assert _retry_after(throttle, "ana@example.com") == 0
+
+
+def test_ip_gets_a_larger_allowance_and_survives_a_success(clock):
+    throttle = LoginThrottle(free_attempts=1, lockout=10, max_lockout=40, url=None)
+    free = LoginThrottle.IP_ATTEMPTS_FACTOR
+
+    # One failure per email: no email is locked, the IP only after `free` failures
+    for n in range(free):
+        throttle.record_failure(f"user{n}@example.com", "203.0.113.7")
+    assert _retry_after(throttle, "otro@example.com", "203.0.113.7") == 0
+
+    throttle.record_failure("user0@example.com", "203.0.113.7")
+    assert _retry_after(throttle, "user0@example.com") == 10
+
+    # A valid login clears its email, not the IP that was guessing others
+    throttle.record_success("user0@example.com")
+    assert _retry_after(throttle, "user0@example.com") == 0
+    assert _retry_after(throttle, "otro@example.com", "203.0.113.7") == 10
+    assert _retry_after(throttle, "otro@example.com", "198.51.100.1") == 0
+
+
+def test_saturated_worker_sheds_with_503():
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/api/slow")
+    async def slow():
+        await release.wait()
+        return {}
+
+    @app.get("/health")
+    async def health():
+        return {}
+
+    shedder = ConcurrencyLimitMiddleware(app, max_concurrent=1, queue_timeout=0.05)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=shedder)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.get("/api/slow"))
+            await asyncio.sleep(0.05)
+            second = await client.get("/api/slow")
+            health = await client.get("/health")
+            release.set()
+            return await first, second, health
+
+    first, second, health = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert second.headers["Retry-After"] == "1"
+    assert health.status_code == 200
+    assert (shedder.shed, shedder.in_flight) == (1, 0)
@@ -0,0 +1,10 @@
+import benchmark_serialization
+
+
+def test_list_serializer_matches_fastapi(capsys):
+    # main() asserts that ListSerializer and FastAPI render the same bytes for every model
+    benchmark_serialization.main(["--rows", "20", "--repeat", "1"])
+
+    output = capsys.readouterr().out
+    for name in benchmark_serialization.MODELS:
+        assert name in output
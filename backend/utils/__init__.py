@@ -6,6 +6,7 @@ from .nutrition_calculations import (
     get_bmi_category,
     calculate_tmb
 )
+from .nutrition_batch import calculate_batch, calculate_ages
 
 __all__ = [
     "calculate_bmi",
@@ -13,7 +14,9 @@ __all__ = [
     "calculate_adjusted_weight",
     "calculate_caloric_requirement",
     "get_bmi_category",
-    "calculate_tmb"
+    "calculate_tmb",
+    "calculate_batch",
+    "calculate_ages"
 ]
 
 
@@ -0,0 +1,256 @@
+"""
+Resumen semanal de consultas por nutricionista (tabla consultation_weekly_stats).
+
+Cada fila guarda, para una semana (lunes a domingo), las consultas realizadas,
+los pacientes atendidos, la suma y cantidad de cambios de peso, las citas de
+seguimiento programadas para esa semana y cuántas se cumplieron. Una cita se
+considera cumplida si el paciente tuvo una consulta entre
+APPOINTMENT_EARLY_DAYS antes y APPOINTMENT_LATE_DAYS después de la fecha,
+posterior a la consulta que la programó (esa consulta no cumple su propia
+cita).
+
+Al crear, editar o borrar una consulta se recalculan solo las semanas que
+puede afectar, de modo que leer las estadísticas no depende de cuántas
+consultas o pacientes haya. Lo mismo al borrar un paciente (sus consultas se
+borran en cascada) o al pasarlo a otro nutricionista (reassign_patient). Si el
+resumen se desincroniza, `python manage.py rebuild-analytics` lo reconstruye.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, distinct, func, insert, select
+from sqlalchemy.orm import Session
+
+from models.analytics import ConsultationWeeklyStats
+from models.consultation import Consultation
+from models.patient import Patient
+
+APPOINTMENT_EARLY_DAYS = 3
+APPOINTMENT_LATE_DAYS = 7
+
+_STAT_FIELDS = (
+    "consultations", "patients_seen", "weight_change_sum", "weight_change_count",
+    "appointments_due", "appointments_kept"
+)
+
+
+def week_start(value) -> date:
+    """Lunes de la semana de una fecha"""
+    day = value.date() if isinstance(value, datetime) else value
+    return day - timedelta(days=day.weekday())
+
+
+def affected_weeks(consultation_date: Optional[datetime], next_appointment: Optional[datetime]) -> Set[date]:
+    """
+    Semanas cuyo resumen depende de una consulta: la de la propia consulta, las
+    de las citas que puede cumplir y la de la cita que programa.
+    """
+    weeks = set()
+    if consultation_date:
+        weeks.add(week_start(consultation_date))
+        weeks.add(week_start(consultation_date - timedelta(days=APPOINTMENT_LATE_DAYS)))
+        weeks.add(week_start(consultation_date + timedelta(days=APPOINTMENT_EARLY_DAYS)))
+    if next_appointment:
+        weeks.add(week_start(next_appointment))
+    return weeks
+
+
+def _is_kept(appointment: datetime, scheduled_at: Optional[datetime], sorted_dates: List[datetime]) -> bool:
+    """
+    Indica si alguna consulta posterior a `scheduled_at` (la consulta que
+    programó la cita) cae en la ventana de la cita (fechas ordenadas)
+    """
+    position = bisect_left(sorted_dates, appointment - timedelta(days=APPOINTMENT_EARLY_DAYS))
+    if scheduled_at is not None:
+        position = max(position, bisect_right(sorted_dates, scheduled_at))
+    return position < len(sorted_dates)\
+        and sorted_dates[position] <= appointment + timedelta(days=APPOINTMENT_LATE_DAYS)
+
+
+def _week_stats(db: Session, nutritionist_id: int, week: date) -> dict:
+    start = datetime.combine(week, time.min)
+    end = start + timedelta(days=7)
+
+    held = db.query(
+        func.count(Consultation.id),
+        func.count(distinct(Consultation.patient_id)),
+        func.coalesce(func.sum(Consultation.weight_change), 0.0),
+        func.count(Consultation.weight_change)
+    ).join(Patient, Patient.id == Consultation.patient_id)\
+        .filter(
+            Patient.nutritionist_id == nutritionist_id,
+            Consultation.consultation_date >= start,
+            Consultation.consultation_date < end
+        )\
+        .one()
+
+    due = db.query(Consultation.patient_id, Consultation.consultation_date, Consultation.next_appointment)\
+        .join(Patient, Patient.id == Consultation.patient_id)\
+        .filter(
+            Patient.nutritionist_id == nutritionist_id,
+            Consultation.next_appointment >= start,
+            Consultation.next_appointment < end
+        )\
+        .all()
+
+    kept = 0
+    if due:
+        # Consultas de esos pacientes en la ventana de cualquier cita de la semana
+        visits = db.query(Consultation.patient_id, Consultation.consultation_date)\
+            .filter(
+                Consultation.patient_id.in_({row.patient_id for row in due}),
+                Consultation.consultation_date >= start - timedelta(days=APPOINTMENT_EARLY_DAYS),
+                Consultation.consultation_date <= end + timedelta(days=APPOINTMENT_LATE_DAYS)
+            )\
+            .order_by(Consultation.consultation_date)\
+            .all()
+        dates_by_patient = defaultdict(list)
+        for visit in visits:
+            dates_by_patient[visit.patient_id].append(visit.consultation_date)
+        kept = sum(
+            _is_kept(row.next_appointment, row.consultation_date, dates_by_patient[row.patient_id])
+            for row in due
+        )
+
+    return dict(zip(_STAT_FIELDS, (*held, len(due), kept)))
+
+
+def _replace_weeks(db: Session, nutritionist_id: int, stats: Dict[date, dict]):
+    """Reemplaza las filas de las semanas indicadas (sin filas para semanas vacías)"""
+    if not stats:
+        return
+    db.execute(
+        delete(ConsultationWeeklyStats).where(
+            ConsultationWeeklyStats.nutritionist_id == nutritionist_id,
+            ConsultationWeeklyStats.week_start.in_(list(stats))
+        )
+    )
+    rows = [
+        dict(values, nutritionist_id=nutritionist_id, week_start=week)
+        for week, values in stats.items()
+        if values["consultations"] or values["appointments_due"]
+    ]
+    if rows:
+        db.execute(insert(ConsultationWeeklyStats), rows)
+
+
+def refresh_nutritionist_weeks(db: Session, nutritionist_id: int, weeks: Iterable[date]):
+    """
+    Recalcula el resumen de las semanas indicadas de un nutricionista.
+    Escribe primero los cambios pendientes (flush); no hace commit.
+    """
+    db.flush()
+    weeks = set(weeks)
+    if nutritionist_id is None or not weeks:
+        return
+    _replace_weeks(db, nutritionist_id, {week: _week_stats(db, nutritionist_id, week) for week in weeks})
+
+
+def refresh_weekly_stats(db: Session, patient_id: int, weeks: Iterable[date]):
+    """Recalcula el resumen de las semanas indicadas para el nutricionista del paciente"""
+    db.flush()
+    nutritionist_id = db.query(Patient.nutritionist_id).filter(Patient.id == patient_id).scalar()
+    refresh_nutritionist_weeks(db, nutritionist_id, weeks)
+
+
+def patient_weeks(db: Session, patient_id: int) -> Set[date]:
+    """Semanas cuyo resumen depende de alguna consulta del paciente"""
+    weeks = set()
+    rows = db.query(Consultation.consultation_date, Consultation.next_appointment)\
+        .filter(Consultation.patient_id == patient_id)
+    for row in rows:
+        weeks |= affected_weeks(row.consultation_date, row.next_appointment)
+    return weeks
+
+
+def remove_patient(db: Session, patient: Patient):
+    """
+    Borra un paciente (y en cascada sus consultas) y recalcula las semanas
+    del nutricionista que las contaban. No hace commit.
+    """
+    weeks = patient_weeks(db, patient.id)
+    nutritionist_id = patient.nutritionist_id
+    db.delete(patient)
+    refresh_nutritionist_weeks(db, nutritionist_id, weeks)
+
+
+def reassign_patient(db: Session, patient: Patient, nutritionist_id: int):
+    """
+    Pasa un paciente a otro nutricionista, moviendo sus consultas y citas del
+    resumen del anterior al del nuevo. No hace commit.
+    """
+    previous_id = patient.nutritionist_id
+    if previous_id == nutritionist_id:
+        return
+    weeks = patient_weeks(db, patient.id)
+    patient.nutritionist_id = nutritionist_id
+    refresh_nutritionist_weeks(db, previous_id, weeks)
+    refresh_nutritionist_weeks(db, nutritionist_id, weeks)
+
+
+def rebuild_weekly_stats(db: Session, batch_size: int = 5000) -> int:
+    """
+    Reconstruye el resumen completo, un nutricionista por transacción. Las
+    consultas se leen en orden por paciente y fecha de a `batch_size` filas,
+    así que la memoria depende del historial de un paciente y no del total.
+    Retorna el número de consultas procesadas.
+    """
+    processed = 0
+    # También los que ya no tienen pacientes, para borrar sus filas viejas
+    nutritionist_ids = db.scalars(
+        select(Patient.nutritionist_id)
+        .union(select(ConsultationWeeklyStats.nutritionist_id))
+        .order_by("nutritionist_id")
+    ).all()
+
+    for nutritionist_id in nutritionist_ids:
+        stats = defaultdict(lambda: dict.fromkeys(_STAT_FIELDS, 0))
+        seen = set()
+
+        def close_patient(dates, appointments):
+            for scheduled_at, appointment in appointments:
+                week = stats[week_start(appointment)]
+                week["appointments_due"] += 1
+                week["appointments_kept"] += _is_kept(appointment, scheduled_at, dates)
+
+        rows = db.execute(
+            select(
+                Consultation.patient_id,
+                Consultation.consultation_date,
+                Consultation.weight_change,
+                Consultation.next_appointment
+            )
+            .join(Patient, Patient.id == Consultation.patient_id)
+            .where(Patient.nutritionist_id == nutritionist_id)
+            .order_by(Consultation.patient_id, Consultation.consultation_date)
+            .execution_options(yield_per=batch_size)
+        )
+        current_patient, dates, appointments = None, [], []
+        for row in rows:
+            if row.patient_id != current_patient:
+                close_patient(dates, appointments)
+                current_patient, dates, appointments = row.patient_id, [], []
+            processed += 1
+            if row.next_appointment:
+                appointments.append((row.consultation_date, row.next_appointment))
+            if row.consultation_date is None:
+                continue
+            dates.append(row.consultation_date)
+            week = week_start(row.consultation_date)
+            values = stats[week]
+            values["consultations"] += 1
+            if (week, row.patient_id) not in seen:
+                seen.add((week, row.patient_id))
+                values["patients_seen"] += 1
+            if row.weight_change is not None:
+                values["weight_change_sum"] += row.weight_change
+                values["weight_change_count"] += 1
+        close_patient(dates, appointments)
+
+        db.execute(delete(ConsultationWeeklyStats).where(ConsultationWeeklyStats.nutritionist_id == nutritionist_id))
+        _replace_weeks(db, nutritionist_id, dict(stats))
+        db.commit()
+
+    return processed
@@ -1,26 +1,19 @@
 from datetime import datetime, timedelta
 from typing import Optional
-import jwt
-from passlib.context import CryptContext
-from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
 import os
 
+from database import get_db
+from .user_cache import UserPrincipal, get_user_principal
+
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    """Hash a password."""
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -45,13 +38,41 @@ def verify_token(token: str):
                 headers={"WWW-Authenticate": "Bearer"},
             )
         return user_id
-    except jwt.PyJWTError:
+    except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+security = HTTPBearer()
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> UserPrincipal:
+    """
+    Get current authenticated user (cached principal, not the full row).
+    A plain def: on a cache miss the user is read with a blocking query, so
+    FastAPI runs it in the threadpool instead of on the event loop.
+    """
+    user_id = verify_token(credentials.credentials)
+    
+    user = get_user_principal(db, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user"
+        )
+    
+    return user
+
 def check_subscription_status(user):
     """Check if user's subscription is active."""
     now = datetime.now()
@@ -0,0 +1,239 @@
+"""
+Composición corporal a partir de pliegues cutáneos y circunferencias.
+
+Todas las fórmulas operan sobre columnas completas (numpy), de modo que la
+misma función sirve para calcular una consulta al guardarla y para recalcular
+el historial completo por lotes. Una medida faltante deja en None solo los
+valores que dependen de ella.
+
+- Densidad corporal: Durnin-Womersley (1974) con la suma de los pliegues
+  tricipital, bicipital, subescapular y suprailíaco, por sexo y edad.
+- % de grasa: Siri (495 / D - 450) y Brozek (457 / D - 414.2).
+- Masa grasa y masa libre de grasa a partir del % de grasa de Siri.
+- Índice cintura-cadera e índice cintura-talla.
+- Circunferencia muscular del brazo (CB - π × PT) y área muscular del brazo
+  corregida de Heymsfield (resta 10 cm² en hombres y 6.5 cm² en mujeres).
+"""
+from datetime import date, datetime
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models.consultation import Consultation
+from models.patient import Patient
+from .nutrition_batch import male_mask
+
+BODY_COMPOSITION_FIELDS = {
+    # campo: decimales
+    "body_density": 4,
+    "body_fat_siri": 2,
+    "body_fat_brozek": 2,
+    "fat_mass": 2,
+    "fat_free_mass": 2,
+    "waist_hip_ratio": 3,
+    "waist_height_ratio": 3,
+    "arm_muscle_circumference": 2,
+    "arm_muscle_area": 2
+}
+
+# Durnin-Womersley: D = c - m × log10(Σ4 pliegues), por edad mínima del rango.
+# Los menores de 20 años usan el rango 17-19 de la tabla original.
+DURNIN_WOMERSLEY_MALE = ((0, 1.1620, 0.0630), (20, 1.1631, 0.0632), (30, 1.1422, 0.0544), (40, 1.1620, 0.0700), (50, 1.1715, 0.0779))
+DURNIN_WOMERSLEY_FEMALE = ((0, 1.1549, 0.0678), (20, 1.1599, 0.0717), (30, 1.1423, 0.0632), (40, 1.1333, 0.0612), (50, 1.1339, 0.0645))
+
+# Corrección del área muscular del brazo por el área ósea (cm²)
+ARM_BONE_AREA_MALE = 10.0
+ARM_BONE_AREA_FEMALE = 6.5
+
+
+def _column(values: Sequence[Optional[float]]) -> np.ndarray:
+    """Convierte una columna con None en un arreglo float con NaN"""
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+
+def ages_at(birth_dates: Sequence[date], dates: Sequence[datetime]) -> np.ndarray:
+    """Edad cumplida de cada persona en la fecha correspondiente"""
+    births = np.asarray(birth_dates, dtype="datetime64[D]")
+    days = np.asarray(dates, dtype="datetime64[D]")
+    if births.size == 0:
+        return np.empty(0, dtype=int)
+    birth_years = births.astype("datetime64[Y]").astype(int)
+    years = days.astype("datetime64[Y]").astype(int)
+    # Se compara (mes, día) para saber si ya pasó el cumpleaños de ese año
+    birth_months = births.astype("datetime64[M]")
+    months = days.astype("datetime64[M]")
+    birth_month_numbers = birth_months.astype(int) % 12
+    month_numbers = months.astype(int) % 12
+    birth_days = (births - birth_months).astype(int)
+    month_days = (days - months).astype(int)
+    before_birthday = (month_numbers < birth_month_numbers) | (
+        (month_numbers == birth_month_numbers) & (month_days < birth_days)
+    )
+    return years - birth_years - before_birthday.astype(int)
+
+
+def _durnin_womersley(skinfold_sum: np.ndarray, ages: np.ndarray, is_male: np.ndarray) -> np.ndarray:
+    """Densidad corporal (g/ml) según sexo y rango de edad"""
+    intercept = np.full(len(ages), np.nan)
+    slope = np.full(len(ages), np.nan)
+    for table, mask in ((DURNIN_WOMERSLEY_MALE, is_male), (DURNIN_WOMERSLEY_FEMALE, ~is_male)):
+        for min_age, c, m in table:
+            band = mask & (ages >= min_age)
+            intercept[band] = c
+            slope[band] = m
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_sum = np.where(skinfold_sum > 0, np.log10(skinfold_sum), np.nan)
+    return intercept - slope * log_sum
+
+
+def compute_body_composition(
+    weights: Sequence[Optional[float]],
+    heights: Sequence[Optional[float]],
+    ages: Sequence[int],
+    genders: Sequence[str],
+    triceps: Sequence[Optional[float]],
+    biceps: Sequence[Optional[float]],
+    subscapular: Sequence[Optional[float]],
+    suprailiac: Sequence[Optional[float]],
+    waist: Sequence[Optional[float]],
+    hip: Sequence[Optional[float]],
+    arm: Sequence[Optional[float]]
+) -> Dict[str, np.ndarray]:
+    """
+    Calcula la composición corporal de una columna de consultas.
+    Pliegues en mm, circunferencias y talla en cm, peso en kg.
+    Retorna un arreglo por campo de BODY_COMPOSITION_FIELDS (NaN si falta una medida).
+    """
+    weight = _column(weights)
+    height = _column(heights)
+    age = np.asarray(ages, dtype=float).reshape(-1)
+    is_male = male_mask(genders)
+    triceps = _column(triceps)
+    waist = _column(waist)
+    hip = _column(hip)
+    arm = _column(arm)
+
+    # Suma de los cuatro pliegues (NaN si falta alguno)
+    skinfold_sum = triceps + _column(biceps) + _column(subscapular) + _column(suprailiac)
+    density = _durnin_womersley(skinfold_sum, age, is_male)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        siri = 495 / density - 450
+        brozek = 457 / density - 414.2
+        fat_mass = weight * siri / 100
+        waist_hip = np.where(hip > 0, waist / hip, np.nan)
+        waist_height = np.where(height > 0, waist / height, np.nan)
+
+    # Pliegue tricipital de mm a cm
+    arm_muscle_circumference = arm - np.pi * triceps / 10
+    arm_muscle_area = arm_muscle_circumference ** 2 / (4 * np.pi)\
+        - np.where(is_male, ARM_BONE_AREA_MALE, ARM_BONE_AREA_FEMALE)
+
+    return {
+        "body_density": density,
+        "body_fat_siri": siri,
+        "body_fat_brozek": brozek,
+        "fat_mass": fat_mass,
+        "fat_free_mass": weight - fat_mass,
+        "waist_hip_ratio": waist_hip,
+        "waist_height_ratio": waist_height,
+        "arm_muscle_circumference": arm_muscle_circumference,
+        "arm_muscle_area": arm_muscle_area
+    }
+
+
+def _row_values(results: Dict[str, np.ndarray], index: int) -> dict:
+    """Valores de una fila redondeados, con None en lugar de NaN"""
+    values = {}
+    for field, decimals in BODY_COMPOSITION_FIELDS.items():
+        value = results[field][index]
+        values[field] = None if np.isnan(value) else round(float(value), decimals)
+    return values
+
+
+def calculate_body_composition(consultation: Consultation, gender: str, birth_date: date) -> dict:
+    """Composición corporal de una consulta (edad a la fecha de la consulta)"""
+    consultation_date = consultation.consultation_date or datetime.now()
+    results = compute_body_composition(
+        [consultation.weight],
+        [consultation.height],
+        ages_at([birth_date], [consultation_date]),
+        [gender],
+        [consultation.triceps_skinfold],
+        [consultation.biceps_skinfold],
+        [consultation.subscapular_skinfold],
+        [consultation.suprailiac_skinfold],
+        [consultation.waist_circumference],
+        [consultation.hip_circumference],
+        [consultation.arm_circumference]
+    )
+    return _row_values(results, 0)
+
+
+def apply_body_composition(consultation: Consultation, gender: str, birth_date: date):
+    """Guarda en la consulta los valores de composición corporal calculados"""
+    for field, value in calculate_body_composition(consultation, gender, birth_date).items():
+        setattr(consultation, field, value)
+
+
+def recompute_all_body_composition(db: Session, batch_size: int = 1000) -> int:
+    """
+    Recalcula la composición corporal de todas las consultas de a `batch_size`
+    filas por transacción (paginación por id), leyendo solo las columnas
+    necesarias. Retorna el número de consultas actualizadas.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(
+                Consultation.id,
+                Consultation.consultation_date,
+                Consultation.weight,
+                Consultation.height,
+                Consultation.triceps_skinfold,
+                Consultation.biceps_skinfold,
+                Consultation.subscapular_skinfold,
+                Consultation.suprailiac_skinfold,
+                Consultation.waist_circumference,
+                Consultation.hip_circumference,
+                Consultation.arm_circumference,
+                Patient.gender,
+                Patient.birth_date
+            )
+            .join(Patient, Patient.id == Consultation.patient_id)
+            .where(Consultation.id > last_id)
+            .order_by(Consultation.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        results = compute_body_composition(
+            [row.weight for row in rows],
+            [row.height for row in rows],
+            ages_at(
+                [row.birth_date for row in rows],
+                [row.consultation_date or row.birth_date for row in rows]
+            ),
+            [row.gender for row in rows],
+            [row.triceps_skinfold for row in rows],
+            [row.biceps_skinfold for row in rows],
+            [row.subscapular_skinfold for row in rows],
+            [row.suprailiac_skinfold for row in rows],
+            [row.waist_circumference for row in rows],
+            [row.hip_circumference for row in rows],
+            [row.arm_circumference for row in rows]
+        )
+        db.execute(
+            update(Consultation),
+            [dict(_row_values(results, index), id=row.id) for index, row in enumerate(rows)]
+        )
+        db.commit()
+
+        processed += len(rows)
+        last_id = rows[-1].id
+
+    return processed
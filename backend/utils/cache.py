@@ -0,0 +1,85 @@
+"""
+Small key/value caches with a per-entry TTL.
+
+The in-process TTLCache is the default. Set a redis:// URL to share entries
+between workers (requires the optional `redis` package); values must then be
+JSON-serializable.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class TTLCache:
+    """Thread-safe in-process cache with expiry and LRU eviction."""
+
+    def __init__(self, ttl: float, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Shared cache backed by Redis; values are stored as JSON."""
+
+    def __init__(self, url: str, ttl: float, namespace: str):
+        import redis  # optional dependency
+
+        self.ttl = ttl
+        self.namespace = namespace
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._client.set(self._key(key), json.dumps(value), ex=max(1, int(self.ttl if ttl is None else ttl)))
+
+    def delete(self, key: str):
+        self._client.delete(self._key(key))
+
+    def clear(self):
+        for key in self._client.scan_iter(f"{self.namespace}:*"):
+            self._client.delete(key)
+
+
+def create_cache(namespace: str, ttl: float, url: Optional[str] = None, max_size: int = 10000):
+    """Build a cache: Redis when `url` is a redis:// URL, in-process otherwise."""
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisCache(url, ttl=ttl, namespace=namespace)
+    return TTLCache(ttl=ttl, max_size=max_size)
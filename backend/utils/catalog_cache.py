@@ -0,0 +1,148 @@
+"""
+Caché de los catálogos (menús, snacks e intercambios).
+
+Los catálogos cambian pocas veces al mes, así que cada combinación de filtros
+se guarda ya serializada en JSON junto con su ETag. Cada catálogo tiene una
+versión que cambia al confirmar cualquier alta, edición, borrado o carga de
+datos por defecto; las entradas de versiones anteriores dejan de usarse.
+
+Si el cliente envía If-None-Match con el ETag vigente se responde 304 sin
+cuerpo. Las versiones comprimidas (gzip/br según Accept-Encoding) también se
+generan una sola vez por entrada, fuera del bucle de eventos, y se guardan
+junto al JSON; cada codificación tiene su propio ETag. Con
+CATALOG_CACHE_URL=redis://... las versiones se comparten entre workers (cada
+worker mantiene su propia copia de los cuerpos).
+"""
+import hashlib
+import os
+import uuid
+from enum import Enum
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.menu import Menu
+from models.snack import Snack
+from models.food_exchange import FoodExchange
+from .cache import TTLCache, create_cache
+from .compression import COMPRESSION_MIN_SIZE, compress, negotiate_encoding
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "3600"))
+
+# Modelo -> nombre del catálogo
+CATALOG_MODELS = {
+    Menu: "menus",
+    Snack: "snacks",
+    FoodExchange: "food_exchanges"
+}
+
+_versions = create_cache("catalog-version", ttl=30 * 24 * 3600, url=os.getenv("CATALOG_CACHE_URL"))
+_bodies = TTLCache(ttl=CATALOG_CACHE_TTL, max_size=512)
+
+
+def get_catalog_version(catalog: str) -> str:
+    """Versión vigente del catálogo (se crea una nueva si no existe)"""
+    version = _versions.get(catalog)
+    if version is None:
+        version = bump_catalog_version(catalog)
+    return version
+
+
+def bump_catalog_version(catalog: str) -> str:
+    """Invalida todas las entradas cacheadas del catálogo"""
+    # Aleatoria en lugar de un contador: tras un reinicio no se repiten ETags viejos
+    version = uuid.uuid4().hex[:12]
+    _versions.set(catalog, version)
+    return version
+
+
+def catalog_key(**filters) -> str:
+    """Clave canónica de una combinación de filtros (se omiten los None)"""
+    parts = []
+    for name in sorted(filters):
+        value = filters[name]
+        if value is None:
+            continue
+        if isinstance(value, Enum):
+            value = value.value
+        parts.append(f"{name}={value}")
+    return "&".join(parts)
+
+
+class CachedBody:
+    """JSON de una entrada del catálogo y sus versiones comprimidas"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.encoded = {}  # codificación -> cuerpo comprimido
+
+    async def variant(self, encoding: str | None) -> tuple:
+        """
+        (codificación usada, ETag, cuerpo) para la codificación aceptada; los
+        cuerpos chicos no se comprimen. Se comprime solo la primera vez.
+        """
+        if encoding is None or len(self.body) < COMPRESSION_MIN_SIZE:
+            return None, f'"{self.etag}"', self.body
+        if encoding not in self.encoded:
+            self.encoded[encoding] = await run_in_threadpool(compress, self.body, encoding, True)
+        return encoding, f'"{self.etag}-{encoding}"', self.encoded[encoding]
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+async def cached_catalog_response(
+    request: Request,
+    catalog: str,
+    key: str,
+    build: Callable[[], Awaitable[bytes]]
+) -> Response:
+    """
+    Responde con el JSON cacheado del catálogo para `key`, generándolo con
+    `build` si no está en caché. Devuelve 304 si el ETag del cliente coincide.
+    """
+    version = get_catalog_version(catalog)
+    cache_key = f"{catalog}:{version}:{key}"
+
+    entry = _bodies.get(cache_key)
+    if entry is None:
+        entry = CachedBody(await build())
+        _bodies.set(cache_key, entry)
+
+    encoding, etag, body = await entry.variant(negotiate_encoding(request.headers.get("accept-encoding")))
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Las versiones cambian al confirmar la transacción, igual que la caché de usuarios
+@event.listens_for(Session, "after_flush")
+def _collect_changed_catalogs(session, flush_context):
+    changed = session.info.setdefault("changed_catalogs", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        catalog = CATALOG_MODELS.get(type(obj))
+        if catalog:
+            changed.add(catalog)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_changed_catalogs(session):
+    for catalog in session.info.pop("changed_catalogs", ()):
+        bump_catalog_version(catalog)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_catalogs(session):
+    session.info.pop("changed_catalogs", None)
@@ -0,0 +1,97 @@
+"""
+Compression codecs shared by CompressionMiddleware and the catalog cache:
+gzip, and brotli when the optional `brotli` package is installed.
+
+negotiate_encoding picks the best encoding allowed by Accept-Encoding;
+compress handles whole bodies and StreamCompressor chunked ones.
+"""
+import os
+import zlib
+from typing import Optional
+
+try:
+    import brotli  # optional dependency
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# Bodies compressed once and cached can afford a slower, denser setting
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 9
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml"
+)
+
+
+def supported_encodings() -> tuple:
+    """Encodings this process can produce, in order of preference."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported encoding allowed by an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if token:
+            weights[token] = weight
+
+    preference = supported_encodings()
+    candidates = [
+        (weights.get(encoding, weights.get("*", 0.0)), -index, encoding)
+        for index, encoding in enumerate(preference)
+    ]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    """Compress a whole body with `encoding` ("gzip" or "br")."""
+    if encoding == "br":
+        return brotli.compress(body, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    compressor = zlib.compressobj(CACHED_GZIP_LEVEL if cached else GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+class StreamCompressor:
+    """Incremental compressor; every chunk is flushed so clients can decode it right away."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
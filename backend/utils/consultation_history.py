@@ -0,0 +1,110 @@
+"""
+Mantenimiento incremental del cambio de peso entre consultas.
+
+`weight_change` de una consulta es su peso menos el de la consulta anterior
+del mismo paciente (orden por fecha y, en empates, por id). Al crear, editar o
+borrar una consulta solo cambian la propia consulta y la siguiente en la
+posición anterior y en la nueva, así que se recalculan únicamente esas filas
+usando el índice (patient_id, consultation_date).
+"""
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from models.consultation import Consultation
+
+# Posición de una consulta en la historia del paciente
+ConsultationKey = Tuple[datetime, int]
+
+
+def consultation_key(consultation: Consultation) -> ConsultationKey:
+    return (consultation.consultation_date, consultation.id)
+
+
+def _order_key():
+    return tuple_(Consultation.consultation_date, Consultation.id)
+
+
+def _previous_weight(db: Session, patient_id: int, key: ConsultationKey) -> Optional[float]:
+    row = db.query(Consultation.weight)\
+        .filter(Consultation.patient_id == patient_id, _order_key() < tuple_(*key))\
+        .order_by(Consultation.consultation_date.desc(), Consultation.id.desc())\
+        .first()
+    return row.weight if row else None
+
+
+def _next_consultation(db: Session, patient_id: int, key: ConsultationKey) -> Optional[Consultation]:
+    return db.query(Consultation)\
+        .filter(Consultation.patient_id == patient_id, _order_key() > tuple_(*key))\
+        .order_by(Consultation.consultation_date, Consultation.id)\
+        .first()
+
+
+def _recompute(db: Session, consultation: Consultation):
+    previous = _previous_weight(db, consultation.patient_id, consultation_key(consultation))
+    if previous is None or consultation.weight is None:
+        consultation.weight_change = None
+    else:
+        consultation.weight_change = consultation.weight - previous
+
+
+def refresh_weight_changes(db: Session, patient_id: int, keys: Iterable[ConsultationKey]) -> List[Consultation]:
+    """
+    Recalcula `weight_change` de las consultas afectadas por cambios en las
+    posiciones `keys`: la consulta que ocupa cada posición (si aún existe) y la
+    siguiente. Los cambios pendientes deben estar en la base (flush) antes.
+    Retorna las consultas recalculadas.
+    """
+    affected = {}
+    for key in keys:
+        current = db.get(Consultation, key[1])
+        if current is not None and current.patient_id == patient_id:
+            affected[current.id] = current
+        following = _next_consultation(db, patient_id, key)
+        if following is not None:
+            affected[following.id] = following
+
+    for consultation in affected.values():
+        _recompute(db, consultation)
+    return list(affected.values())
+
+
+def recompute_all_weight_changes(db: Session, batch_size: int = 500) -> int:
+    """
+    Recalcula `weight_change` de todas las consultas con LAG() por paciente,
+    de a `batch_size` pacientes por transacción. Pensado para migraciones o
+    reparaciones; retorna el número de consultas revisadas.
+    """
+    processed = 0
+    last_patient_id = 0
+    while True:
+        patient_ids = db.scalars(
+            select(Consultation.patient_id)
+            .where(Consultation.patient_id > last_patient_id)
+            .group_by(Consultation.patient_id)
+            .order_by(Consultation.patient_id)
+            .limit(batch_size)
+        ).all()
+        if not patient_ids:
+            break
+
+        previous_weight = func.lag(Consultation.weight).over(
+            partition_by=Consultation.patient_id,
+            order_by=(Consultation.consultation_date, Consultation.id)
+        )
+        rows = db.execute(
+            select(Consultation.id, (Consultation.weight - previous_weight).label("weight_change"))
+            .where(Consultation.patient_id.in_(patient_ids))
+        ).all()
+        db.execute(
+            update(Consultation),
+            [{"id": row.id, "weight_change": row.weight_change} for row in rows]
+        )
+        db.commit()
+
+        processed += len(rows)
+        last_patient_id = patient_ids[-1]
+
+    return processed
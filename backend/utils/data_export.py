@@ -0,0 +1,192 @@
+"""
+Exportación en streaming de pacientes y consultas en CSV, NDJSON o XLSX.
+
+Las filas se leen con un cursor del lado del servidor (yield_per) en una sesión
+propia del generador, que sigue abierta mientras se envía la respuesta, y cada
+formato se codifica por bloques de EXPORT_CHUNK_ROWS filas. Los primeros bytes
+salen en cuanto está listo el primer bloque y la memoria no crece con el número
+de filas exportadas.
+
+Los XLSX se escriben como un zip en streaming (data descriptors, sin seek) con
+una sola hoja de cadenas en línea, así que también se envían por partes.
+
+En CSV, los textos que empiezan por =, +, -, @, tabulador o retorno de carro
+se anteponen con ' para que las hojas de cálculo no los evalúen como fórmulas
+(inyección CSV). En XLSX las cadenas en línea nunca se evalúan.
+"""
+import csv
+import io
+import json
+import zipfile
+from datetime import date, datetime
+from enum import Enum
+from typing import Callable, Iterable, Iterator, Sequence
+from xml.sax.saxutils import escape
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_ROWS = 500
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+# Primeros caracteres con los que una celda se interpreta como fórmula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _export_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_export_rows(
+    session_factory: Callable[[], Session],
+    statement: Select,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[tuple]:
+    """Recorre las filas de `statement` con un cursor del servidor en una sesión nueva"""
+    db = session_factory()
+    try:
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        for row in result:
+            yield tuple(_export_value(value) for value in row)
+    finally:
+        db.close()
+
+
+def _chunks(rows: Iterable[tuple]) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv_value(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(columns: Sequence[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    # BOM para que las hojas de cálculo detecten UTF-8 (tildes en los nombres)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield ("﻿" + buffer.getvalue()).encode("utf-8")
+    for chunk in _chunks(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(value) for value in row] for row in chunk)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(columns: Sequence[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    for chunk in _chunks(rows):
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in chunk
+        ).encode("utf-8")
+
+
+class _ZipStream(io.RawIOBase):
+    """Destino de solo escritura y sin seek para zipfile; el generador va vaciando los bytes"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    )
+}
+
+
+def _xlsx_row(values: Iterable) -> str:
+    cells = []
+    for value in values:
+        if value is None:
+            cells.append("<c/>")
+        elif isinstance(value, bool):
+            cells.append(f'<c t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, (int, float)):
+            cells.append(f"<c><v>{value}</v></c>")
+        else:
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>')
+    return "<row>" + "".join(cells) + "</row>"
+
+
+def stream_xlsx(columns: Sequence[str], rows: Iterable[tuple], sheet: str = "Datos") -> Iterator[bytes]:
+    sink = _ZipStream()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content.replace("{sheet}", escape(sheet)))
+        yield sink.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as worksheet:
+            worksheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            worksheet.write(_xlsx_row(columns).encode("utf-8"))
+            for chunk in _chunks(rows):
+                worksheet.write("".join(_xlsx_row(row) for row in chunk).encode("utf-8"))
+                yield sink.drain()
+            worksheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+
+
+_WRITERS = {"csv": stream_csv, "ndjson": stream_ndjson, "xlsx": stream_xlsx}
+
+
+def stream_export(export_format: str, columns: Sequence[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    """Codifica `rows` (tuplas en el orden de `columns`) en el formato pedido"""
+    return _WRITERS[export_format](columns, rows)
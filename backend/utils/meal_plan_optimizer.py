@@ -0,0 +1,282 @@
+"""
+Generación automática de planes de alimentación con el sistema de intercambios.
+
+El plan se arma en dos pasos, ambos vectorizados con numpy:
+
+1. Porciones diarias por grupo: se resuelve un problema de mínimos cuadrados
+   acotado (descenso de gradiente proyectado) sobre el intercambio promedio de
+   cada grupo para acercarse a las calorías y macronutrientes objetivo.
+2. Selección de alimentos: las porciones se reparten entre los tiempos de
+   comida y, para cada una, se elige el alimento del grupo que deja el total
+   del día más cerca del objetivo (con penalización por repetir alimentos).
+   Al final se ajustan las porciones en pasos de media porción.
+
+Los alimentos se filtran por alergias y alimentos no deseados (preferencias y
+ficha del paciente), dieta vegetariana (sin carnes ni huevo) o vegana (además
+sin lácteos ni otros productos animales), diabetes (sin azúcares) e
+hipertensión (sin alimentos altos en sodio). Con catálogos de miles de alimentos el plan se
+genera en pocos milisegundos.
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models.food_exchange import FoodExchange, FoodExchangeCategory
+from .catalog_cache import get_catalog_version
+from .patient_search import normalize_search_text
+
+# Sodio máximo por porción (mg) para pacientes hipertensos
+HYPERTENSION_MAX_SODIUM_MG = 400
+
+# Peso relativo del error en calorías, proteínas, carbohidratos y grasas
+MACRO_WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])
+
+# Productos animales que quedan fuera de los grupos de carnes y lácteos
+# (términos normalizados, como los de parse_food_list)
+VEGAN_EXCLUDED_TERMS = ["huevo", "mantequilla", "miel", "queso", "crema de leche", "arequipe"]
+
+# Penalización por repetir un alimento en el mismo día
+REPEAT_PENALTY = 0.02
+
+MEAL_TIMES = ["Desayuno", "Media mañana", "Almuerzo", "Onces", "Cena"]
+SNACK_TIMES = ["Media mañana", "Onces"]
+
+# Porciones diarias mínimas y máximas por grupo
+PORTION_BOUNDS = {
+    FoodExchangeCategory.CEREALS: (2, 12),
+    FoodExchangeCategory.LEGUMES: (0, 3),
+    FoodExchangeCategory.VEGETABLES: (2, 6),
+    FoodExchangeCategory.FRUITS: (2, 5),
+    FoodExchangeCategory.MEAT: (1, 8),
+    FoodExchangeCategory.DAIRY: (1, 4),
+    FoodExchangeCategory.FATS: (1, 8),
+    FoodExchangeCategory.SUGARS: (0, 1)
+}
+
+# Reparto de las porciones de cada grupo entre los tiempos de comida
+MEAL_SHARES = {
+    FoodExchangeCategory.CEREALS: {"Desayuno": 0.3, "Almuerzo": 0.4, "Cena": 0.3},
+    FoodExchangeCategory.LEGUMES: {"Almuerzo": 1.0},
+    FoodExchangeCategory.VEGETABLES: {"Almuerzo": 0.5, "Cena": 0.5},
+    FoodExchangeCategory.FRUITS: {"Desayuno": 0.3, "Media mañana": 0.4, "Onces": 0.3},
+    FoodExchangeCategory.MEAT: {"Desayuno": 0.2, "Almuerzo": 0.45, "Cena": 0.35},
+    FoodExchangeCategory.DAIRY: {"Desayuno": 0.4, "Media mañana": 0.3, "Onces": 0.3},
+    FoodExchangeCategory.FATS: {"Desayuno": 0.3, "Almuerzo": 0.4, "Cena": 0.3},
+    FoodExchangeCategory.SUGARS: {"Onces": 1.0}
+}
+
+CATEGORIES = list(PORTION_BOUNDS)
+
+
+@dataclass
+class FoodCatalog:
+    """Intercambios del catálogo como arreglos (macros por porción)"""
+    version: str
+    ids: np.ndarray
+    names: List[str]
+    search_names: List[str]
+    portion_sizes: List[str]
+    categories: np.ndarray
+    macros: np.ndarray  # (n, 4): calorías, proteínas, carbohidratos, grasas
+    sodium: np.ndarray
+
+
+_catalog: Optional[FoodCatalog] = None
+
+
+def load_food_catalog(db: Session) -> FoodCatalog:
+    """Carga el catálogo de intercambios, reutilizándolo mientras no cambie su versión"""
+    global _catalog
+    version = get_catalog_version("food_exchanges")
+    if _catalog is not None and _catalog.version == version:
+        return _catalog
+
+    rows = db.query(
+        FoodExchange.id,
+        FoodExchange.name,
+        FoodExchange.category,
+        FoodExchange.portion_size,
+        FoodExchange.calories,
+        FoodExchange.proteins,
+        FoodExchange.carbohydrates,
+        FoodExchange.fats,
+        FoodExchange.sodium
+    ).order_by(FoodExchange.id).all()
+
+    _catalog = FoodCatalog(
+        version=version,
+        ids=np.array([row.id for row in rows], dtype=np.int64),
+        names=[row.name for row in rows],
+        search_names=[normalize_search_text(row.name) for row in rows],
+        portion_sizes=[row.portion_size or "1 porción" for row in rows],
+        categories=np.array([getattr(row.category, "value", row.category) for row in rows], dtype=object),
+        macros=np.array(
+            [[row.calories or 0, row.proteins or 0, row.carbohydrates or 0, row.fats or 0] for row in rows],
+            dtype=float
+        ).reshape(-1, 4),
+        sodium=np.array([row.sodium or 0 for row in rows], dtype=float)
+    )
+    return _catalog
+
+
+def parse_food_list(value: Optional[str]) -> List[str]:
+    """Convierte un texto libre o una lista JSON de alimentos en términos normalizados"""
+    if not value:
+        return []
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        parsed = None
+    items = parsed if isinstance(parsed, list) else re.split(r"[,;\n]", value)
+    terms = [normalize_search_text(item) for item in items]
+    return [term for term in terms if term]
+
+
+def _bounded_least_squares(A: np.ndarray, b: np.ndarray, lower: np.ndarray, upper: np.ndarray, iterations: int = 500) -> np.ndarray:
+    """min ||Ax - b||² con lower <= x <= upper (gradiente proyectado)"""
+    x = np.clip(np.linalg.lstsq(A, b, rcond=None)[0], lower, upper)
+    step = 1.0 / max(np.linalg.norm(A, 2) ** 2, 1e-9)
+    for _ in range(iterations):
+        x = np.clip(x - step * (A.T @ (A @ x - b)), lower, upper)
+    return x
+
+
+def generate_meal_plan(
+    catalog: FoodCatalog,
+    targets: Dict[str, float],
+    excluded_terms: Sequence[str] = (),
+    is_vegetarian: bool = False,
+    is_vegan: bool = False,
+    has_diabetes: bool = False,
+    has_hypertension: bool = False,
+    snacks_per_day: int = 2
+) -> dict:
+    """
+    Compone un plan diario a partir de los intercambios del catálogo.
+    `targets` usa las claves caloric_requirement, proteins_g, carbs_g y fats_g.
+    Retorna los ítems del plan (en el formato de MealPlanItemCreate) y los totales.
+    """
+    target = np.array([
+        targets["caloric_requirement"],
+        targets["proteins_g"],
+        targets["carbs_g"],
+        targets["fats_g"]
+    ], dtype=float)
+    scale = MACRO_WEIGHTS / np.maximum(target, 1.0)
+
+    # Alimentos permitidos
+    allowed = np.ones(len(catalog.names), dtype=bool)
+    if is_vegan:
+        excluded_terms = list(excluded_terms) + VEGAN_EXCLUDED_TERMS
+    if excluded_terms:
+        allowed &= np.array([
+            not any(term in name for term in excluded_terms) for name in catalog.search_names
+        ], dtype=bool)
+    if has_hypertension:
+        allowed &= catalog.sodium <= HYPERTENSION_MAX_SODIUM_MG
+
+    bounds = dict(PORTION_BOUNDS)
+    if is_vegetarian or is_vegan:
+        # El huevo está en el grupo de carnes
+        bounds[FoodExchangeCategory.MEAT] = (0, 0)
+        bounds[FoodExchangeCategory.LEGUMES] = (1, 6)
+    if is_vegan:
+        bounds[FoodExchangeCategory.DAIRY] = (0, 0)
+    if has_diabetes:
+        bounds[FoodExchangeCategory.SUGARS] = (0, 0)
+
+    candidates = {}
+    for category in CATEGORIES:
+        positions = np.flatnonzero(allowed & (catalog.categories == category.value))
+        if len(positions) and bounds[category][1] > 0:
+            candidates[category] = positions
+    if not candidates:
+        return {"items": [], "totals": dict(zip(("calories", "proteins", "carbohydrates", "fats"), [0.0] * 4))}
+
+    # 1. Porciones diarias por grupo sobre el intercambio promedio
+    categories = list(candidates)
+    averages = np.array([catalog.macros[candidates[c]].mean(axis=0) for c in categories])
+    daily = _bounded_least_squares(
+        (averages * scale).T,
+        target * scale,
+        np.array([bounds[c][0] for c in categories], dtype=float),
+        np.array([bounds[c][1] for c in categories], dtype=float)
+    )
+
+    # 2. Reparto por tiempo de comida, en medias porciones
+    skipped_times = set(SNACK_TIMES[max(snacks_per_day, 0):])
+    meal_times = [meal for meal in MEAL_TIMES if meal not in skipped_times]
+    slots = []
+    for category, portions in zip(categories, daily):
+        shares = {meal: share for meal, share in MEAL_SHARES[category].items() if meal in meal_times}
+        if not shares:
+            shares = {"Almuerzo": 1.0}
+        total_share = sum(shares.values())
+        for meal, share in shares.items():
+            slot_portions = round(portions * share / total_share * 2) / 2
+            if slot_portions >= 0.5:
+                slots.append((meal, category, slot_portions))
+    slots.sort(key=lambda slot: meal_times.index(slot[0]))
+
+    # 3. Elección de alimentos: cada porción se evalúa contra el total proyectado
+    average_by_category = dict(zip(categories, averages))
+    projected = sum((portions * average_by_category[category] for _, category, portions in slots), np.zeros(4))
+    current = np.zeros(4)
+    uses = np.zeros(len(catalog.names))
+    chosen = []
+    for meal, category, portions in slots:
+        projected -= portions * average_by_category[category]
+        positions = candidates[category]
+        totals = current + projected + portions * catalog.macros[positions]
+        score = np.square((totals - target) * scale).sum(axis=1) + REPEAT_PENALTY * uses[positions]
+        best = positions[int(np.argmin(score))]
+        uses[best] += 1
+        current += portions * catalog.macros[best]
+        chosen.append([meal, best, portions])
+
+    # 4. Ajuste fino de porciones (±0.5) mientras mejore el error
+    def error(values):
+        return float(np.square((values - target) * scale).sum())
+
+    for _ in range(10):
+        improved = False
+        for entry in chosen:
+            macros = catalog.macros[entry[1]]
+            for delta in (0.5, -0.5):
+                if entry[2] + delta < 0.5:
+                    continue
+                candidate = current + delta * macros
+                if error(candidate) < error(current):
+                    current = candidate
+                    entry[2] += delta
+                    improved = True
+                    break
+        if not improved:
+            break
+
+    items = []
+    for meal, position, portions in chosen:
+        calories, proteins, carbohydrates, fats = (portions * catalog.macros[position]).tolist()
+        items.append({
+            "meal_time": meal,
+            "food_item": catalog.names[position],
+            "portion": f"{portions:g} x {catalog.portion_sizes[position]}",
+            "calories": round(calories, 1),
+            "proteins": round(proteins, 1),
+            "carbohydrates": round(carbohydrates, 1),
+            "fats": round(fats, 1)
+        })
+
+    return {
+        "items": items,
+        "totals": {
+            "calories": round(sum(item["calories"] for item in items), 1),
+            "proteins": round(sum(item["proteins"] for item in items), 1),
+            "carbohydrates": round(sum(item["carbohydrates"] for item in items), 1),
+            "fats": round(sum(item["fats"] for item in items), 1)
+        }
+    }
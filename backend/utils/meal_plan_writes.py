@@ -0,0 +1,139 @@
+"""
+Escritura de planes de alimentación en una sola transacción.
+
+Los planes y sus ítems se insertan con sentencias masivas (executemany) y los
+totales se calculan en la base de datos con un único UPDATE sobre todos los
+planes afectados. Al actualizar, solo se tocan los ítems que cambiaron.
+Ninguna función hace commit: el llamador confirma todo junto, de modo que un
+error no deja planes a medio escribir.
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from models.meal_plan import MealPlan, MealPlanItem
+
+ITEM_FIELDS = ("meal_time", "food_item", "portion", "calories", "proteins", "carbohydrates", "fats")
+
+_plans = MealPlan.__table__
+_items = MealPlanItem.__table__
+
+
+def _item_total(column):
+    return select(func.coalesce(func.sum(column), 0.0))\
+        .where(_items.c.meal_plan_id == _plans.c.id)\
+        .scalar_subquery()
+
+
+def refresh_meal_plan_totals(db: Session, plan_ids: Iterable[int]):
+    """Recalcula los totales de los planes a partir de sus ítems, en un solo UPDATE"""
+    plan_ids = list(plan_ids)
+    if not plan_ids:
+        return
+    db.execute(
+        update(_plans)
+        .where(_plans.c.id.in_(plan_ids))
+        .values(
+            total_calories=_item_total(_items.c.calories),
+            total_proteins=_item_total(_items.c.proteins),
+            total_carbohydrates=_item_total(_items.c.carbohydrates),
+            total_fats=_item_total(_items.c.fats)
+        )
+    )
+
+
+def create_meal_plans(db: Session, plans: Sequence[dict]) -> List[int]:
+    """
+    Inserta varios planes con sus ítems (clave "items") y calcula sus totales.
+    Retorna los ids en el mismo orden que `plans`.
+    """
+    if not plans:
+        return []
+
+    plan_rows = [{key: value for key, value in plan.items() if key != "items"} for plan in plans]
+    plan_ids = db.scalars(
+        insert(MealPlan).returning(MealPlan.id, sort_by_parameter_order=True),
+        plan_rows
+    ).all()
+
+    item_rows = [
+        dict({field: item[field] for field in ITEM_FIELDS}, meal_plan_id=plan_id)
+        for plan_id, plan in zip(plan_ids, plans)
+        for item in plan["items"]
+    ]
+    if item_rows:
+        db.execute(insert(MealPlanItem), item_rows)
+
+    refresh_meal_plan_totals(db, plan_ids)
+    return list(plan_ids)
+
+
+def diff_meal_plan_items(
+    existing: Dict[int, tuple],
+    incoming: Sequence[dict]
+) -> Tuple[List[dict], List[dict], List[int]]:
+    """
+    Compara los ítems guardados (id -> valores de ITEM_FIELDS) con los nuevos.
+    Los ítems nuevos se emparejan primero por id, luego por contenido idéntico,
+    y los restantes reutilizan filas sobrantes. Retorna (inserts, updates, ids a borrar).
+    """
+    remaining = dict(existing)
+    unmatched = []
+    updates = []
+
+    for item in incoming:
+        item_id = item.get("id")
+        values = {field: item[field] for field in ITEM_FIELDS}
+        if item_id in remaining:
+            if remaining.pop(item_id) != tuple(values.values()):
+                updates.append(dict(values, id=item_id))
+        else:
+            unmatched.append(values)
+
+    # Ítems sin id (o de otro plan) que ya existen con el mismo contenido
+    by_content = {}
+    for item_id, values in remaining.items():
+        by_content.setdefault(values, []).append(item_id)
+    still_unmatched = []
+    for values in unmatched:
+        same = by_content.get(tuple(values.values()))
+        if same:
+            del remaining[same.pop()]
+        else:
+            still_unmatched.append(values)
+
+    # Las filas sobrantes se reutilizan antes de insertar o borrar
+    spare_ids = sorted(remaining)
+    inserts = []
+    for values in still_unmatched:
+        if spare_ids:
+            updates.append(dict(values, id=spare_ids.pop(0)))
+        else:
+            inserts.append(values)
+
+    return inserts, updates, spare_ids
+
+
+def replace_meal_plan_items(db: Session, plan_id: int, items: Sequence[dict]) -> dict:
+    """
+    Deja el plan con exactamente `items`, escribiendo solo las diferencias, y
+    recalcula sus totales. Retorna el número de ítems insertados, actualizados y borrados.
+    """
+    rows = db.query(MealPlanItem.id, *[getattr(MealPlanItem, field) for field in ITEM_FIELDS])\
+        .filter(MealPlanItem.meal_plan_id == plan_id)\
+        .all()
+    existing = {row[0]: tuple(row[1:]) for row in rows}
+
+    inserts, updates, delete_ids = diff_meal_plan_items(existing, items)
+
+    if delete_ids:
+        db.execute(delete(_items).where(_items.c.id.in_(delete_ids)))
+    if updates:
+        # UPDATE masivo por clave primaria
+        db.execute(update(MealPlanItem), updates)
+    if inserts:
+        db.execute(insert(_items), [dict(values, meal_plan_id=plan_id) for values in inserts])
+
+    refresh_meal_plan_totals(db, [plan_id])
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": len(delete_ids)}
@@ -0,0 +1,57 @@
+"""
+Schema migrations (Alembic, scripts in migrations/versions).
+
+Migrations run out of band with `python manage.py migrate`, before the new
+code is started. On startup the server only compares the revision stored in
+the database with the head revision of the scripts: one indexed read of the
+alembic_version table, no schema reflection.
+"""
+import logging
+from pathlib import Path
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def alembic_config() -> Config:
+    """Alembic configuration that works from any working directory."""
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+    # Keep the application's logging setup
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def head_revision() -> Optional[str]:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(engine: Engine) -> Optional[str]:
+    with engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def upgrade_database(revision: str = "head"):
+    """Apply pending migrations up to `revision`."""
+    command.upgrade(alembic_config(), revision)
+
+
+def check_schema_revision(engine: Engine) -> bool:
+    """True if the database is at the head revision; logs what to run otherwise."""
+    current, head = current_revision(engine), head_revision()
+    if current == head:
+        logger.info(f"Database schema at revision {current}")
+        return True
+    logger.error(
+        f"Database schema at revision {current}, code expects {head}. "
+        "Run `python manage.py migrate` before starting the server."
+    )
+    return False
@@ -0,0 +1,166 @@
+"""
+Motor de cálculos nutricionales por lotes (NumPy).
+
+Replica operación por operación las funciones escalares de
+nutrition_calculations.py sobre columnas completas de pacientes, de modo que
+los resultados coinciden exactamente con los de las funciones escalares.
+"""
+from datetime import date
+from enum import Enum
+from typing import Sequence
+
+import numpy as np
+
+from .nutrition_calculations import get_activity_factor, get_stress_factor
+
+MALE_VALUES = ("masculino", "male")
+
+
+def as_text(values: Sequence) -> np.ndarray:
+    """Convierte una columna (str o Enum) en un arreglo de texto"""
+    return np.asarray([v.value if isinstance(v, Enum) else v for v in values], dtype=str)
+
+
+def male_mask(genders: Sequence) -> np.ndarray:
+    """True en las posiciones de sexo masculino (Gender o texto, sin distinguir mayúsculas)"""
+    return np.isin(np.char.lower(as_text(genders)), MALE_VALUES)
+
+
+def _map_values(values: np.ndarray, mapper) -> np.ndarray:
+    """Aplica `mapper` una sola vez por valor distinto y expande el resultado"""
+    if values.size == 0:
+        return np.empty(0, dtype=float)
+    uniques, inverse = np.unique(values, return_inverse=True)
+    mapped = np.array([mapper(str(value)) for value in uniques], dtype=float)
+    return mapped[inverse]
+
+
+def _round(values: np.ndarray, decimals: int = 2) -> np.ndarray:
+    """
+    Redondeo equivalente a round() de Python.
+    np.round escala, redondea y divide; en los casos cercanos a .5 el escalado
+    puede caer del otro lado del empate, así que esos pocos valores se
+    redondean con round() para conservar el resultado exacto.
+    """
+    scale = 10.0 ** decimals
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+    near_tie = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(float(v), decimals) for v in values[near_tie]]
+    return rounded
+
+
+def calculate_ages(birth_dates: Sequence[date], today: date | None = None) -> np.ndarray:
+    """Calcula la edad de cada fecha de nacimiento (equivalente a calculate_age)"""
+    today = today or date.today()
+    births = np.asarray(birth_dates, dtype="datetime64[D]")
+    months = births.astype("datetime64[M]")
+    birth_years = births.astype("datetime64[Y]").astype(int) + 1970
+    birth_months = months.astype(int) % 12 + 1
+    birth_days = (births - months).astype(int) + 1
+    before_birthday = (birth_months > today.month) | (
+        (birth_months == today.month) & (birth_days > today.day)
+    )
+    return today.year - birth_years - before_birthday.astype(int)
+
+
+def get_bmi_categories(bmi: np.ndarray, ages: np.ndarray) -> np.ndarray:
+    """Categoriza cada IMC según su rango de edad (equivalente a get_bmi_category)"""
+    young = ages < 18
+    adult = (ages >= 18) & (ages < 65)
+    elderly = ages >= 65
+    conditions = [
+        young & (bmi < 18.5), young & (bmi < 25), young & (bmi < 30), young,
+        adult & (bmi < 18.5), adult & (bmi < 25), adult & (bmi < 30),
+        adult & (bmi < 35), adult & (bmi < 40), adult,
+        elderly & (bmi < 23), elderly & (bmi < 28), elderly & (bmi < 33), elderly,
+    ]
+    choices = [
+        "Bajo peso", "Normal", "Sobrepeso", "Obesidad",
+        "Bajo peso", "Normal", "Sobrepeso",
+        "Obesidad I", "Obesidad II", "Obesidad III",
+        "Bajo peso", "Normal", "Sobrepeso", "Obesidad",
+    ]
+    return np.select(conditions, choices, default="Obesidad").astype(object)
+
+
+def calculate_batch(
+    weights: Sequence[float],
+    heights: Sequence[float],
+    ages: Sequence[int],
+    genders: Sequence[str],
+    activity_levels: Sequence[str],
+    patient_types: Sequence[str],
+) -> dict:
+    """
+    Calcula en una sola pasada todos los valores derivados de una cohorte.
+    Cada argumento es una columna con un valor por paciente.
+    Retorna un diccionario de arreglos NumPy con las mismas claves que
+    calculate_caloric_requirement más IMC, categoría y pesos ideal/ajustado.
+    """
+    weight = np.asarray(weights, dtype=float)
+    height = np.asarray(heights, dtype=float)
+    age = np.asarray(ages, dtype=int)
+    activity = as_text(activity_levels)
+    patient_type = as_text(patient_types)
+    is_male = male_mask(genders)
+
+    # IMC
+    height_m = height / 100
+    bmi = _round(weight / (height_m ** 2))
+    bmi_category = get_bmi_categories(bmi, age)
+
+    # Peso ideal (Devine) y peso ajustado
+    height_inches = height / 2.54
+    ideal_weight = np.where(
+        is_male,
+        50 + 2.3 * (height_inches - 60),
+        45.5 + 2.3 * (height_inches - 60),
+    )
+    ideal_weight = _round(np.maximum(ideal_weight, 45))
+    adjusted_weight = np.where(
+        weight <= ideal_weight,
+        weight,
+        _round(ideal_weight + 0.25 * (weight - ideal_weight)),
+    )
+
+    # TMB (Harris-Benedict revisada)
+    tmb = np.where(
+        is_male,
+        88.362 + (13.397 * weight) + (4.799 * height) - (5.677 * age),
+        447.593 + (9.247 * weight) + (3.098 * height) - (4.330 * age),
+    )
+    tmb = _round(tmb)
+
+    # Requerimiento energético total
+    activity_factor = _map_values(activity, get_activity_factor)
+    stress_factor = _map_values(patient_type, get_stress_factor)
+    caloric_requirement = tmb * activity_factor * stress_factor
+    is_pregnant = patient_type == "embarazada"
+    is_athlete = patient_type == "deportista"
+    caloric_requirement = np.where(is_pregnant, caloric_requirement + 300, caloric_requirement)
+    caloric_requirement = np.where(is_athlete, caloric_requirement * 1.1, caloric_requirement)
+
+    # Distribución de macronutrientes
+    protein_per_kg = np.where(is_athlete, 1.8, np.where(patient_type == "adulto_mayor", 1.2, 1.0))
+    proteins_g = weight * protein_per_kg
+    proteins_kcal = proteins_g * 4
+    fats_kcal = caloric_requirement * 0.275
+    fats_g = fats_kcal / 9
+    carbs_kcal = caloric_requirement - proteins_kcal - fats_kcal
+    carbs_g = carbs_kcal / 4
+
+    return {
+        "bmi": bmi,
+        "bmi_category": bmi_category,
+        "ideal_weight": ideal_weight,
+        "adjusted_weight": adjusted_weight,
+        "tmb": _round(tmb),
+        "caloric_requirement": _round(caloric_requirement),
+        "proteins_g": _round(proteins_g),
+        "carbs_g": _round(carbs_g),
+        "fats_g": _round(fats_g),
+        "activity_factor": activity_factor,
+        "stress_factor": stress_factor
+    }
@@ -0,0 +1,24 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+
+def encode_cursor(*values) -> str:
+    """Encode the keyset values of the last row into an opaque cursor."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Decode a cursor produced by encode_cursor, converting each value to the expected type."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(types):
+            raise ValueError("cursor length mismatch")
+        return tuple(
+            datetime.fromisoformat(value) if expected is datetime else expected(value)
+            for value, expected in zip(values, types)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
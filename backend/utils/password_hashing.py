@@ -0,0 +1,168 @@
+"""
+Password hashing on a dedicated, bounded process pool.
+
+bcrypt is deliberately slow (~250ms per hash at cost 12). Running it inline in
+request handlers lets a burst of logins occupy every worker thread, so the
+work is shipped to a small process pool instead. Jobs beyond the pool plus
+PASSWORD_HASH_QUEUE_SIZE waiting jobs are rejected with 503 so the queue
+cannot grow without bound.
+
+Configuration (environment):
+    BCRYPT_ROUNDS             bcrypt cost factor; hashes with another cost are
+                              transparently rehashed on the next login
+    PASSWORD_HASH_WORKERS     processes in the pool (0 = hash inline)
+    PASSWORD_HASH_QUEUE_SIZE  jobs allowed to wait for a free process
+    PASSWORD_HASH_TIMEOUT     seconds a job may wait + run before failing
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+# Hashes made with a different cost are reported by needs_update / verify_and_update
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+# Functions executed inside the worker processes
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+class HashingPool:
+    """Bounded process pool with simple queueing metrics."""
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "finished": 0,
+            "rejected": 0,
+            "failed": 0,
+            "pending": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0
+        }
+
+    def start(self):
+        """Create the worker processes (call early, before the server spawns threads)."""
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def run(self, fn, *args):
+        """Run `fn(*args)` on the pool, blocking the calling thread until it finishes."""
+        if not self._slots.acquire(blocking=False):
+            self._record(rejected=1)
+            raise self._busy()
+
+        started = time.monotonic()
+        self._record(submitted=1, pending=1)
+        if self.workers <= 0:
+            try:
+                result = fn(*args)
+            except Exception:
+                self._record(failed=1)
+                raise
+            finally:
+                self._release()
+            self._record_success(started)
+            return result
+
+        try:
+            self.start()
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is held until the job ends, not until the caller gives up
+        # waiting: a timed out job keeps its process busy
+        future.add_done_callback(lambda _: self._release())
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._record(failed=1)
+            raise self._busy()
+        except Exception:
+            self._record(failed=1)
+            raise
+        self._record_success(started)
+        return result
+
+    @staticmethod
+    def _busy() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+
+    def _release(self):
+        with self._lock:
+            self._stats["pending"] -= 1
+        self._slots.release()
+
+    def _record_success(self, started: float):
+        # Only successful jobs count towards the timings
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._stats["finished"] += 1
+            self._stats["total_seconds"] += elapsed
+            self._stats["max_seconds"] = max(self._stats["max_seconds"], elapsed)
+
+    def _record(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        finished = stats["finished"]
+        stats["avg_seconds"] = round(stats["total_seconds"] / finished, 4) if finished else 0.0
+        stats["total_seconds"] = round(stats["total_seconds"], 4)
+        stats["max_seconds"] = round(stats["max_seconds"], 4)
+        stats["workers"] = self.workers
+        stats["bcrypt_rounds"] = BCRYPT_ROUNDS
+        return stats
+
+
+hashing_pool = HashingPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE, PASSWORD_HASH_TIMEOUT)
+
+
+def hash_password(password: str) -> str:
+    """Hash a password on the hashing pool."""
+    return hashing_pool.run(_hash, password)
+
+def verify_and_update_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the hashing pool.
+    Returns (valid, new_hash); new_hash is set when the stored hash uses an
+    outdated cost and should be replaced.
+    """
+    return hashing_pool.run(_verify_and_update, password, hashed_password)
+
+def get_hashing_stats() -> dict:
+    """Queueing metrics of the hashing pool."""
+    return hashing_pool.stats()
@@ -0,0 +1,148 @@
+"""
+Cálculos nutricionales materializados por paciente.
+
+Los valores se escriben al crear o actualizar el paciente, se recalculan
+cuando cambian los datos de los que dependen y se refrescan diariamente
+(la edad cambia con el calendario), de modo que la lectura es una sola
+consulta por índice.
+"""
+from datetime import date
+
+from sqlalchemy import inspect, insert, update
+from sqlalchemy.orm import Session
+
+from models.patient import Patient
+from models.patient_calculations import PatientCalculation
+from .nutrition_calculations import (
+    calculate_bmi,
+    calculate_ideal_weight,
+    calculate_adjusted_weight,
+    calculate_caloric_requirement,
+    get_bmi_category,
+    calculate_age
+)
+from .nutrition_batch import calculate_batch, calculate_ages
+
+# Campos del paciente de los que dependen los cálculos
+CALCULATION_INPUT_FIELDS = (
+    "weight",
+    "height",
+    "activity_level",
+    "patient_type",
+    "gender",
+    "birth_date"
+)
+
+_BATCH_COLUMNS = (
+    "bmi", "bmi_category", "ideal_weight", "adjusted_weight",
+    "tmb", "caloric_requirement", "proteins_g", "carbs_g", "fats_g"
+)
+
+
+def compute_patient_calculations(patient: Patient) -> dict:
+    """Calcula todos los valores derivados de un paciente"""
+    age = calculate_age(patient.birth_date)
+    bmi = calculate_bmi(patient.weight, patient.height)
+    ideal_weight = calculate_ideal_weight(patient.height, patient.gender)
+    requirement = calculate_caloric_requirement(
+        weight=patient.weight,
+        height=patient.height,
+        age=age,
+        gender=patient.gender,
+        activity_level=patient.activity_level,
+        patient_type=patient.patient_type
+    )
+    return {
+        "age": age,
+        "bmi": bmi,
+        "bmi_category": get_bmi_category(bmi, age),
+        "ideal_weight": ideal_weight,
+        "adjusted_weight": calculate_adjusted_weight(patient.weight, ideal_weight),
+        "tmb": requirement["tmb"],
+        "caloric_requirement": requirement["caloric_requirement"],
+        "proteins_g": requirement["proteins_g"],
+        "carbs_g": requirement["carbs_g"],
+        "fats_g": requirement["fats_g"]
+    }
+
+
+def calculations_need_refresh(patient: Patient) -> bool:
+    """Indica si cambió algún campo del que dependen los cálculos (cambios sin guardar)"""
+    state = inspect(patient)
+    if state.transient or state.pending:
+        return True
+    return any(state.attrs[field].history.has_changes() for field in CALCULATION_INPUT_FIELDS)
+
+
+def store_patient_calculations(db: Session, patient: Patient) -> PatientCalculation:
+    """
+    Escribe (o reescribe) los cálculos del paciente en la sesión.
+    No hace commit: se confirma junto con el cambio del paciente.
+    """
+    values = compute_patient_calculations(patient)
+    calculation = patient.calculations
+    if calculation is None:
+        calculation = PatientCalculation(patient=patient)
+        db.add(calculation)
+    for key, value in values.items():
+        setattr(calculation, key, value)
+    calculation.computed_on = date.today()
+    return calculation
+
+
+def refresh_stale_calculations(db: Session, batch_size: int = 1000) -> int:
+    """
+    Recalcula por lotes los cálculos de días anteriores y los de pacientes sin
+    cálculos. Pensado para ejecutarse una vez al día.
+    Retorna el número de pacientes actualizados.
+    """
+    today = date.today()
+    refreshed = 0
+    last_id = 0
+
+    while True:
+        rows = db.query(
+            Patient.id,
+            Patient.birth_date,
+            Patient.gender,
+            Patient.weight,
+            Patient.height,
+            Patient.activity_level,
+            Patient.patient_type,
+            PatientCalculation.id
+        ).outerjoin(PatientCalculation, PatientCalculation.patient_id == Patient.id)\
+            .filter(
+                Patient.id > last_id,
+                (PatientCalculation.id.is_(None)) | (PatientCalculation.computed_on < today)
+            )\
+            .order_by(Patient.id)\
+            .limit(batch_size)\
+            .all()
+
+        if not rows:
+            break
+
+        patient_ids, birth_dates, genders, weights, heights, activity_levels, patient_types, calculation_ids = zip(*rows)
+        ages = calculate_ages(birth_dates, today)
+        results = calculate_batch(weights, heights, ages, genders, activity_levels, patient_types)
+        values = [results[column].tolist() for column in _BATCH_COLUMNS]
+
+        new_rows = []
+        existing_rows = []
+        for patient_id, calculation_id, age, *row in zip(patient_ids, calculation_ids, ages.tolist(), *values):
+            record = dict(zip(_BATCH_COLUMNS, row), age=age, computed_on=today)
+            if calculation_id is None:
+                new_rows.append(dict(record, patient_id=patient_id))
+            else:
+                existing_rows.append(dict(record, id=calculation_id))
+
+        if new_rows:
+            db.execute(insert(PatientCalculation), new_rows)
+        if existing_rows:
+            db.execute(update(PatientCalculation), existing_rows)
+        db.commit()
+
+        refreshed += len(rows)
+        last_id = patient_ids[-1]
+
+    return refreshed
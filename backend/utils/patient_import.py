@@ -0,0 +1,262 @@
+"""
+Bulk patient import from CSV or XLSX files.
+
+Rows are streamed from the upload (csv reader / openpyxl read-only mode), so
+memory stays bounded by the batch size rather than the file size. Every batch
+is validated against the patient schema, checked for duplicate
+identifications with a single IN query, inserted with one executemany
+statement together with its nutritional calculations, and committed.
+
+Rows that fail are skipped and reported back with their spreadsheet row
+number; the rest of the file is still imported.
+"""
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.patient import Patient
+from models.patient_calculations import PatientCalculation
+from .data_export import FORMULA_PREFIXES
+from .nutrition_batch import calculate_batch, calculate_ages
+from .patient_search import build_patient_search_text
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 500
+
+_CALCULATION_COLUMNS = (
+    "bmi", "bmi_category", "ideal_weight", "adjusted_weight",
+    "tmb", "caloric_requirement", "proteins_g", "carbs_g", "fats_g"
+)
+
+# Numbered rows as (row_number, {column: value}); row 1 is the header
+Row = Tuple[int, dict]
+
+
+def _normalize_header(value) -> str:
+    return "_".join(str(value or "").strip().lower().split())
+
+
+def _clean_value(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _unescape_csv_value(value: str) -> str:
+    # Undo the formula escaping of data_export.stream_csv so exports round-trip
+    if value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+        return value[1:]
+    return value
+
+
+def iter_csv_rows(fileobj) -> Iterator[Row]:
+    """Stream rows of a CSV file (UTF-8, comma, semicolon or tab separated)."""
+    text_file = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        # The separator is taken from the header: csv.Sniffer mistakes the
+        # leading ' of escaped formulas in the data rows for a quote character
+        header_line = text_file.readline()
+        text_file.seek(0)
+        delimiter = max(",;\t", key=header_line.count)
+
+        reader = csv.reader(text_file, delimiter=delimiter)
+        header = [_normalize_header(column) for column in next(reader, [])]
+        for row_number, values in enumerate(reader, start=2):
+            if not any(value.strip() for value in values):
+                continue
+            yield row_number, {
+                key: _clean_value(_unescape_csv_value(value)) for key, value in zip(header, values) if key
+            }
+    finally:
+        # Leave the underlying upload open; FastAPI closes it
+        text_file.detach()
+
+
+def iter_xlsx_rows(fileobj) -> Iterator[Row]:
+    """Stream rows of the first sheet of an XLSX workbook."""
+    from openpyxl import load_workbook  # only needed for spreadsheet uploads
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [_normalize_header(column) for column in next(rows, ())]
+        for row_number, values in enumerate(rows, start=2):
+            if all(value is None or str(value).strip() == "" for value in values):
+                continue
+            yield row_number, {key: _clean_value(value) for key, value in zip(header, values) if key}
+    finally:
+        workbook.close()
+
+
+def iter_import_rows(filename: str, fileobj) -> Iterator[Row]:
+    """Pick the reader from the file extension."""
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        return iter_csv_rows(fileobj)
+    if extension in ("xlsx", "xlsm"):
+        return iter_xlsx_rows(fileobj)
+    raise HTTPException(status_code=400, detail="Unsupported file type, upload a .csv or .xlsx file")
+
+
+def _batched(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _format_validation_error(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}"
+        for item in error.errors()
+    ]
+
+
+class _Report:
+    def __init__(self):
+        self.total_rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row_number: int, identification, messages: List[str]):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({
+                "row": row_number,
+                "identification": identification,
+                "errors": messages
+            })
+
+    def as_dict(self) -> dict:
+        return {
+            "total_rows": self.total_rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+
+def _calculation_rows(patient_ids: List[int], patients: List[BaseModel]) -> List[dict]:
+    today = date.today()
+    ages = calculate_ages([p.birth_date for p in patients], today)
+    results = calculate_batch(
+        weights=[p.weight for p in patients],
+        heights=[p.height for p in patients],
+        ages=ages,
+        genders=[p.gender for p in patients],
+        activity_levels=[p.activity_level for p in patients],
+        patient_types=[p.patient_type for p in patients]
+    )
+    values = [results[column].tolist() for column in _CALCULATION_COLUMNS]
+    return [
+        dict(zip(_CALCULATION_COLUMNS, row), patient_id=patient_id, age=age, computed_on=today)
+        for patient_id, age, *row in zip(patient_ids, ages.tolist(), *values)
+    ]
+
+
+def import_patients(
+    db: Session,
+    rows: Iterable[Row],
+    nutritionist_id: int,
+    patient_limit: int,
+    schema: Type[BaseModel],
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> dict:
+    """
+    Import `rows` for a nutritionist, validating each one with `schema`.
+    `patient_limit` is the plan limit (-1 = unlimited). Each batch is
+    committed on its own, so a failure only loses the rows of that batch.
+    Returns the import report.
+    """
+    report = _Report()
+    seen_identifications = set()
+
+    remaining: Optional[int] = None
+    if patient_limit != -1:
+        current_patients = db.query(Patient.id).filter(Patient.nutritionist_id == nutritionist_id).count()
+        remaining = max(patient_limit - current_patients, 0)
+
+    for batch in _batched(rows, batch_size):
+        report.total_rows += len(batch)
+
+        # Validate and drop repeated identifications within the file
+        valid: List[Tuple[int, BaseModel]] = []
+        for row_number, data in batch:
+            identification = data.get("identification")
+            try:
+                patient = schema.model_validate(data)
+            except ValidationError as e:
+                report.add_error(row_number, identification, _format_validation_error(e))
+                continue
+            if patient.identification in seen_identifications:
+                report.add_error(row_number, patient.identification, ["Duplicate identification in file"])
+                continue
+            seen_identifications.add(patient.identification)
+            valid.append((row_number, patient))
+
+        if not valid:
+            continue
+
+        # Identifications already registered, in one query per batch
+        existing = {
+            identification for (identification,) in db.query(Patient.identification).filter(
+                Patient.nutritionist_id == nutritionist_id,
+                Patient.identification.in_([patient.identification for _, patient in valid])
+            )
+        }
+
+        accepted: List[Tuple[int, BaseModel]] = []
+        for row_number, patient in valid:
+            if patient.identification in existing:
+                report.add_error(row_number, patient.identification, ["Patient with this identification already exists"])
+            elif remaining is not None and len(accepted) >= remaining:
+                report.add_error(row_number, patient.identification, [f"Patient limit reached ({patient_limit})"])
+            else:
+                accepted.append((row_number, patient))
+
+        if not accepted:
+            continue
+
+        # Bulk inserts bypass the ORM events, so search_text is filled in here
+        patients = [patient for _, patient in accepted]
+        values = [
+            dict(
+                patient.model_dump(),
+                nutritionist_id=nutritionist_id,
+                search_text=build_patient_search_text(patient.first_name, patient.last_name, patient.identification)
+            )
+            for patient in patients
+        ]
+        try:
+            patient_ids = db.scalars(
+                insert(Patient).returning(Patient.id, sort_by_parameter_order=True),
+                values
+            ).all()
+            db.execute(insert(PatientCalculation), _calculation_rows(patient_ids, patients))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            for row_number, patient in accepted:
+                report.add_error(row_number, patient.identification, ["Could not be saved (conflicting data)"])
+            continue
+
+        report.imported += len(accepted)
+        if remaining is not None:
+            remaining -= len(accepted)
+
+    return report.as_dict()
@@ -0,0 +1,196 @@
+"""
+Indexed patient search.
+
+Every patient keeps a `search_text` column with its name and identification
+lower-cased and stripped of accents ("José" -> "jose"). That column is indexed
+per backend:
+
+- PostgreSQL: pg_trgm GIN index, ranked by trigram similarity.
+- SQLite: FTS5 external-content table with the trigram tokenizer, kept in
+  sync by triggers, ranked by bm25. Trigrams cannot match tokens shorter than
+  three characters; those are checked with LIKE.
+- Anything else: LIKE over the normalized column.
+
+Every backend matches each query token as a substring of `search_text`
+("rez" finds "Pérez"); PostgreSQL also returns near misses by similarity.
+"""
+import logging
+import unicodedata
+from typing import List
+
+from sqlalchemy import and_, bindparam, case, column, event, func, or_, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models.patient import Patient
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "patients_fts"
+_fts_table = table(FTS_TABLE, column("rowid"))
+FTS_TRIGGERS = ("patients_fts_ai", "patients_fts_ad", "patients_fts_au")
+TRIGRAM_MIN_LENGTH = 3
+
+# Set by install_search_index / detect_search_index once the backend index is known to exist
+_sqlite_fts_enabled = False
+
+
+def normalize_search_text(*parts) -> str:
+    """Lower-case, strip accents and collapse whitespace."""
+    joined = " ".join(str(part) for part in parts if part)
+    decomposed = unicodedata.normalize("NFKD", joined)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+def build_patient_search_text(first_name, last_name, identification) -> str:
+    """Searchable text of a patient."""
+    return normalize_search_text(first_name, last_name, identification)
+
+
+@event.listens_for(Patient, "before_insert")
+@event.listens_for(Patient, "before_update")
+def _sync_search_text(mapper, connection, target):
+    target.search_text = build_patient_search_text(
+        target.first_name, target.last_name, target.identification
+    )
+
+
+def install_search_index(engine: Engine, batch_size: int = 1000):
+    """Create the backend-specific search index and backfill `search_text`."""
+    global _sqlite_fts_enabled
+
+    _backfill_search_text(engine, batch_size)
+
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            try:
+                with conn.begin_nested():
+                    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                    conn.execute(text(
+                        "CREATE INDEX IF NOT EXISTS ix_patients_search_text_trgm "
+                        "ON patients USING gin (search_text gin_trgm_ops)"
+                    ))
+            except Exception as e:
+                logger.warning(f"pg_trgm not available, patient search falls back to LIKE: {e}")
+        elif engine.dialect.name == "sqlite":
+            try:
+                with conn.begin_nested():
+                    _create_sqlite_fts(conn)
+                _sqlite_fts_enabled = True
+            except Exception as e:
+                logger.warning(f"FTS5 not available, patient search falls back to LIKE: {e}")
+
+
+def detect_search_index(engine: Engine):
+    """Enable the FTS5 path if `install_search_index` already created the index."""
+    global _sqlite_fts_enabled
+
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as conn:
+        _sqlite_fts_enabled = _sqlite_fts_is_trigram(conn)
+
+
+def _backfill_search_text(engine: Engine, batch_size: int):
+    with Session(engine) as db:
+        while True:
+            rows = db.query(Patient.id, Patient.first_name, Patient.last_name, Patient.identification)\
+                .filter(Patient.search_text.is_(None))\
+                .limit(batch_size)\
+                .all()
+            if not rows:
+                break
+            db.execute(
+                Patient.__table__.update()
+                .where(Patient.__table__.c.id == bindparam("patient_id")),
+                [
+                    {"patient_id": row.id, "search_text": build_patient_search_text(*row[1:])}
+                    for row in rows
+                ]
+            )
+            db.commit()
+
+
+def _sqlite_fts_is_trigram(conn) -> bool:
+    sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).scalar()
+    return sql is not None and "trigram" in sql
+
+
+def _sqlite_fts_triggers(conn) -> set:
+    return set(conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'patients'")
+    ).scalars())
+
+
+def _create_sqlite_fts(conn):
+    if _sqlite_fts_is_trigram(conn) and set(FTS_TRIGGERS) <= _sqlite_fts_triggers(conn):
+        return
+
+    # Earlier versions indexed whole words (unicode61), and migrations that
+    # rebuild the patients table (SQLite batch mode) drop its triggers:
+    # recreate the index and its triggers, then reindex
+    for trigger in FTS_TRIGGERS:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+    # search_text is already lower-cased and without accents
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        "search_text, content='patients', content_rowid='id', tokenize='trigram')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER patients_fts_ai AFTER INSERT ON patients BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER patients_fts_ad AFTER DELETE ON patients BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER patients_fts_au AFTER UPDATE OF search_text ON patients BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+        f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+    ))
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def search_patients(db: Session, query: str, nutritionist_id: int | None = None, limit: int = 20) -> List[Patient]:
+    """Search patients by name or identification, best matches first."""
+    normalized = normalize_search_text(query)
+    if not normalized:
+        return []
+    tokens = normalized.split()
+
+    patients = db.query(Patient)
+    if nutritionist_id is not None:
+        patients = patients.filter(Patient.nutritionist_id == nutritionist_id)
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        contains_all = and_(*[Patient.search_text.contains(token, autoescape=True) for token in tokens])
+        patients = patients.filter(or_(contains_all, Patient.search_text.op("%")(normalized)))\
+            .order_by(func.similarity(Patient.search_text, normalized).desc(), Patient.id)
+    elif dialect == "sqlite" and _sqlite_fts_enabled and max(map(len, tokens)) >= TRIGRAM_MIN_LENGTH:
+        # A quoted string matches wherever its trigrams appear in sequence: a substring
+        match = " ".join(
+            '"' + token.replace('"', '""') + '"' for token in tokens if len(token) >= TRIGRAM_MIN_LENGTH
+        )
+        short_tokens = [token for token in tokens if len(token) < TRIGRAM_MIN_LENGTH]
+        patients = patients.join(_fts_table, _fts_table.c.rowid == Patient.id)\
+            .filter(text(f"{FTS_TABLE} MATCH :match").bindparams(match=match))\
+            .filter(*[Patient.search_text.contains(token, autoescape=True) for token in short_tokens])\
+            .order_by(text(f"bm25({FTS_TABLE})"), Patient.id)
+    else:
+        patients = patients.filter(
+            and_(*[Patient.search_text.contains(token, autoescape=True) for token in tokens])
+        ).order_by(
+            case((Patient.search_text.startswith(normalized, autoescape=True), 0), else_=1),
+            Patient.last_name,
+            Patient.id
+        )
+
+    return patients.limit(limit).all()
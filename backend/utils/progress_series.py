@@ -0,0 +1,144 @@
+"""
+Series de tiempo del progreso de un paciente.
+
+Se leen solo la fecha y las métricas pedidas de las consultas y se procesan
+con numpy: agrupación opcional por semana o mes (promedio de cada periodo),
+diferencias entre puntos consecutivos, cambio total y tendencia por mínimos
+cuadrados. El resultado se devuelve en columnas (fechas + valores) para que
+las gráficas carguen rápido aun con años de historia.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models.consultation import Consultation
+
+PROGRESS_METRICS = (
+    "weight",
+    "bmi",
+    "waist_circumference",
+    "hip_circumference",
+    "arm_circumference",
+    "thigh_circumference",
+    "calf_circumference",
+    "triceps_skinfold",
+    "biceps_skinfold",
+    "subscapular_skinfold",
+    "suprailiac_skinfold",
+    "abdominal_skinfold",
+    "body_fat_percentage",
+    "muscle_mass",
+    "body_fat_siri",
+    "fat_mass",
+    "fat_free_mass",
+    "waist_hip_ratio",
+    "arm_muscle_area",
+    "caloric_requirement"
+)
+
+# La tendencia se expresa en unidades por 30 días
+TREND_DAYS = 30
+
+
+def _to_list(values: np.ndarray, decimals: int = 2) -> List[Optional[float]]:
+    rounded = np.round(values, decimals)
+    return [None if np.isnan(value) else float(value) for value in rounded]
+
+
+def _bucket_starts(dates: np.ndarray, bucket: str) -> np.ndarray:
+    """Inicio del periodo de cada fecha (lunes de la semana o día 1 del mes)"""
+    days = dates.astype("datetime64[D]")
+    if bucket == "week":
+        # 1970-01-01 fue jueves: (días + 3) % 7 da el día de la semana con lunes = 0
+        weekday = (days.astype(np.int64) + 3) % 7
+        return days - weekday.astype("timedelta64[D]")
+    return days.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _trend(days: np.ndarray, values: np.ndarray) -> Optional[float]:
+    """Pendiente por mínimos cuadrados (unidades por TREND_DAYS días)"""
+    valid = ~np.isnan(values)
+    x, y = days[valid], values[valid]
+    if len(x) < 2 or np.ptp(x) == 0:
+        return None
+    x = x - x.mean()
+    slope = float((x * (y - y.mean())).sum() / (x * x).sum())
+    return round(slope * TREND_DAYS, 3)
+
+
+def build_progress_series(
+    dates: Sequence[datetime],
+    columns: Dict[str, Sequence[Optional[float]]],
+    bucket: str = "none"
+) -> dict:
+    """Arma la serie a partir de fechas y columnas de valores (mismo orden y largo)"""
+    timestamps = np.array(dates, dtype="datetime64[s]")
+    days = timestamps.astype(np.int64) / 86400.0
+    raw = {
+        metric: np.array([np.nan if value is None else value for value in values], dtype=float)
+        for metric, values in columns.items()
+    }
+
+    if bucket == "none" or len(timestamps) == 0:
+        series_dates = [str(value) for value in timestamps]
+        series = raw
+    else:
+        starts = _bucket_starts(timestamps, bucket)
+        unique_starts, groups = np.unique(starts, return_inverse=True)
+        series_dates = [str(value) for value in unique_starts]
+        series = {}
+        for metric, values in raw.items():
+            valid = ~np.isnan(values)
+            sums = np.bincount(groups[valid], weights=values[valid], minlength=len(unique_starts))
+            counts = np.bincount(groups[valid], minlength=len(unique_starts))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                series[metric] = np.where(counts > 0, sums / counts, np.nan)
+
+    metrics = {}
+    for metric, values in series.items():
+        deltas = np.full(len(values), np.nan)
+        valid_positions = np.flatnonzero(~np.isnan(values))
+        # Diferencia con el punto anterior que tiene valor
+        if len(valid_positions) > 1:
+            deltas[valid_positions[1:]] = np.diff(values[valid_positions])
+        total_change = None
+        if len(valid_positions) > 1:
+            total_change = round(float(values[valid_positions[-1]] - values[valid_positions[0]]), 2)
+        metrics[metric] = {
+            "values": _to_list(values),
+            "deltas": _to_list(deltas),
+            "total_change": total_change,
+            # La tendencia usa las consultas individuales, no los promedios
+            "trend_per_month": _trend(days, raw[metric])
+        }
+
+    return {"bucket": bucket, "dates": series_dates, "metrics": metrics}
+
+
+def get_progress_series(
+    db: Session,
+    patient_id: int,
+    metrics: Sequence[str],
+    bucket: str = "none",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> dict:
+    """Lee solo las columnas necesarias de las consultas del paciente y arma la serie"""
+    query = db.query(
+        Consultation.consultation_date,
+        *[getattr(Consultation, metric) for metric in metrics]
+    ).filter(
+        Consultation.patient_id == patient_id,
+        Consultation.consultation_date.isnot(None)
+    )
+    if start:
+        query = query.filter(Consultation.consultation_date >= start)
+    if end:
+        query = query.filter(Consultation.consultation_date <= end)
+    rows = query.order_by(Consultation.consultation_date).all()
+
+    dates = [row[0] for row in rows]
+    columns = {metric: [row[index + 1] for row in rows] for index, metric in enumerate(metrics)}
+    return build_progress_series(dates, columns, bucket)
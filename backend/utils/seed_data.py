@@ -0,0 +1,122 @@
+"""
+Carga de los datos predefinidos (seed_data/*.json) con un único upsert por tabla.
+
+Cada archivo tiene un número de versión y la lista de filas. La versión
+aplicada de cada conjunto se guarda en la tabla seed_versions: si ya está al
+día, volver a cargarlo cuesta una sola consulta. Si no, todas las filas se
+escriben con un INSERT ... ON CONFLICT (name, category) DO UPDATE sobre el
+índice único parcial de las filas no personalizadas (is_custom = false), así
+que los registros creados por los nutricionistas nunca se modifican.
+
+Para publicar cambios en un conjunto basta con editar su archivo y subir
+`version`.
+"""
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Type
+
+from sqlalchemy import Enum as SqlEnum, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.food_exchange import FoodExchange
+from models.menu import Menu
+from models.seed_version import SeedVersion
+from models.snack import Snack
+from .catalog_cache import CATALOG_MODELS
+
+SEED_DATA_DIR = Path(__file__).resolve().parent.parent / "seed_data"
+
+# Conjunto -> modelo de destino
+SEED_DATASETS = {
+    "food_exchanges": FoodExchange,
+    "colombian_foods": FoodExchange,
+    "menus": Menu,
+    "snacks": Snack
+}
+
+SEED_KEY = ("name", "category")
+_SEED_KEY_WHERE = text("is_custom = false")
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert
+}
+
+
+@lru_cache(maxsize=None)
+def load_seed_file(dataset: str) -> dict:
+    """Lee un conjunto de seed_data/ (se cachea: los archivos no cambian en ejecución)"""
+    with open(SEED_DATA_DIR / f"{dataset}.json", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _seed_rows(model: Type, items: List[dict]) -> List[dict]:
+    """Filas con las mismas columnas (las que falten quedan en None) y enums convertidos"""
+    columns = list(dict.fromkeys(key for item in items for key in item))
+    enums = {
+        column.name: column.type.enum_class
+        for column in model.__table__.columns
+        if isinstance(column.type, SqlEnum) and column.type.enum_class is not None
+    }
+    rows = []
+    for item in items:
+        row = {column: item.get(column) for column in columns}
+        for column, enum_class in enums.items():
+            if row.get(column) is not None:
+                row[column] = enum_class(row[column])
+        row["is_custom"] = False
+        rows.append(row)
+    return rows
+
+
+def apply_seed(db: Session, dataset: str, force: bool = False) -> Dict:
+    """
+    Aplica un conjunto si su versión es más nueva que la registrada (o si `force`).
+    Retorna {"applied", "version", "rows", "names"}; hace commit si aplica.
+    """
+    model = SEED_DATASETS[dataset]
+    data = load_seed_file(dataset)
+    version = data["version"]
+
+    applied_version = db.scalar(select(SeedVersion.version).where(SeedVersion.dataset == dataset))
+    if not force and applied_version is not None and applied_version >= version:
+        return {"applied": False, "version": applied_version, "rows": 0, "names": []}
+
+    dialect = db.get_bind().dialect.name
+    if dialect not in _DIALECT_INSERTS:
+        raise RuntimeError(f"Seed upsert not supported for dialect {dialect}")
+    insert = _DIALECT_INSERTS[dialect]
+
+    rows = _seed_rows(model, data["items"])
+    statement = insert(model)
+    updated_columns = [column for column in rows[0] if column not in SEED_KEY]
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=list(SEED_KEY),
+            index_where=_SEED_KEY_WHERE,
+            set_={column: statement.excluded[column] for column in updated_columns}
+        ),
+        rows
+    )
+
+    version_statement = insert(SeedVersion).values(dataset=dataset, version=version, rows=len(rows))
+    db.execute(
+        version_statement.on_conflict_do_update(
+            index_elements=[SeedVersion.dataset],
+            set_={"version": version, "rows": len(rows), "applied_at": version_statement.excluded.applied_at}
+        )
+    )
+
+    # Los INSERT masivos no pasan por la unidad de trabajo: se invalida el
+    # catálogo explícitamente (se publica al hacer commit)
+    db.info.setdefault("changed_catalogs", set()).add(CATALOG_MODELS[model])
+    db.commit()
+
+    return {"applied": True, "version": version, "rows": len(rows), "names": [row["name"] for row in rows]}
+
+
+def apply_all_seeds(db: Session, force: bool = False) -> Dict[str, Dict]:
+    """Aplica todos los conjuntos de seed_data/"""
+    return {dataset: apply_seed(db, dataset, force=force) for dataset in SEED_DATASETS}
@@ -0,0 +1,41 @@
+"""
+Fast JSON serialization of list responses.
+
+With `response_model=List[Model]` FastAPI validates every ORM object, dumps the
+result to Python dicts (`jsonable_encoder`-style) and only then encodes them
+with the response class. A ListSerializer builds the TypeAdapter for the list
+once at import time and goes straight from ORM objects to JSON bytes in
+pydantic-core, so list endpoints can return a ready Response.
+
+The endpoints keep `response_model` for the OpenAPI schema; the returned
+Response bypasses FastAPI's own serialization.
+"""
+from typing import Iterable, List, Type
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+# Default response class of the app (see main.py): orjson encodes dicts and
+# lists several times faster than the stdlib encoder
+DefaultJSONResponse = ORJSONResponse
+
+
+class ListSerializer:
+    """Precompiled validator/serializer for a list of `model` read from ORM objects."""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.adapter = TypeAdapter(List[model])
+
+    def dump(self, objects: Iterable) -> bytes:
+        """JSON bytes of `objects` (validated with from_attributes)."""
+        return self.adapter.dump_json(self.adapter.validate_python(objects, from_attributes=True))
+
+    def response(self, objects: Iterable, status_code: int = 200, headers: dict | None = None) -> Response:
+        return Response(
+            content=self.dump(objects),
+            status_code=status_code,
+            headers=headers,
+            media_type="application/json"
+        )
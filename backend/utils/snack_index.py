@@ -0,0 +1,143 @@
+"""
+Índice en memoria del catálogo de snacks.
+
+Cada snack ocupa una posición fija (ordenados por id). Por cada valor de los
+filtros dietéticos y de categoría se guarda un bitset (un int de Python), de
+modo que cualquier combinación de filtros se resuelve con AND de enteros. Los
+rangos de calorías/proteínas, el orden y la paginación se aplican con numpy
+sobre el resultado, y cada fila ya está serializada en JSON.
+
+El índice se asocia a la versión del catálogo (ver catalog_cache): cuando la
+versión cambia queda frío y se reconstruye en segundo plano; mientras tanto
+las consultas se resuelven en la base de datos.
+"""
+import threading
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models.snack import Snack
+from .catalog_cache import get_catalog_version
+
+FLAG_FIELDS = ("is_vegetarian", "is_vegan", "is_diabetic_friendly", "is_low_sodium")
+SORT_FIELDS = ("id", "name", "calories", "proteins")
+
+
+def _to_bits(mask: np.ndarray) -> int:
+    """Arreglo booleano -> bitset (bit i = posición i)"""
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def _from_bits(bits: int, size: int) -> np.ndarray:
+    """Bitset -> arreglo booleano de `size` posiciones"""
+    raw = np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, count=size, bitorder="little").astype(bool)
+
+
+class SnackIndex:
+    """Bitsets por filtro, columnas numéricas y filas serializadas de los snacks"""
+
+    def __init__(self, version: str, snacks: Sequence[Snack], serialize: Callable[[Snack], bytes]):
+        snacks = sorted(snacks, key=lambda snack: snack.id)
+        self.version = version
+        self.size = len(snacks)
+        self.rows: List[bytes] = [serialize(snack) for snack in snacks]
+        self.all_bits = (1 << self.size) - 1
+
+        self.flag_bits = {}
+        for field in FLAG_FIELDS:
+            values = np.array([bool(getattr(snack, field)) for snack in snacks], dtype=bool)
+            self.flag_bits[(field, True)] = _to_bits(values)
+            self.flag_bits[(field, False)] = _to_bits(~values)
+
+        categories = [getattr(snack.category, "value", snack.category) for snack in snacks]
+        self.category_bits = {
+            category: _to_bits(np.array([c == category for c in categories], dtype=bool))
+            for category in set(categories)
+        }
+
+        # Los valores nulos quedan como NaN y no cumplen ningún rango
+        self.calories = np.array([np.nan if s.calories is None else s.calories for s in snacks], dtype=float)
+        self.proteins = np.array([np.nan if s.proteins is None else s.proteins for s in snacks], dtype=float)
+
+        names = np.array([(snack.name or "").casefold() for snack in snacks])
+        ids = np.array([snack.id for snack in snacks])
+        # Permutaciones de orden ascendente, con el id como desempate (los NaN al final)
+        self.orders = {
+            "id": np.argsort(ids, kind="stable"),
+            "name": np.lexsort((ids, names)),
+            "calories": np.lexsort((ids, self.calories)),
+            "proteins": np.lexsort((ids, self.proteins))
+        }
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        flags: Optional[dict] = None,
+        min_calories: Optional[float] = None,
+        max_calories: Optional[float] = None,
+        min_proteins: Optional[float] = None,
+        max_proteins: Optional[float] = None,
+        sort: str = "id",
+        descending: bool = False,
+        skip: int = 0,
+        limit: Optional[int] = None
+    ) -> bytes:
+        """Filtra, ordena y pagina; retorna el arreglo JSON de la página"""
+        bits = self.all_bits
+        if category is not None:
+            bits &= self.category_bits.get(category, 0)
+        for field, value in (flags or {}).items():
+            if value is not None:
+                bits &= self.flag_bits[(field, bool(value))]
+
+        mask = _from_bits(bits, self.size)
+        with np.errstate(invalid="ignore"):
+            if min_calories is not None:
+                mask &= self.calories >= min_calories
+            if max_calories is not None:
+                mask &= self.calories <= max_calories
+            if min_proteins is not None:
+                mask &= self.proteins >= min_proteins
+            if max_proteins is not None:
+                mask &= self.proteins <= max_proteins
+
+        order = self.orders[sort]
+        if descending:
+            order = order[::-1]
+            if sort in ("calories", "proteins"):
+                # Los nulos siempre al final, igual que NULLS LAST en SQL
+                missing = np.isnan(getattr(self, sort)[order])
+                order = np.concatenate((order[~missing], order[missing]))
+        positions = order[mask[order]]
+        end = None if limit is None else skip + limit
+        return b"[" + b",".join(self.rows[i] for i in positions[skip:end]) + b"]"
+
+
+_index: Optional[SnackIndex] = None
+_rebuild_lock = threading.Lock()
+
+
+def get_snack_index() -> Optional[SnackIndex]:
+    """Índice vigente, o None si no existe o quedó de una versión anterior"""
+    index = _index
+    if index is not None and index.version == get_catalog_version("snacks"):
+        return index
+    return None
+
+
+def rebuild_snack_index(session_factory: Callable[[], Session], serialize: Callable[[Snack], bytes]):
+    """Reconstruye el índice (pensado para BackgroundTasks); ignora llamadas concurrentes"""
+    global _index
+    if not _rebuild_lock.acquire(blocking=False):
+        return
+    try:
+        version = get_catalog_version("snacks")
+        if _index is not None and _index.version == version:
+            return
+        with session_factory() as db:
+            snacks = db.query(Snack).all()
+            _index = SnackIndex(version, snacks, serialize)
+    finally:
+        _rebuild_lock.release()
@@ -0,0 +1,116 @@
+"""
+Short-lived cache of the authenticated user principal.
+
+get_current_user only needs a handful of columns to authorize a request, so
+they are cached per user id for USER_CACHE_TTL seconds. Entries are dropped
+after any commit that updates or deletes the user (password change,
+subscription upgrade, deactivation, admin scripts).
+"""
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.user import User
+from .cache import create_cache
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+_cache = create_cache("user", ttl=USER_CACHE_TTL, url=os.getenv("USER_CACHE_URL"))
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Minimal view of a user used for authorization."""
+    id: int
+    role: str
+    is_active: bool
+    subscription_status: str
+    subscription_plan: Optional[str]
+    trial_end_date: Optional[datetime]
+    subscription_end_date: Optional[datetime]
+
+    def to_cache(self) -> dict:
+        data = asdict(self)
+        for key in ("trial_end_date", "subscription_end_date"):
+            if data[key] is not None:
+                data[key] = data[key].isoformat()
+        return data
+
+    @classmethod
+    def from_cache(cls, data: dict) -> "UserPrincipal":
+        data = dict(data)
+        for key in ("trial_end_date", "subscription_end_date"):
+            if data[key] is not None:
+                data[key] = datetime.fromisoformat(data[key])
+        return cls(**data)
+
+
+def _enum_value(value):
+    return getattr(value, "value", value)
+
+
+def load_principal(db: Session, user_id: int) -> Optional[UserPrincipal]:
+    """Load only the principal columns of a user."""
+    row = db.query(
+        User.id,
+        User.role,
+        User.is_active,
+        User.subscription_status,
+        User.subscription_plan,
+        User.trial_end_date,
+        User.subscription_end_date
+    ).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return UserPrincipal(
+        id=row.id,
+        role=_enum_value(row.role),
+        is_active=bool(row.is_active),
+        subscription_status=_enum_value(row.subscription_status),
+        subscription_plan=_enum_value(row.subscription_plan),
+        trial_end_date=row.trial_end_date,
+        subscription_end_date=row.subscription_end_date
+    )
+
+
+def get_user_principal(db: Session, user_id: int) -> Optional[UserPrincipal]:
+    """Return the cached principal, loading it from the database on a miss."""
+    key = str(user_id)
+    cached = _cache.get(key)
+    if cached is not None:
+        return UserPrincipal.from_cache(cached)
+
+    principal = load_principal(db, int(user_id))
+    if principal is not None:
+        _cache.set(key, principal.to_cache())
+    return principal
+
+
+def invalidate_user(user_id: int):
+    """Drop the cached principal of a user."""
+    _cache.delete(str(user_id))
+
+
+# Invalidate after commit (not at flush) so a concurrent request cannot
+# re-cache the old row before the change is visible.
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("changed_user_ids", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)